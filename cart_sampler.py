@@ -0,0 +1,156 @@
+import os
+import random
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from catalog import Selection
+
+logger = logging.getLogger(__name__)
+
+# The table has products x (items + 1) x (cents + 1) cells of 8 bytes; larger
+# configurations are rejected instead of exhausting the container's memory
+TABLE_BUDGET_MB = float(os.getenv('CART_TABLE_MAX_MB', '64'))
+SHARED_SAMPLERS = 8
+
+
+def table_shape(prices: Sequence[int], max_items: int, max_cents: int) -> Tuple[int, int, int]:
+    """(layers, item counts, cent amounts) of the table for these prices and bounds.
+
+    No cart within max_cents holds more items than the cheapest products that
+    fit into it, so the item axis stops there.
+    """
+    cheapest = sorted(price for price in prices if price <= max_cents)
+    fitting = 0
+    for running in accumulate(cheapest):
+        if running > max_cents:
+            break
+        fitting += 1
+    return len(prices) + 1, min(max_items, fitting) + 1, max_cents + 1
+
+
+class TargetCartSampler:
+    """Uniform sampling of carts with a given total and item count.
+
+    A subset-sum table is built once per selection in integer cents:
+    ways[i, k, s] is the number of distinct carts that use only the first i
+    products, contain k of them and cost exactly s cents. Drawing a cart picks
+    a (k, s) cell in proportion to its count and walks the table backwards,
+    deciding per product whether it is in the cart. Every matching cart is
+    equally likely and the cost does not depend on how narrow the target is.
+
+    Counts are float64, exact up to 2**53 carts per cell and proportional
+    beyond, so huge catalogs cannot overflow them.
+    """
+
+    def __init__(self, selection: Selection, max_items: int, max_cents: int, budget_mb: Optional[float] = None):
+        rows = selection.rows()
+        self.catalog = selection.catalog
+        self.rows = rows
+        self.prices = [self.catalog.price_cents[row] for row in rows]
+        self.max_cents = max_cents
+
+        shape = table_shape(self.prices, max_items, max_cents)
+        self.max_items = shape[1] - 1
+        size_mb = np.prod(shape, dtype=np.float64) * 8 / 2**20
+        budget_mb = TABLE_BUDGET_MB if budget_mb is None else budget_mb
+        if size_mb > budget_mb:
+            raise ValueError(
+                f"Cart table for {len(rows)} products, up to {self.max_items} items and {max_cents} cents "
+                f"needs {size_mb:.0f} MB, more than CART_TABLE_MAX_MB={budget_mb:g}; narrow the catalog "
+                f"filters or lower CART_TOTAL / CART_ITEMS"
+            )
+
+        self.ways = np.zeros(shape, dtype=np.float64)
+        self.ways[0, 0, 0] = 1
+        for i, price in enumerate(self.prices, 1):
+            self.ways[i] = self.ways[i - 1]
+            if price <= max_cents:
+                self.ways[i, 1:, price:] += self.ways[i - 1, :-1, :shape[2] - price]
+        logger.info(f"Built cart table for {len(rows)} products, up to {self.max_items} items and {max_cents} cents ({size_mb:.1f} MB)")
+
+    @functools.lru_cache(maxsize=32)
+    def _cells(self, min_cents: int, max_cents: int, min_items: int, max_items: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Item counts and cents of the cells inside the target, with their cumulative cart counts"""
+        k_low, s_low = max(min_items, 0), max(min_cents, 0)
+        window = self.ways[-1, k_low:min(max_items, self.max_items) + 1, s_low:min(max_cents, self.max_cents) + 1]
+        ks, ss = np.nonzero(window)
+        return ks + k_low, ss + s_low, np.cumsum(window[ks, ss])
+
+    def count(self, min_total: float, max_total: float, min_items: int = 1, max_items: Optional[int] = None) -> int:
+        """Number of distinct carts matching the target"""
+        _, _, cumulative = self._cells(round(min_total * 100), round(max_total * 100), min_items, max_items or self.max_items)
+        return int(cumulative[-1]) if len(cumulative) else 0
+
+    def sample(
+        self,
+        rng=None,
+        min_total: float = 7.0,
+        max_total: Optional[float] = None,
+        min_items: int = 1,
+        max_items: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Draw a cart uniformly among all carts matching the target"""
+        rng = rng or random
+        max_total = min_total if max_total is None else max_total
+        ks, ss, cumulative = self._cells(round(min_total * 100), round(max_total * 100), min_items, max_items or self.max_items)
+        if not len(cumulative):
+            raise ValueError(f"No cart of {min_items}-{max_items or self.max_items} items totals {min_total:.2f}-{max_total:.2f} EUR")
+
+        total = cumulative[-1]
+        pick = rng.randrange(int(total)) if total < 2**53 else rng.random() * total
+        cell = min(int(np.searchsorted(cumulative, pick, side='right')), len(cumulative) - 1)
+        k, s = int(ks[cell]), int(ss[cell])
+        pick -= cumulative[cell - 1] if cell else 0
+
+        cart = []
+        for i in range(len(self.prices), 0, -1):
+            if not k:
+                break
+            without = self.ways[i - 1, k, s]
+            if pick < without:
+                continue
+            pick -= without
+            cart.append(self.catalog.item(self.rows[i - 1]))
+            k -= 1
+            s -= self.prices[i - 1]
+        cart.reverse()
+        return cart
+
+
+_samplers: 'OrderedDict[tuple, TargetCartSampler]' = OrderedDict()
+_samplers_lock = threading.Lock()
+
+
+def get_target_sampler(selection: Selection, max_items: int, max_cents: int) -> TargetCartSampler:
+    """Build the table once per catalog selection and bounds, shared by every generator using them"""
+    key = (selection.catalog, tuple(selection.starts), tuple(selection.offsets), max_items, max_cents)
+    with _samplers_lock:
+        if key in _samplers:
+            _samplers.move_to_end(key)
+            return _samplers[key]
+        sampler = _samplers[key] = TargetCartSampler(selection, max_items, max_cents)
+        while len(_samplers) > SHARED_SAMPLERS:
+            _samplers.popitem(last=False)
+        return sampler
+
+
+def _parse_range(value: str, parse) -> Tuple[Any, Any]:
+    low, _, high = value.partition('-')
+    return parse(low), parse(high or low)
+
+
+def cart_target_from_env() -> Optional[Dict[str, Any]]:
+    """Read the optional cart target (CART_TOTAL=12.50 or 10.00-12.00, CART_ITEMS=3 or 2-6)"""
+    if not os.getenv('CART_TOTAL'):
+        return None
+    min_total, max_total = _parse_range(os.environ['CART_TOTAL'], float)
+    target: Dict[str, Any] = {'min_total': min_total, 'max_total': max_total}
+    if os.getenv('CART_ITEMS'):
+        target['min_items'], target['max_items'] = _parse_range(os.environ['CART_ITEMS'], int)
+    return target
@@ -0,0 +1,188 @@
+import os
+import csv
+import random
+import sqlite3
+import logging
+import functools
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog.csv')
+# Tax rates a receipt can print (B = 7 %, A = 19 %)
+TAX_RATES = (7, 19)
+
+
+class Catalog:
+    """Product catalog stored as compact parallel columns.
+
+    Rows are sorted by (category, tax rate, price), so every category/tax rate
+    pair is one contiguous segment with ascending prices. Filters resolve to a
+    handful of row ranges (bisecting prices inside a segment), and sampling
+    picks rows through a prefix sum over those range lengths, so drawing a
+    cart costs O(items in cart) no matter how large the catalog is.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, int, int, str]]):
+        rows = sorted(rows, key=lambda row: (row[3], row[2], row[1], row[0]))
+        self.names: List[str] = [row[0] for row in rows]
+        self.price_cents = array('l', (row[1] for row in rows))
+        self.tax_rates = array('b', (row[2] for row in rows))
+        self.categories: List[str] = sorted({row[3] for row in rows})
+        category_ids = {name: i for i, name in enumerate(self.categories)}
+        self.category_ids = array('H', (category_ids[row[3]] for row in rows))
+
+        # (category, tax rate) -> [start, end) row range
+        self.segments: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        for i, row in enumerate(rows):
+            key = (row[3], row[2])
+            start, _ = self.segments.get(key, (i, i))
+            self.segments[key] = (start, i + 1)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def item(self, row: int) -> Dict[str, Any]:
+        """Materialize one row as the item dict used on receipts"""
+        return {
+            'name': self.names[row],
+            'price': self.price_cents[row] / 100,
+            'tax_rate': self.tax_rates[row],
+            'category': self.categories[self.category_ids[row]],
+        }
+
+    @functools.lru_cache(maxsize=64)
+    def select(
+        self,
+        categories: Optional[Tuple[str, ...]] = None,
+        tax_rates: Optional[Tuple[int, ...]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> 'Selection':
+        """Resolve filters to row ranges; results are cached per filter combination"""
+        low = round(min_price * 100) if min_price is not None else None
+        high = round(max_price * 100) if max_price is not None else None
+        ranges = []
+        for (category, tax_rate), (start, end) in sorted(self.segments.items(), key=lambda entry: entry[1]):
+            if categories is not None and category not in categories:
+                continue
+            if tax_rates is not None and tax_rate not in tax_rates:
+                continue
+            if low is not None:
+                start = bisect_left(self.price_cents, low, start, end)
+            if high is not None:
+                end = bisect_right(self.price_cents, high, start, end)
+            if start < end:
+                ranges.append((start, end))
+        return Selection(self, ranges)
+
+
+class Selection:
+    """A filtered view of the catalog that can be sampled without scanning it"""
+
+    def __init__(self, catalog: Catalog, ranges: Sequence[Tuple[int, int]]):
+        self.catalog = catalog
+        self.starts = array('l', (start for start, _ in ranges))
+        # offsets[i] = number of selected rows before range i
+        self.offsets = array('l', [0])
+        for start, end in ranges:
+            self.offsets.append(self.offsets[-1] + end - start)
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def row(self, position: int) -> int:
+        """Map a position in the selection to a catalog row"""
+        i = bisect_right(self.offsets, position) - 1
+        return self.starts[i] + position - self.offsets[i]
+
+    def rows(self) -> List[int]:
+        return [self.row(position) for position in range(len(self))]
+
+    def sample_cart(self, rng=None, min_total: float = 7.0, unique: bool = True) -> List[Dict[str, Any]]:
+        """Draw items until the total reaches min_total"""
+        rng = rng or random
+        size = len(self)
+        min_cents = round(min_total * 100)
+        cart = []
+        used = set()
+        total = 0
+        while total < min_cents and size:
+            if unique:
+                if len(used) == size:
+                    # Out of unique items before reaching the minimum, return what we have
+                    break
+                position = rng.randrange(size)
+                while position in used:
+                    position = rng.randrange(size)
+                used.add(position)
+            else:
+                position = rng.randrange(size)
+            row = self.row(position)
+            cart.append(self.catalog.item(row))
+            total += self.catalog.price_cents[row]
+        return cart
+
+
+def _read_csv(path: str) -> List[Tuple[str, int, int, str]]:
+    with open(path, newline='', encoding='utf-8') as f:
+        return [
+            (row['name'], round(float(row['price']) * 100), int(row['tax_rate']), row.get('category') or 'Sonstiges')
+            for row in csv.DictReader(f)
+        ]
+
+
+def _read_sqlite(path: str) -> List[Tuple[str, int, int, str]]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [
+            (name, round(price * 100), int(tax_rate), category or 'Sonstiges')
+            for name, price, tax_rate, category in conn.execute(
+                "SELECT name, price, tax_rate, category FROM products"
+            )
+        ]
+    finally:
+        conn.close()
+
+
+def _check_tax_rates(rows: Sequence[Tuple[str, int, int, str]], path: str) -> None:
+    for number, (name, _, tax_rate, _) in enumerate(rows, 1):
+        if tax_rate not in TAX_RATES:
+            raise ValueError(
+                f"{path}: product {number} ({name!r}) has tax rate {tax_rate}, "
+                f"supported rates are {', '.join(map(str, TAX_RATES))}"
+            )
+
+
+@functools.lru_cache(maxsize=None)
+def load_catalog(path: Optional[str] = None) -> Catalog:
+    """Load a catalog from CSV or SQLite once per process.
+
+    Forked render workers inherit the already loaded columns copy-on-write.
+    Raises ValueError for a product whose tax rate is not in TAX_RATES.
+    """
+    path = path or os.getenv('CATALOG_PATH') or DEFAULT_CATALOG_PATH
+    if path.endswith(('.sqlite', '.sqlite3', '.db')):
+        rows = _read_sqlite(path)
+    else:
+        rows = _read_csv(path)
+    _check_tax_rates(rows, path)
+    catalog = Catalog(rows)
+    logger.info(f"Loaded catalog with {len(catalog)} products in {len(catalog.categories)} categories from {path}")
+    return catalog
+
+
+def cart_filters_from_env() -> Dict[str, Any]:
+    """Read optional cart filters (CATALOG_CATEGORIES, CATALOG_TAX_RATES, CATALOG_MIN_PRICE, CATALOG_MAX_PRICE)"""
+    filters: Dict[str, Any] = {}
+    if os.getenv('CATALOG_CATEGORIES'):
+        filters['categories'] = tuple(name.strip() for name in os.environ['CATALOG_CATEGORIES'].split(',') if name.strip())
+    if os.getenv('CATALOG_TAX_RATES'):
+        filters['tax_rates'] = tuple(int(rate) for rate in os.environ['CATALOG_TAX_RATES'].split(',') if rate.strip())
+    if os.getenv('CATALOG_MIN_PRICE'):
+        filters['min_price'] = float(os.environ['CATALOG_MIN_PRICE'])
+    if os.getenv('CATALOG_MAX_PRICE'):
+        filters['max_price'] = float(os.environ['CATALOG_MAX_PRICE'])
+    return filters
@@ -5,7 +5,7 @@
 BOT_TOKEN = "YOUR_BOT_TOKEN_HERE"  # Get this from @BotFather on Telegram
 
 # User Authorization
-ALLOWED_USER_ID = 123456789  # Replace with your Telegram user ID
+ALLOWED_USER_ID = 123456789  # Replace with your Telegram user ID (or a list of IDs)
 
 # Optional: Customize receipt settings
 MIN_RECEIPT_TOTAL = 7.0  # Minimum total for receipts
@@ -0,0 +1,81 @@
+from datetime import datetime
+from io import BytesIO
+from typing import Callable, List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+# Telegram shows photos at most 2560 px on the long side and downscales larger
+# ones, which would make the receipts unreadable; this also keeps sheets well
+# inside the hard photo limits (width + height <= 10000, aspect ratio <= 20)
+MAX_SIDE = 2560
+GUTTER = 12
+LABEL_HEIGHT = 22
+BACKGROUND = (225, 225, 225)
+
+
+def sheet_columns(count: int, tile_width: int, max_side: int = MAX_SIDE) -> int:
+    """Receipts per row: all of them if they fit, otherwise as many as fit across"""
+    return max(1, min(count, (max_side - GUTTER) // (tile_width + GUTTER)))
+
+
+def sheet_capacity(columns: int, tile_height: int, max_side: int = MAX_SIDE) -> int:
+    """Receipts a sheet holds at least, with every row as tall as a full tile"""
+    return columns * max(1, (max_side - GUTTER) // (LABEL_HEIGHT + tile_height + GUTTER))
+
+
+def _trim(receipt: Image.Image) -> Image.Image:
+    """Cut the blank paper below the last line of the receipt"""
+    bbox = ImageOps.invert(receipt.convert('L')).getbbox()
+    if bbox is None:
+        return receipt
+    return receipt.crop((0, 0, receipt.width, min(receipt.height, bbox[3] + GUTTER)))
+
+
+def build_sheet(
+    draw_receipt: Callable[[datetime, int], Image.Image],
+    days: List[datetime],
+    seeds: List[int],
+    columns: int,
+    tile_size: Tuple[int, int],
+    label_font: ImageFont.ImageFont,
+    max_side: int = MAX_SIDE,
+) -> Tuple[Image.Image, int]:
+    """Draw receipts straight into a grid, row by row, until the next row might not fit.
+
+    draw_receipt(day, seed) returns one receipt image of at most tile_size;
+    receipts are only drawn for rows that fit, so nothing is rendered twice
+    across sheets. Returns the sheet and how many of the receipts it holds.
+    """
+    tile_width, tile_height = tile_size
+    width = GUTTER + columns * (tile_width + GUTTER)
+    rows: List[Image.Image] = []
+    height = GUTTER
+    used = 0
+    while used < len(days) and (not rows or height + LABEL_HEIGHT + tile_height + GUTTER <= max_side):
+        row = Image.new('RGB', (width, LABEL_HEIGHT + tile_height), BACKGROUND)
+        labels = ImageDraw.Draw(row)
+        row_height = 0
+        batch = list(zip(days[used:used + columns], seeds[used:used + columns]))
+        for i, (day, seed) in enumerate(batch):
+            receipt = _trim(draw_receipt(day, seed))
+            x = GUTTER + i * (tile_width + GUTTER)
+            labels.text((x, 3), f"{day:%a %d.%m.%Y}", fill=(0, 0, 0), font=label_font)
+            row.paste(receipt, (x, LABEL_HEIGHT))
+            row_height = max(row_height, receipt.height)
+        # Rows are as tall as their longest receipt
+        rows.append(row.crop((0, 0, width, LABEL_HEIGHT + row_height)))
+        height += LABEL_HEIGHT + row_height + GUTTER
+        used += len(batch)
+
+    sheet = Image.new('RGB', (width, height), BACKGROUND)
+    y = GUTTER
+    for row in rows:
+        sheet.paste(row, (0, y))
+        y += row.height + GUTTER
+    return sheet, used
+
+
+def encode_sheet(sheet: Image.Image) -> bytes:
+    buffer = BytesIO()
+    sheet.save(buffer, format='PNG')
+    return buffer.getvalue()
@@ -0,0 +1,138 @@
+import os
+import re
+import random
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+from typing import FrozenSet, Iterator, Optional, Tuple
+
+from receipt_archive import parse_period
+
+# Which days of a range get a receipt: Monday to Friday, Monday to Friday
+# without public holidays, or every day
+DAY_FILTERS = ('weekdays', 'workdays', 'all')
+DEFAULT_DAY_FILTER = 'weekdays'
+
+RANGE_PATTERN = re.compile(r'\d{4}-\d{2}(-\d{2})?(\.\.\d{4}-\d{2}(-\d{2})?)?')
+
+
+def is_range(text: str) -> bool:
+    """Whether the text after 'food ' starts with a period like 2026-01-01..2026-06-30"""
+    return RANGE_PATTERN.match(text.strip()) is not None
+
+
+def parse_range(text: str) -> Tuple[date, date, str]:
+    """Parse '2026-01-01..2026-06-30 [weekdays|workdays|all]' into (start, end, day filter)"""
+    period, _, day_filter = text.strip().partition(' ')
+    start, end = parse_period(period)
+    day_filter = day_filter.strip() or DEFAULT_DAY_FILTER
+    if day_filter not in DAY_FILTERS:
+        raise ValueError(f"Unknown day filter: {day_filter}")
+    return start, end, day_filter
+
+
+def range_key(start: date, end: date, day_filter: str) -> str:
+    """Job key of a range request; parse_range(key[5:]) gives the range back"""
+    return f"food {start.isoformat()}..{end.isoformat()} {day_filter}"
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=64)
+def public_holidays(year: int) -> FrozenSet[date]:
+    """Public holidays observed in all of Germany"""
+    easter = easter_sunday(year)
+    return frozenset({
+        date(year, 1, 1),
+        easter - timedelta(days=2),
+        easter + timedelta(days=1),
+        date(year, 5, 1),
+        easter + timedelta(days=39),
+        easter + timedelta(days=50),
+        date(year, 10, 3),
+        date(year, 12, 25),
+        date(year, 12, 26),
+    })
+
+
+def extra_holidays_from_env() -> FrozenSet[date]:
+    """Additional days off from HOLIDAYS, e.g. '2026-12-24,2026-12-31' for regional holidays"""
+    return frozenset(
+        datetime.strptime(day.strip(), '%Y-%m-%d').date()
+        for day in os.getenv('HOLIDAYS', '').split(',') if day.strip()
+    )
+
+
+def iter_days(
+    start: date,
+    end: date,
+    day_filter: str = DEFAULT_DAY_FILTER,
+    extra_holidays: FrozenSet[date] = frozenset(),
+) -> Iterator[datetime]:
+    """The days from start to end (inclusive) that pass the filter, generated one at a time"""
+    day = start
+    while day <= end:
+        if day_filter == 'all' or day.weekday() < 5 and not (
+            day_filter == 'workdays' and (day in public_holidays(day.year) or day in extra_holidays)
+        ):
+            yield datetime(day.year, day.month, day.day)
+        if day == end:
+            # Stepping past date.max would overflow
+            break
+        day += timedelta(days=1)
+
+
+def count_days(
+    start: date,
+    end: date,
+    day_filter: str = DEFAULT_DAY_FILTER,
+    extra_holidays: FrozenSet[date] = frozenset(),
+    limit: Optional[int] = None,
+) -> int:
+    """How many days iter_days yields, counting at most limit + 1"""
+    days = iter_days(start, end, day_filter, extra_holidays)
+    if limit is not None:
+        days = islice(days, limit + 1)
+    return sum(1 for _ in days)
+
+
+def seed_for(job_seed: int, day: datetime) -> int:
+    """Receipt seed of a day in a range job, so the job does not have to store one per day"""
+    return random.Random(f"{job_seed}:{day:%Y-%m-%d}").getrandbits(32)
+
+
+class ThroughputBudget:
+    """Caps range requests at what the bot can deliver within a time budget.
+
+    The delivery rate is a moving average of the receipts per second
+    measured on range chunks, starting from initial_rate, so the cap
+    follows the renderer, the upload speed and the load on the bot.
+    """
+
+    def __init__(self, seconds: float, initial_rate: float = 1.0, smoothing: float = 0.2):
+        self.seconds = seconds
+        self.rate = initial_rate
+        self.smoothing = smoothing
+
+    def observe(self, receipts: int, seconds: float) -> None:
+        if receipts and seconds > 0:
+            self.rate += self.smoothing * (receipts / seconds - self.rate)
+
+    def max_receipts(self) -> int:
+        return max(1, int(self.seconds * self.rate))
+
+    def estimate_seconds(self, receipts: int) -> float:
+        return receipts / self.rate
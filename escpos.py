@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+ESC/POS output for thermal printers
+Encodes a receipt as a printer command stream in text mode, so printing it
+needs no rendering at all; only the logo is a (cached) bitmap, and the TSE
+QR code is encoded by the printer.
+
+python escpos.py [--date 2026-03-02] [--seed 42] [--no-logo] PRINTER
+PRINTER is tcp://host[:9100], serial:/dev/ttyUSB0[?baudrate=19200] or a file path
+"""
+
+import os
+import sys
+import socket
+import argparse
+import functools
+from io import BytesIO
+from datetime import datetime
+from typing import Any, Dict
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image, ImageOps
+
+from qr_code import QUIET_ZONE
+from receipt_layout import QR_MODULE, draw_receipt
+
+ESC, GS = b'\x1b', b'\x1d'
+INIT = ESC + b'@'
+# Code page 858 (CP850 with the euro sign) covers the German umlauts
+CODE_PAGE = ESC + b't\x13'
+ALIGN_LEFT, ALIGN_CENTER = ESC + b'a\x00', ESC + b'a\x01'
+BOLD_ON, BOLD_OFF = ESC + b'E\x01', ESC + b'E\x00'
+# Feed to the cutter, then partial cut
+CUT = GS + b'V\x42\x00'
+
+# Layout units are the PIL receipt's 300 across; an 80 mm printer has 576 dots across
+DOTS_PER_UNIT = 576 / 300
+LOGO_WIDTH_DOTS = 256
+DEFAULT_COLUMNS = 48
+
+
+def _raster(image: Image.Image) -> bytes:
+    """GS v 0 raster bit image command for a 1-bit image (1 = black dot)"""
+    width_bytes = (image.width + 7) // 8
+    header = GS + b'v0\x00' + bytes((width_bytes % 256, width_bytes // 256, image.height % 256, image.height // 256))
+    return header + image.tobytes()
+
+
+def qr_commands(payload: bytes, module_dots: int) -> bytes:
+    """GS ( k commands printing a model 2 QR code at error correction level M"""
+    def command(function: int, parameters: bytes) -> bytes:
+        length = len(parameters) + 2
+        return GS + b'(k' + bytes((length % 256, length // 256, 49, function)) + parameters
+
+    return (
+        command(65, b'2\x00')  # model 2
+        + command(67, bytes((module_dots,)))
+        + command(69, b'1')  # level M
+        + command(80, b'0' + payload)  # store the data
+        + command(81, b'0')  # print it
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def logo_raster(width_dots: int = LOGO_WIDTH_DOTS) -> bytes:
+    """The REWE logo, dithered to 1 bit and encoded once per width"""
+    from svg_receipt import LOGO_PATH, LOGO_VIEWBOX, rasterizer_available, rasterize
+
+    _, _, box_width, box_height = (float(value) for value in LOGO_VIEWBOX.split())
+    height = round(width_dots * box_height / box_width)
+    available, _ = rasterizer_available()
+    if available:
+        with open(LOGO_PATH, encoding='utf-8') as f:
+            svg = f.read().replace('viewBox="0 0 24 24"', f'viewBox="{LOGO_VIEWBOX}"')
+        logo = Image.open(BytesIO(rasterize(svg, width_dots)))
+        background = Image.new('RGBA', logo.size, (255, 255, 255, 255))
+        logo = Image.alpha_composite(background, logo.convert('RGBA')).convert('L')
+    else:
+        from PIL import ImageDraw
+        from main_simple import FontManager
+        logo = Image.new('L', (width_dots, height), 255)
+        draw = ImageDraw.Draw(logo)
+        font = FontManager.get_logo_font(int(height * 0.9))
+        text_width = draw.textlength("REWE", font=font)
+        draw.text(((width_dots - text_width) // 2, 0), "REWE", fill=0, font=font)
+
+    # Pad to whole bytes, invert so ink is 1, Floyd-Steinberg dither to 1 bit
+    padded = Image.new('L', ((logo.width + 7) // 8 * 8, logo.height), 255)
+    padded.paste(logo, (0, 0))
+    return _raster(ImageOps.invert(padded).convert('1'))
+
+
+class EscPosCanvas:
+    """Encodes draw_receipt() calls as ESC/POS commands in text mode"""
+
+    def __init__(self, columns: int = DEFAULT_COLUMNS, logo: bool = True):
+        self.columns = columns
+        self.with_logo = logo
+        self.out = bytearray(INIT + CODE_PAGE)
+        self._center = False
+        self._bold = False
+
+    def _style(self, center: bool, bold: bool) -> None:
+        # Only emit commands when the style changes
+        if center != self._center:
+            self.out += ALIGN_CENTER if center else ALIGN_LEFT
+            self._center = center
+        if bold != self._bold:
+            self.out += BOLD_ON if bold else BOLD_OFF
+            self._bold = bold
+
+    def _line(self, text: str) -> None:
+        self.out += text.encode('cp858', errors='replace') + b'\n'
+
+    def text(self, text: str, x: float = 5, center: bool = False, bold: bool = False) -> None:
+        self._style(center, bold)
+        self._line(text if center else text[:self.columns])
+
+    def item(self, name: str, price: str) -> None:
+        self._style(False, False)
+        width = self.columns - len(price) - 1
+        self._line(f"{name[:width].ljust(width)} {price}")
+
+    def gap(self, height: float) -> None:
+        self.out += ESC + b'J' + bytes((min(255, round(height * DOTS_PER_UNIT)),))
+
+    def logo(self) -> None:
+        if self.with_logo:
+            self._style(True, False)
+            self.out += logo_raster()
+
+    def qr(self, payload: str) -> None:
+        # The printer encodes the code itself, so the stream stays text sized
+        self._style(True, False)
+        self.gap(QUIET_ZONE * QR_MODULE)
+        self.out += qr_commands(payload.encode('ascii'), round(QR_MODULE * DOTS_PER_UNIT))
+        self.gap(QUIET_ZONE * QR_MODULE)
+
+    def finish(self) -> bytes:
+        self._style(False, False)
+        self.out += ESC + b'd\x04' + CUT
+        return bytes(self.out)
+
+
+def encode_receipt(data: Dict[str, Any], columns: int = DEFAULT_COLUMNS, logo: bool = True) -> bytes:
+    """ESC/POS command stream for generate_receipt_data() output"""
+    canvas = EscPosCanvas(columns, logo)
+    draw_receipt(data, canvas)
+    return canvas.finish()
+
+
+def send_to_printer(data: bytes, target: str, timeout: float = 10.0) -> None:
+    """Write a command stream to tcp://host[:port], serial:/dev/...[?baudrate=N] or a file"""
+    url = urlsplit(target)
+    if url.scheme == 'tcp':
+        # Raw printing port (JetDirect)
+        with socket.create_connection((url.hostname, url.port or 9100), timeout=timeout) as sock:
+            sock.sendall(data)
+    elif url.scheme == 'serial':
+        baudrate = int(parse_qs(url.query).get('baudrate', ['19200'])[0])
+        try:
+            import serial
+        except ImportError:
+            # Without pyserial, write to the device as configured (e.g. with stty)
+            with open(url.path, 'wb') as device:
+                device.write(data)
+            return
+        with serial.Serial(url.path, baudrate=baudrate, timeout=timeout) as port:
+            port.write(data)
+            port.flush()
+    else:
+        with open(target, 'wb') as f:
+            f.write(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Print a receipt on an ESC/POS thermal printer")
+    parser.add_argument('printer', nargs='?', default=os.getenv('ESCPOS_PRINTER', 'receipt.bin'),
+                        help="tcp://host[:port], serial:/dev/ttyUSB0[?baudrate=19200] or a file (default: ESCPOS_PRINTER)")
+    parser.add_argument('--date', default=datetime.now().strftime('%Y-%m-%d'), help="receipt date, YYYY-MM-DD")
+    parser.add_argument('--seed', type=int, help="seed for a reproducible receipt")
+    parser.add_argument('--columns', type=int, default=int(os.getenv('ESCPOS_COLUMNS', str(DEFAULT_COLUMNS))))
+    parser.add_argument('--no-logo', action='store_true', help="text only, no logo bitmap")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from main_simple import FoodReceiptGenerator
+    data = FoodReceiptGenerator().create_receipt_escpos(
+        datetime.strptime(args.date, '%Y-%m-%d'), args.seed, columns=args.columns, logo=not args.no_logo,
+    )
+    send_to_printer(data, args.printer)
+    print(f"Sent {len(data)} bytes to {args.printer}")
+
+
+if __name__ == "__main__":
+    main()
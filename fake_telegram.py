@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Telegram Bot API, for load tests without Telegram
+Serves getMe, getUpdates (long polling), sendMessage, sendPhoto and
+sendMediaGroup; anything else succeeds with `true`. Latency, errors and
+429 RetryAfter responses can be injected per request.
+
+Point the bot at it with TELEGRAM_BASE_URL=http://127.0.0.1:8089/bot
+"""
+
+import json
+import time
+import random
+import asyncio
+import logging
+import itertools
+from typing import Any, Callable, Dict, List, Optional
+
+import tornado.netutil
+import tornado.web
+from tornado.httpserver import HTTPServer
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {'id': 1000000, 'is_bot': True, 'first_name': 'Receipt Bot', 'username': 'receipt_load_test_bot'}
+SEND_METHODS = ('sendMessage', 'sendPhoto', 'sendMediaGroup')
+
+
+class FakeTelegram:
+    """In-memory Bot API: users' messages go in with send_text(), the bot's replies come out to on_send.
+
+    latency (plus up to jitter) delays every response; of the send* calls,
+    error_rate fail with 500 and retry_after_rate are refused with 429 and
+    retry_after seconds, as Telegram does when flood limits are hit.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.on_send: Optional[Callable[[str, Dict[str, Any], float], None]] = None
+        self.calls: Dict[str, int] = {}
+        self.injected = {'errors': 0, 'retry_after': 0}
+        self._updates: List[Dict[str, Any]] = []
+        self._new_update = asyncio.Event()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._server: Optional[HTTPServer] = None
+        self.port = 0
+
+    def send_text(self, user_id: int, text: str) -> Dict[str, Any]:
+        """Queue a private message from a user for the bot's next getUpdates"""
+        user = {'id': user_id, 'is_bot': False, 'first_name': f"User {user_id}"}
+        update = {
+            'update_id': next(self._update_ids),
+            'message': {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private', 'first_name': user['first_name']},
+                'from': user,
+                'text': text,
+            },
+        }
+        if text.startswith('/'):
+            command = text.split()[0]
+            update['message']['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+        self._updates.append(update)
+        self._new_update.set()
+        return update
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start serving and return the base_url for the bot"""
+        app = tornado.web.Application([(r"/bot([^/]+)/(\w+)", _MethodHandler, {'api': self})])
+        self._server = HTTPServer(app, idle_connection_timeout=75)
+        sockets = tornado.netutil.bind_sockets(port, address=host)
+        self._server.add_sockets(sockets)
+        self.port = sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}/bot"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.stop()
+        # Let a pending long poll return instead of being cancelled on shutdown
+        self._new_update.set()
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle one Bot API call and return the response envelope"""
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if method == 'getUpdates':
+            return {'ok': True, 'result': await self._get_updates(params)}
+
+        delay = self.latency + (self.rng.random() * self.jitter if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if method in SEND_METHODS:
+            roll = self.rng.random()
+            if roll < self.retry_after_rate:
+                self.injected['retry_after'] += 1
+                return {
+                    'ok': False, 'error_code': 429,
+                    'description': f"Too Many Requests: retry after {self.retry_after}",
+                    'parameters': {'retry_after': self.retry_after},
+                }
+            if roll < self.retry_after_rate + self.error_rate:
+                self.injected['errors'] += 1
+                return {'ok': False, 'error_code': 500, 'description': "Internal Server Error"}
+
+        if method == 'getMe':
+            result: Any = BOT_USER
+        elif method == 'sendMessage':
+            result = self._message(params, text=params.get('text', ''))
+        elif method == 'sendPhoto':
+            result = self._message(params, caption=params.get('caption'), photo=self._photo(params.get('photo')))
+        elif method == 'sendMediaGroup':
+            result = [
+                self._message(params, caption=media.get('caption'), photo=self._photo(media.get('media')))
+                for media in params.get('media', [])
+            ]
+        else:
+            result = True
+        if method in SEND_METHODS and self.on_send is not None:
+            self.on_send(method, params, time.monotonic())
+        return {'ok': True, 'result': result}
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get('offset') or 0)
+        # Confirmed updates are dropped, as Telegram does
+        self._updates = [update for update in self._updates if update['update_id'] >= offset]
+        if not self._updates:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), timeout=float(params.get('timeout') or 0))
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:int(params.get('limit') or 100)]
+
+    def _message(self, params: Dict[str, Any], **content: Any) -> Dict[str, Any]:
+        chat_id = params['chat_id']
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER,
+        }
+        message.update({key: value for key, value in content.items() if value is not None})
+        return message
+
+    def _photo(self, photo: Any) -> List[Dict[str, Any]]:
+        # A file_id sent back is kept, an upload gets a new one
+        file_id = photo if isinstance(photo, str) and not photo.startswith('attach://') else f"photo-{next(self._file_ids)}"
+        return [{'file_id': file_id, 'file_unique_id': file_id, 'width': 300, 'height': 900}]
+
+
+class _MethodHandler(tornado.web.RequestHandler):
+    def initialize(self, api: FakeTelegram) -> None:
+        self.api = api
+
+    async def post(self, token: str, method: str) -> None:
+        params: Dict[str, Any] = {}
+        for name, values in self.request.body_arguments.items():
+            value = values[0].decode('utf-8')
+            # python-telegram-bot sends non-string parameters JSON encoded
+            try:
+                params[name] = json.loads(value)
+            except ValueError:
+                params[name] = value
+        response = await self.api.call(method, params)
+        self.set_status(200 if response['ok'] else response['error_code'])
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(response))
+
+    get = post
+
+    def log_exception(self, typ, value, tb) -> None:
+        logger.error(f"Fake Bot API error: {value}")
@@ -0,0 +1,145 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag by how late a periodic wake-up fires.
+
+    The heartbeat is also read from other threads: if the loop is blocked
+    (e.g. by a render running on it), the time since the last wake-up grows
+    and is reported as lag even though the monitor itself cannot run.
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 120):
+        self.interval = interval
+        self.lag = 0.0
+        self.heartbeat = time.monotonic()
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name='loop-lag-monitor')
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - start - self.interval)
+            self._recent.append(self.lag)
+            self.heartbeat = time.monotonic()
+
+    def current_lag(self) -> float:
+        """Lag of the last wake-up, or how overdue the next one is if the loop is stuck"""
+        overdue = time.monotonic() - self.heartbeat - self.interval
+        return max(self.lag, overdue)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'lag_ms': round(self.current_lag() * 1000, 1),
+            'max_recent_lag_ms': round(max(self._recent, default=0.0) * 1000, 1),
+        }
+
+
+class HealthServer:
+    """Tiny HTTP server on its own thread for liveness and readiness checks.
+
+    GET /live   200 while the event loop keeps up (lag below max_lag)
+    GET /ready  200 when live and the application reports itself ready
+    GET /health the full status as JSON (200 or 503 like /ready)
+
+    It runs outside the event loop on purpose, so a blocked loop is reported
+    as unhealthy instead of simply not answering.
+    """
+
+    def __init__(
+        self,
+        monitor: LoopLagMonitor,
+        snapshot: Callable[[], Awaitable[Dict[str, Any]]],
+        host: str = '127.0.0.1',
+        port: int = 8081,
+        max_lag: float = 5.0,
+    ):
+        self.monitor = monitor
+        self.snapshot = snapshot
+        self.max_lag = max_lag
+        self.ready = False
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        """Start serving; call from the event loop whose state the snapshot reads"""
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._server.serve_forever, name='health-server', daemon=True)
+        self._thread.start()
+        logger.info(f"Health endpoint on http://{self._server.server_address[0]}:{self.port}/health")
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def status(self, path: str) -> Tuple[int, Dict[str, Any]]:
+        live = self.monitor.current_lag() <= self.max_lag
+        body = {'live': live, 'ready': live and self.ready, 'event_loop': self.monitor.stats()}
+        if path == '/live':
+            return (200 if live else 503), body
+        if path == '/health':
+            try:
+                body.update(self._collect_snapshot())
+            except concurrent.futures.TimeoutError:
+                body['snapshot_error'] = "event loop did not respond"
+            except Exception as e:
+                body['snapshot_error'] = str(e)
+        return (200 if body['ready'] else 503), body
+
+    def _collect_snapshot(self, timeout: float = 1.0) -> Dict[str, Any]:
+        # Read application state on its own loop rather than from this thread
+        future = asyncio.run_coroutine_threadsafe(self.snapshot(), self._loop)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/live', '/ready', '/health'):
+                    self.send_error(404)
+                    return
+                code, body = server.status(self.path)
+                payload = json.dumps(body, default=str).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                # Health checks every few seconds would drown the log
+                pass
+
+        return Handler
@@ -0,0 +1,199 @@
+import os
+import asyncio
+import logging
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+import httpx
+import telegram
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from telegram.request import HTTPXRequest, RequestData
+
+logger = logging.getLogger(__name__)
+
+# The pool limits and connection tracing hook into HTTPXRequest._build_client()
+# and _client_kwargs, which are not public API. They are used only with the
+# release pinned in requirements.txt; any other release gets its stock client.
+PINNED_PTB_VERSION = '20.8'
+
+
+class PoolMetrics:
+    """Counters describing how a connection pool is used"""
+
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated = 0  # requests that found every connection busy
+        self.pool_timeouts = 0
+        self.new_connections = 0
+        self.sent = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'pool_size': self.pool_size,
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'saturated': self.saturated,
+            'pool_timeouts': self.pool_timeouts,
+            'new_connections': self.new_connections,
+            'reused_connections': max(0, self.sent - self.new_connections),
+        }
+
+
+class PooledHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest with a tunable keep-alive pool, upload timeouts and metrics.
+
+    python-telegram-bot hard-codes a 20s write timeout for uploads and keeps
+    idle connections for httpx's default 5s; both are configurable here so
+    parallel photo uploads reuse warm connections instead of reconnecting.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connection_pool_size: int,
+        keepalive_expiry: float = 30.0,
+        media_write_timeout: float = 60.0,
+        **kwargs: Any,
+    ):
+        # _build_client() runs inside HTTPXRequest.__init__, so set these first
+        self.name = name
+        self.keepalive_expiry = keepalive_expiry
+        self.media_write_timeout = media_write_timeout
+        self.metrics = PoolMetrics(connection_pool_size)
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+
+    def _build_client(self) -> httpx.AsyncClient:
+        if telegram.__version__ != PINNED_PTB_VERSION:
+            logger.warning(
+                f"python-telegram-bot {telegram.__version__} is not the pinned {PINNED_PTB_VERSION}; "
+                f"HTTP pool '{self.name}' uses its default keep-alive and reports no connection counts"
+            )
+            return super()._build_client()
+        pool_size = self.metrics.pool_size
+        self._client_kwargs['limits'] = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        self._client_kwargs['event_hooks'] = {'request': [self._attach_trace]}
+        return httpx.AsyncClient(**self._client_kwargs)
+
+    async def _attach_trace(self, request: httpx.Request) -> None:
+        request.extensions['trace'] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore reports a TCP connect only when no idle pooled connection was usable
+        if event_name == 'connection.connect_tcp.complete':
+            self.metrics.new_connections += 1
+        elif event_name in ('http11.send_request_headers.started', 'http2.send_request_headers.started'):
+            self.metrics.sent += 1
+
+    async def shutdown(self) -> None:
+        logger.info(f"HTTP pool '{self.name}' stats: {self.metrics.snapshot()}")
+        await super().shutdown()
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=HTTPXRequest.DEFAULT_NONE,
+        write_timeout=HTTPXRequest.DEFAULT_NONE,
+        connect_timeout=HTTPXRequest.DEFAULT_NONE,
+        pool_timeout=HTTPXRequest.DEFAULT_NONE,
+    ) -> Tuple[int, bytes]:
+        if write_timeout is HTTPXRequest.DEFAULT_NONE and request_data and request_data.multipart_data:
+            write_timeout = self.media_write_timeout
+
+        metrics = self.metrics
+        metrics.requests += 1
+        if metrics.in_flight >= metrics.pool_size:
+            metrics.saturated += 1
+        metrics.in_flight += 1
+        metrics.peak_in_flight = max(metrics.peak_in_flight, metrics.in_flight)
+        try:
+            return await super().do_request(
+                url,
+                method,
+                request_data=request_data,
+                read_timeout=read_timeout,
+                write_timeout=write_timeout,
+                connect_timeout=connect_timeout,
+                pool_timeout=pool_timeout,
+            )
+        except Exception as e:
+            if 'Pool timeout' in str(e):
+                metrics.pool_timeouts += 1
+            raise
+        finally:
+            metrics.in_flight -= 1
+
+
+class RetryAfterLimiter(BaseRateLimiter):
+    """Waits out Telegram's flood control (429 RetryAfter) and repeats the call.
+
+    Without it a single 429 fails the receipt, or a whole job if it hits the
+    final message; it does no rate limiting of its own.
+    """
+
+    def __init__(self, max_retries: int = 3):
+        self.max_retries = max_retries
+        self.retries = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        max_retries = self.max_retries if rate_limit_args is None else rate_limit_args
+        for attempt in range(max_retries + 1):
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == max_retries:
+                    raise
+                self.retries += 1
+                logger.warning(f"{endpoint}: flood control, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+
+
+def build_requests() -> Tuple[PooledHTTPXRequest, PooledHTTPXRequest]:
+    """Build the Bot API and getUpdates request backends from the environment"""
+    http_version = os.getenv('HTTP_VERSION', '1.1')
+    keepalive_expiry = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+    api_request = PooledHTTPXRequest(
+        name='api',
+        connection_pool_size=int(os.getenv('HTTP_POOL_SIZE', '16')),
+        keepalive_expiry=keepalive_expiry,
+        media_write_timeout=float(os.getenv('HTTP_UPLOAD_WRITE_TIMEOUT', '60')),
+        read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', '10')),
+        write_timeout=float(os.getenv('HTTP_WRITE_TIMEOUT', '10')),
+        connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+        pool_timeout=float(os.getenv('HTTP_POOL_TIMEOUT', '10')),
+        http_version=http_version,
+    )
+    # getUpdates holds one long-poll connection; keep it off the API pool
+    updates_request = PooledHTTPXRequest(
+        name='get_updates',
+        connection_pool_size=1,
+        keepalive_expiry=keepalive_expiry,
+        read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', '10')),
+        connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+        pool_timeout=float(os.getenv('HTTP_POOL_TIMEOUT', '10')),
+        http_version=http_version,
+    )
+    return api_request, updates_request
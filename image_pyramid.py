@@ -0,0 +1,93 @@
+"""
+Resolution pyramids of rendered receipts
+One rasterization at full resolution serves every output size: each lower
+level is reduced from the level above it the first time it is needed, and
+every level is PNG-encoded at most once.
+"""
+
+import threading
+from io import BytesIO
+from typing import Callable, Dict, Optional
+
+from PIL import Image
+
+FULL = 'full'
+
+
+def reduce_image(image: Image.Image, factor: int) -> Image.Image:
+    """Shrink by an integer factor, keeping thin strokes of text legible.
+
+    A cheap box-filter reduce() takes the image to twice the target size and
+    LANCZOS does the rest, which keeps edges sharper than box-filtering all the
+    way. Sizes round up, as with reduce().
+    """
+    size = (-(-image.width // factor), -(-image.height // factor))
+    if factor >= 4:
+        image = image.reduce(factor // 2)
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+class ImagePyramid:
+    """Levels of one image, from FULL down through reductions in the given order.
+
+    reductions maps each lower level to its reduction factor relative to the
+    level before it, e.g. {'preview': 4, 'thumbnail': 3}. An effect for a level
+    is applied after reducing to it, and the levels below are reduced from the
+    result. dpi is the resolution of FULL, stored in the PNGs.
+    """
+
+    def __init__(
+        self,
+        full: Image.Image,
+        reductions: Dict[str, int],
+        dpi: int = 300,
+        effects: Optional[Dict[str, Callable[[Image.Image], Image.Image]]] = None,
+    ):
+        self.levels = (FULL,) + tuple(reductions)
+        self._factors = dict(reductions, **{FULL: 1})
+        self._effects = effects or {}
+        self._dpi = dpi
+        self._images: Dict[str, Image.Image] = {FULL: full}
+        self._pngs: Dict[str, bytes] = {}
+        # Renders run in worker threads; a level is built once even if two ask for it
+        self._lock = threading.RLock()
+
+    def image(self, level: str) -> Image.Image:
+        """The level as an image, reduced from the level above on first use"""
+        if level not in self._factors:
+            raise KeyError(f"Unknown level {level!r}, expected one of {', '.join(self.levels)}")
+        with self._lock:
+            if level not in self._images:
+                parent = self.image(self.levels[self.levels.index(level) - 1])
+                image = reduce_image(parent, self._factors[level])
+                if level in self._effects:
+                    image = self._effects[level](image)
+                self._images[level] = image
+            return self._images[level]
+
+    def dpi(self, level: str) -> int:
+        index = self.levels.index(level)
+        scale = 1
+        for name in self.levels[1:index + 1]:
+            scale *= self._factors[name]
+        return round(self._dpi / scale)
+
+    def png(self, level: str) -> bytes:
+        """The level as PNG, encoded on first use"""
+        with self._lock:
+            if level not in self._pngs:
+                buffer = BytesIO()
+                dpi = self.dpi(level)
+                self.image(level).save(buffer, format='PNG', optimize=True, dpi=(dpi, dpi))
+                self._pngs[level] = buffer.getvalue()
+            return self._pngs[level]
+
+    def nbytes(self) -> int:
+        """Memory held by the levels and PNGs built so far"""
+        with self._lock:
+            pixels = sum(image.width * image.height * len(image.getbands()) for image in self._images.values())
+            return pixels + sum(len(png) for png in self._pngs.values())
+
+    def encoded(self) -> Dict[str, int]:
+        """Sizes of the PNGs encoded so far"""
+        return {level: len(png) for level, png in self._pngs.items()}
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """SQLite-backed record of receipt jobs so they survive restarts.
+
+    A job stores everything needed to reproduce its receipts (chat, dates and
+    per-receipt seeds) plus how many receipts were already delivered. Rendered
+    but not yet delivered receipts are checkpointed so a restart between render
+    and upload does not pay for the render again.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                chat_id INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                dates TEXT NOT NULL,
+                seeds TEXT NOT NULL,
+                delivered INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'running',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+            CREATE TABLE IF NOT EXISTS renders (
+                job_id INTEGER NOT NULL,
+                idx INTEGER NOT NULL,
+                png BLOB NOT NULL,
+                PRIMARY KEY (job_id, idx)
+            );
+        """)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def create_job(self, user_id: int, chat_id: int, key: str, dates: List[datetime], seeds: List[int]) -> Dict[str, Any]:
+        """Persist a new job and return its record"""
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO jobs (user_id, chat_id, key, dates, seeds, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_id, chat_id, key, json.dumps([day.isoformat() for day in dates]), json.dumps(seeds), now, now),
+        )
+        self.conn.commit()
+        return self.get_job(cursor.lastrowid)
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def unfinished_jobs(self) -> List[Dict[str, Any]]:
+        """Jobs that were still running when the process stopped, oldest first"""
+        rows = self.conn.execute("SELECT * FROM jobs WHERE status = 'running' ORDER BY id").fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def save_render(self, job_id: int, idx: int, png_data: bytes) -> None:
+        """Checkpoint a rendered receipt until it has been delivered"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO renders (job_id, idx, png) VALUES (?, ?, ?)",
+            (job_id, idx, png_data),
+        )
+        self.conn.commit()
+
+    def load_render(self, job_id: int, idx: int) -> Optional[bytes]:
+        row = self.conn.execute("SELECT png FROM renders WHERE job_id = ? AND idx = ?", (job_id, idx)).fetchone()
+        return row['png'] if row else None
+
+    def mark_delivered(self, job_id: int, idx: int) -> None:
+        """Record that receipt idx was sent, so a resume starts after it"""
+        self.conn.execute("DELETE FROM renders WHERE job_id = ? AND idx = ?", (job_id, idx))
+        self.conn.execute(
+            "UPDATE jobs SET delivered = ?, updated_at = ? WHERE id = ?",
+            (idx + 1, time.time(), job_id),
+        )
+        self.conn.commit()
+
+    def finish_job(self, job_id: int, status: str = 'done') -> None:
+        self.conn.execute("DELETE FROM renders WHERE job_id = ?", (job_id,))
+        self.conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), job_id))
+        self.conn.commit()
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'chat_id': row['chat_id'],
+            'key': row['key'],
+            'dates': [datetime.fromisoformat(day) for day in json.loads(row['dates'])],
+            'seeds': json.loads(row['seeds']),
+            'delivered': row['delivered'],
+            'status': row['status'],
+        }
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the bot against the fake Bot API in fake_telegram.py
+Starts main_simple.py as a separate process pointed at the fake server, lets
+many simulated users send "food N" at once and reports throughput, time to
+first receipt, end-to-end latency percentiles and the bot's resource usage.
+
+python load_test.py [--users 50] [--days 3] [--rounds 1] [--latency 0.05] [--retry-after-rate 0.01]
+"""
+
+import os
+import sys
+import time
+import json
+import math
+import asyncio
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from fake_telegram import FakeTelegram
+
+FIRST_USER_ID = 100001
+DONE_TEXT = "All receipts have been generated!"
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, math.ceil(pct / 100 * len(ordered)))) - 1]
+
+
+class ProcessSampler:
+    """CPU time and resident memory of a process, sampled from /proc (Linux)"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak_rss = 0
+        self.cpu_start = self._cpu_seconds()
+        self.cpu_seconds = 0.0
+
+    def _cpu_seconds(self) -> float:
+        try:
+            with open(f'/proc/{self.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            return self.cpu_seconds
+        # utime and stime, fields 14 and 15 of stat
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    def sample(self) -> None:
+        try:
+            with open(f'/proc/{self.pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        self.peak_rss = max(self.peak_rss, int(line.split()[1]) * 1024)
+        except OSError:
+            pass
+        self.cpu_seconds = self._cpu_seconds() - (self.cpu_start or 0)
+
+
+class LoadTest:
+    """Simulated users, each sending 'food N' and waiting for the last receipt before the next round"""
+
+    def __init__(self, api: FakeTelegram, users: int, days: int, rounds: int, timeout: float):
+        self.api = api
+        self.user_ids = [FIRST_USER_ID + i for i in range(users)]
+        self.days = days
+        self.rounds = rounds
+        self.timeout = timeout
+        self.requests: List[Dict[str, Any]] = []
+        self._current: Dict[int, Dict[str, Any]] = {}
+        api.on_send = self._on_send
+
+    def _on_send(self, method: str, params: Dict[str, Any], now: float) -> None:
+        request = self._current.get(params.get('chat_id'))
+        if request is None:
+            return
+        if method in ('sendPhoto', 'sendMediaGroup'):
+            request['receipts'] += len(params.get('media', [])) or 1
+            if request['first_receipt'] is None:
+                request['first_receipt'] = now - request['sent']
+        elif str(params.get('text', '')).startswith('Error'):
+            request['errors'] += 1
+        elif params.get('text') == DONE_TEXT:
+            request['done'] = now - request['sent']
+            request['finished'].set()
+
+    async def _user(self, user_id: int) -> None:
+        for _ in range(self.rounds):
+            request = {
+                'user_id': user_id, 'sent': time.monotonic(), 'first_receipt': None, 'done': None,
+                'receipts': 0, 'errors': 0, 'finished': asyncio.Event(),
+            }
+            self._current[user_id] = request
+            self.requests.append(request)
+            self.api.send_text(user_id, f"food {self.days}")
+            try:
+                await asyncio.wait_for(request['finished'].wait(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                return
+
+    async def run(self) -> float:
+        """Run every user to completion, returns the wall time"""
+        start = time.monotonic()
+        await asyncio.gather(*(self._user(user_id) for user_id in self.user_ids))
+        return time.monotonic() - start
+
+    def report(self, wall_time: float, sampler: ProcessSampler) -> Dict[str, Any]:
+        completed = [request for request in self.requests if request['done'] is not None]
+        first = [request['first_receipt'] for request in self.requests if request['first_receipt'] is not None]
+        latency = [request['done'] for request in completed]
+        receipts = sum(request['receipts'] for request in self.requests)
+
+        def summary(values: List[float]) -> Dict[str, Optional[float]]:
+            return {f'p{pct}': percentile(values, pct) for pct in (50, 95, 99)}
+
+        return {
+            'users': len(self.user_ids),
+            'requests': len(self.requests),
+            'completed': len(completed),
+            'timed_out': len(self.requests) - len(completed),
+            'receipts': receipts,
+            'error_replies': sum(request['errors'] for request in self.requests),
+            'wall_time_s': wall_time,
+            'requests_per_s': len(completed) / wall_time if wall_time else 0.0,
+            'receipts_per_s': receipts / wall_time if wall_time else 0.0,
+            'time_to_first_receipt_s': summary(first),
+            'end_to_end_s': summary(latency),
+            'bot_cpu_s': sampler.cpu_seconds,
+            'bot_cpu_percent': 100 * sampler.cpu_seconds / wall_time if wall_time else 0.0,
+            'bot_peak_rss_mb': sampler.peak_rss / 2**20,
+            'api_calls': dict(self.api.calls),
+            'injected': dict(self.api.injected),
+        }
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    api = FakeTelegram(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        retry_after_rate=args.retry_after_rate, retry_after=args.retry_after, seed=args.seed,
+    )
+    base_url = await api.start()
+    test = LoadTest(api, args.users, args.days, args.rounds, args.timeout)
+    workdir = tempfile.mkdtemp(prefix='receipt-load-')
+    env = dict(
+        os.environ,
+        BOT_TOKEN='123456:LOADTEST',
+        ALLOWED_USER_ID=','.join(str(user_id) for user_id in test.user_ids),
+        TELEGRAM_BASE_URL=base_url,
+        BOT_MODE='polling',
+        DATA_DIR=os.path.join(workdir, 'data'),
+        LOG_DIR=os.path.join(workdir, 'logs'),
+        HEALTH_PORT='0',
+        MAX_DAYS_BACK=str(max(args.days, int(os.getenv('MAX_DAYS_BACK', '30')))),
+    )
+    bot = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main_simple.py'),
+        env=env, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        # The bot is up once it polls for updates
+        deadline = time.monotonic() + 120
+        while not api.calls.get('getUpdates'):
+            if bot.returncode is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"The bot did not start, see the logs in {workdir}/logs")
+            await asyncio.sleep(0.1)
+
+        sampler = ProcessSampler(bot.pid)
+
+        async def sample() -> None:
+            while True:
+                sampler.sample()
+                await asyncio.sleep(0.5)
+
+        sampling = asyncio.create_task(sample())
+        wall_time = await test.run()
+        sampling.cancel()
+        sampler.sample()
+        report = test.report(wall_time, sampler)
+        report['logs'] = os.path.join(workdir, 'logs')
+        return report
+    finally:
+        if bot.returncode is None:
+            bot.terminate()
+            await bot.wait()
+        api.stop()
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    def seconds(values: Dict[str, Optional[float]]) -> str:
+        return '  '.join(f"{name} {value:.2f}s" if value is not None else f"{name} -" for name, value in values.items())
+
+    print(f"Users: {report['users']}, requests: {report['requests']} "
+          f"({report['completed']} completed, {report['timed_out']} timed out)")
+    print(f"Receipts: {report['receipts']}, error replies: {report['error_replies']}, "
+          f"injected: {report['injected']['errors']} errors, {report['injected']['retry_after']} RetryAfter")
+    print(f"Throughput: {report['requests_per_s']:.2f} requests/s, {report['receipts_per_s']:.2f} receipts/s "
+          f"over {report['wall_time_s']:.1f}s")
+    print(f"Time to first receipt: {seconds(report['time_to_first_receipt_s'])}")
+    print(f"End-to-end latency:    {seconds(report['end_to_end_s'])}")
+    print(f"Bot process: {report['bot_cpu_s']:.1f}s CPU ({report['bot_cpu_percent']:.0f}%), "
+          f"peak RSS {report['bot_peak_rss_mb']:.0f} MB")
+    print(f"API calls: {report['api_calls']}")
+    print(f"Bot logs: {report['logs']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the bot against a fake Telegram Bot API")
+    parser.add_argument('--users', type=int, default=20, help="simulated users sending at the same time")
+    parser.add_argument('--days', type=int, default=3, help="N in 'food N'")
+    parser.add_argument('--rounds', type=int, default=1, help="requests per user, each after the previous finished")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to every API response")
+    parser.add_argument('--jitter', type=float, default=0.05, help="up to this many seconds more, at random")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of send calls failing with 500")
+    parser.add_argument('--retry-after-rate', type=float, default=0.0, help="share of send calls refused with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="retry_after seconds in 429 responses")
+    parser.add_argument('--timeout', type=float, default=120.0, help="give up on a request after this many seconds")
+    parser.add_argument('--seed', type=int, help="seed for the injected latency and faults")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
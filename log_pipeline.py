@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no fork, so no worker processes to give slots
+    fcntl = None
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed via extra= and goes into the JSON line
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+# Log file as configured, before any worker slot suffix
+_log_path: Optional[str] = None
+# Lock file that reserves this process's worker slot; released when the process exits
+_slot_lock = None
+
+
+def claim_log_slot(path: str) -> str:
+    """logs/bot.log -> logs/bot.<n>.log, with n the lowest slot no live process holds.
+
+    Processes sharing one file would race on rotation, so each writes its own;
+    a worker that replaces an exited one takes over its file instead of adding
+    another. The slot is held by an flock on logs/bot.<n>.lock.
+    """
+    global _slot_lock
+    if _slot_lock is not None:
+        # Inherited from the parent; closing this copy keeps the parent's lock
+        _slot_lock.close()
+        _slot_lock = None
+    root, ext = os.path.splitext(path)
+    if fcntl is None:
+        return f"{root}.{os.getpid()}{ext}"
+    slot = 1
+    while True:
+        lock = open(f"{root}.{slot}.lock", 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            slot += 1
+            continue
+        _slot_lock = lock
+        return f"{root}.{slot}{ext}"
+
+
+def _rotating_file_handler(path: str) -> logging.handlers.RotatingFileHandler:
+    handler = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=int(float(os.getenv('LOG_MAX_MB', '10')) * 1024 * 1024),
+        backupCount=int(os.getenv('LOG_BACKUP_COUNT', '5')),
+        encoding='utf-8',
+        delay=True,
+    )
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields and traceback"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RepeatFilter(logging.Filter):
+    """Lets an identical message through once per window and counts the rest.
+
+    The first record after the window that was suppressed in between carries a
+    `repeated` count, so nothing disappears silently. Runs before a record is
+    queued, so a log storm costs a dict lookup per call instead of a write.
+    """
+
+    MAX_KEYS = 4096
+
+    def __init__(self, window: float = 60.0):
+        super().__init__()
+        self.window = window
+        self._seen: Dict[Tuple[str, int, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen[0] < self.window:
+                seen[1] += 1
+                return False
+            if seen is not None and seen[1]:
+                record.repeated = int(seen[1])
+            if len(self._seen) >= self.MAX_KEYS:
+                self._prune(now)
+            self._seen[key] = [now, 0]
+        return True
+
+    def _prune(self, now: float) -> None:
+        expired = [key for key, (since, _) in self._seen.items() if now - since >= self.window]
+        for key in expired or list(self._seen)[:self.MAX_KEYS // 2]:
+            del self._seen[key]
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records for the writer thread and drops them instead of blocking when it falls behind"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback here, but keep them separate so
+        # each writer can format them its own way
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            notice = logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"Log queue full, dropped {dropped} records",
+            })
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                self.dropped += dropped
+
+
+def configure_logging(
+    log_file: Optional[str] = 'bot.log',
+    level: Optional[str] = None,
+    log_dir: Optional[str] = None,
+    per_process: bool = False,
+) -> logging.handlers.QueueListener:
+    """Route the root logger through a queue to a background writer thread.
+
+    Console output stays human readable; the log file gets JSON lines and
+    rotates by size. Settings come from LOG_LEVEL, LOG_DIR (default logs),
+    LOG_MAX_MB, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE and LOG_REPEAT_WINDOW.
+
+    Rotation is not safe when several processes write one file, so with
+    per_process the file gets a worker slot number, and processes forked
+    later always take a slot of their own (see claim_log_slot).
+    """
+    global _listener, _log_path
+    stop_logging()
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    log_dir = log_dir or os.getenv('LOG_DIR', 'logs')
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers: List[logging.Handler] = [console]
+
+    # Add file handler if logs directory exists or can be created
+    if log_file:
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            _log_path = os.path.join(log_dir, log_file)
+            handlers.append(_rotating_file_handler(claim_log_slot(_log_path) if per_process else _log_path))
+        except (OSError, PermissionError):
+            pass  # Continue with just console logging
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(int(os.getenv('LOG_QUEUE_SIZE', '10000'))))
+    queue_handler.addFilter(RepeatFilter(float(os.getenv('LOG_REPEAT_WINDOW', '60'))))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level, logging.INFO))
+
+    # Disable httpx verbose logging
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def _restart_in_child() -> None:
+    # Forked worker processes inherit the queue handler but not the writer
+    # thread; give them their own queue and writer, and a worker slot's log
+    # file so that two processes never rotate the same file
+    global _listener
+    if _listener is None:
+        return
+    handlers = [
+        _rotating_file_handler(claim_log_slot(_log_path))
+        if isinstance(handler, logging.handlers.RotatingFileHandler) and _log_path else handler
+        for handler in _listener.handlers
+    ]
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if isinstance(handler, NonBlockingQueueHandler):
+            handler.queue = queue.Queue(handler.queue.maxsize)
+            _listener = logging.handlers.QueueListener(handler.queue, *handlers, respect_handler_level=True)
+            _listener.start()
+            return
+
+
+atexit.register(stop_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_in_child)
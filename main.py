@@ -10,10 +10,13 @@ from io import BytesIO
 
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from jinja2 import Template
 import imgkit
 from PIL import Image
 
+from catalog import cart_filters_from_env, load_catalog
+from renderers import HtmlRenderer, render_receipt_html
+from tse import generate_tse_data
+
 # Configure logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -23,101 +26,8 @@ logger = logging.getLogger(__name__)
 
 class FoodReceiptGenerator:
     def __init__(self):
-        self.possible_items = [
-            {'name': 'GURKE', 'price': 0.79, 'tax_rate': 7},
-            {'name': 'BANANEN', 'price': 1.29, 'tax_rate': 7},
-            {'name': 'REWE Bio Apfel', 'price': 2.49, 'tax_rate': 7},
-            {'name': 'Milch 1,5%', 'price': 1.19, 'tax_rate': 7},
-            {'name': 'Butter', 'price': 2.29, 'tax_rate': 7},
-            {'name': 'Brot', 'price': 2.00, 'tax_rate': 7},
-            {'name': 'Joghurt', 'price': 0.59, 'tax_rate': 7},
-            {'name': 'Vollkornbrot', 'price': 1.89, 'tax_rate': 19},
-            {'name': 'Salami', 'price': 1.99, 'tax_rate': 19},
-            {'name': 'Käse', 'price': 2.99, 'tax_rate': 19},
-            {'name': 'Energy Drink', 'price': 1.49, 'tax_rate': 19},
-            {'name': 'Kaffee Crema', 'price': 0.99, 'tax_rate': 7},
-            {'name': 'Wasser', 'price': 5.99, 'tax_rate': 19},
-        ]
-        
-        self.html_template = """
-<html>
-<head>
-  <style>
-    body { background-color: #FFF; margin: 0; padding: 0; }
-    #receipt { font-family: 'Courier New', Courier, monospace; font-size: 16px; line-height: 1.4; color: #000; background-color: #FFF; padding: 25px; width: 450px; }
-    .logo { width: 200px; margin: 0 auto 20px auto; display: block; }
-    .center { text-align: center; }
-    pre { font-family: 'Courier New', Courier, monospace; font-size: 16px; margin: 0; padding: 0; }
-  </style>
-</head>
-<body>
-  <div id="receipt">
-    <img class="logo" src="https://raw.githubusercontent.com/roo20/n8n/refs/heads/main/rewe_logo_icon_248646.svg" alt="REWE Logo" />
-    <pre class="center">
-REWE
-Ballindamm 40
-20095 Hamburg
-Tel.: 040-27169854
-UID Nr.: DE812706034
-    </pre>
-    <br>
-    <pre>
-{{ items_html }}
-========================================
-SUMME                              EUR {{ total | rjust(7) }}
-========================================
-Geg. Mastercard                    EUR {{ total | rjust(7) }}
-
-           * * Kundenbeleg * *
-
-Datum:      {{ date }}
-Uhrzeit:    {{ time1 }}:{{ seconds1 }} Uhr
-Beleg-Nr.   {{ beleg_nr }}
-Trace-Nr.   {{ trace_nr }}
-
-            Bezahlung
-            Kontaktlos
-            DEBIT MASTERCARD
-            ############{{ last4_digits }} 0001
-Nr.
-VU-Nr.                             {{ vu_nr }}
-Terminal-ID                        {{ terminal_id }}
-Pos-Info                           00 073 00
-AS-Zeit {{ date[:5] }}.                       {{ time1 }} Uhr
-AS-Proc-Code = 00 075 00
-Capt.-Ref. = 0000
-00 GENEHMIGT
-Betrag EUR                         {{ total | rjust(7) }}
-
-            Zahlung erfolgt
-
-{{ tax_table_html }}
-
-{{ date }}         {{ time2 }}      Bon-Nr.:{{ bon_nr }}
-Markt:0112             Kasse:{{ kasse_nr }}    Bed.:{{ bed_nr }}
-****************************************
-Jetzt mit PAYBACK Punkten bezahlen!
-Einfach REWE Guthaben am Service-Punkt
-                aufladen.
-
-  Für die mit * gekennzeichneten Produkte
-   erhalten Sie leider keine Rabatte
-           oder PAYBACK Punkte.
-****************************************
-
-          REWE Markt GmbH
-    Vielen Dank für Ihren Einkauf
-Bitte beachten Sie unsere kunden-
-freundlichen Öffnungszeiten am Markt
-
-         Sie haben Fragen?
-     Antworten gibt es unter
-           www.rewe.de
-    </pre>
-  </div>
-</body>
-</html>
-"""
+        # Products come from catalog.csv (or CATALOG_PATH), loaded once per process
+        self.cart_selection = load_catalog().select(**cart_filters_from_env())
 
     def get_working_days(self, days_back: int) -> List[datetime]:
         """Get list of days going back from today (including weekends)"""
@@ -131,15 +41,7 @@ freundlichen Öffnungszeiten am Markt
 
     def generate_random_shopping_cart(self) -> List[Dict[str, Any]]:
         """Generate a random shopping cart with total over 7 EUR"""
-        shopping_cart = []
-        current_total = 0
-        
-        while current_total < 7:
-            random_item = random.choice(self.possible_items)
-            shopping_cart.append(random_item.copy())
-            current_total += random_item['price']
-        
-        return shopping_cart
+        return self.cart_selection.sample_cart(min_total=7.0, unique=False)
 
     def calculate_tax_summary(self, shopping_cart: List[Dict[str, Any]]) -> Dict[int, Dict[str, float]]:
         """Calculate tax breakdown for the shopping cart"""
@@ -160,33 +62,6 @@ freundlichen Öffnungszeiten am Markt
         
         return tax_summary
 
-    def format_items_html(self, shopping_cart: List[Dict[str, Any]]) -> str:
-        """Format shopping cart items for HTML display"""
-        items_html = []
-        for item in shopping_cart:
-            tax_code = 'B' if item['tax_rate'] == 7 else 'A'
-            name_padded = item['name'].ljust(28)
-            price_padded = f"{item['price']:.2f}".rjust(7)
-            items_html.append(f"{name_padded}EUR {price_padded} {tax_code} *")
-        
-        return '\n'.join(items_html)
-
-    def format_tax_table_html(self, tax_summary: Dict[int, Dict[str, float]], total: float) -> str:
-        """Format tax summary table for HTML display"""
-        lines = ['Steuer %      Netto      Steuer      Brutto']
-        
-        if tax_summary[7]['brutto'] > 0:
-            lines.append(f"B=  7,0%     {tax_summary[7]['net']:7.2f}     {tax_summary[7]['tax']:7.2f}     {tax_summary[7]['brutto']:7.2f}")
-        
-        if tax_summary[19]['brutto'] > 0:
-            lines.append(f"A= 19,0%     {tax_summary[19]['net']:7.2f}     {tax_summary[19]['tax']:7.2f}     {tax_summary[19]['brutto']:7.2f}")
-        
-        gesamt_netto = tax_summary[7]['net'] + tax_summary[19]['net']
-        gesamt_tax = tax_summary[7]['tax'] + tax_summary[19]['tax']
-        lines.append(f"Gesamtbetrag  {gesamt_netto:7.2f}     {gesamt_tax:7.2f}     {total:7.2f}")
-        
-        return '\n'.join(lines)
-
     def generate_receipt_data(self, target_date: datetime) -> Dict[str, Any]:
         """Generate all data needed for a receipt for a specific date"""
         shopping_cart = self.generate_random_shopping_cart()
@@ -201,7 +76,7 @@ freundlichen Öffnungszeiten am Markt
         receipt_time = target_date.replace(hour=receipt_hour, minute=receipt_minute, second=receipt_second)
         transaction_time = receipt_time - timedelta(minutes=random.randint(3, 5))
         
-        return {
+        data = {
             'items': shopping_cart,
             'total': f"{total:.2f}",
             'tax_summary': tax_summary,
@@ -218,35 +93,18 @@ freundlichen Öffnungszeiten am Markt
             'terminal_id': f"{random.randint(10000000, 99999999):08d}",
             'last4_digits': f"{random.randint(1000, 9999):04d}",
         }
+        data['tse'] = generate_tse_data(data, transaction_time, receipt_time, random)
+        return data
 
     def generate_receipt_html(self, target_date: datetime) -> str:
         """Generate HTML for a receipt for a specific date"""
-        data = self.generate_receipt_data(target_date)
-        
-        # Format items and tax table
-        data['items_html'] = self.format_items_html(data['items'])
-        data['tax_table_html'] = self.format_tax_table_html(data['tax_summary'], float(data['total']))
-        
-        template = Template(self.html_template)
-        return template.render(**data)
+        return render_receipt_html(self.generate_receipt_data(target_date))
 
     def html_to_png(self, html_content: str) -> bytes:
         """Convert HTML content to PNG bytes"""
         try:
-            # Configure imgkit options
-            options = {
-                'width': 500,
-                'height': 800,
-                'crop-h': 800,
-                'crop-w': 500,
-                'crop-x': 0,
-                'crop-y': 0,
-                'encoding': 'UTF-8',
-                'format': 'png'
-            }
-            
             # Convert HTML to PNG
-            png_data = imgkit.from_string(html_content, False, options=options)
+            png_data = imgkit.from_string(html_content, False, options=HtmlRenderer.IMGKIT_OPTIONS)
             return png_data
             
         except Exception as e:
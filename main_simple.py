@@ -1,60 +1,144 @@
 import os
+import re
 import platform
 import random
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+import secrets
+import functools
+import threading
+import time
+import zlib
+import tempfile
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import List, Dict, Any, AsyncIterator, BinaryIO, Iterable, Optional, Tuple, Union
 import asyncio
-from io import BytesIO
+from io import BytesIO, TextIOWrapper
 
-from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+from telegram import InlineQueryResultCachedPhoto, InlineQueryResultsButton, InputMediaPhoto, Message, Update
+from telegram.ext import Application, CommandHandler, InlineQueryHandler, MessageHandler, TypeHandler, filters, ContextTypes
 from PIL import Image, ImageDraw, ImageFont
 import requests
 from dotenv import load_dotenv
 
+from scheduler import Job, JobRejected, JobScheduler
+from job_store import JobStore
+from http_pool import RetryAfterLimiter, build_requests
+from render_queue import RenderQueueClient
+from catalog import Catalog, cart_filters_from_env, load_catalog
+from cart_sampler import cart_target_from_env, get_target_sampler
+from render_governor import RenderGovernor, memory_budget_from_env
+from thermal_effects import apply_thermal_effects
+from log_pipeline import configure_logging
+from receipt_archive import ReceiptArchive, parse_period
+from renderers import PilRenderer, ReceiptRenderer, select_renderer
+from svg_receipt import receipt_svg
+from escpos import encode_receipt
+from contact_sheet import MAX_SIDE, build_sheet, encode_sheet, sheet_capacity, sheet_columns
+from health import HealthServer, LoopLagMonitor
+from receipt_pack import CorruptEntry, ReceiptPack
+from receipt_layout import QR_MODULE, draw_receipt
+from image_pyramid import ImagePyramid
+from qr_code import qr_matrix, rasterize as rasterize_qr
+from tse import generate_tse_data
+from date_range import (
+    DAY_FILTERS, ThroughputBudget, count_days, extra_holidays_from_env, is_range, iter_days, parse_range, range_key,
+    seed_for,
+)
+from receipt_export import DOCUMENT_LIMIT, FORMATS, estimate_export_bytes, export_receipts, spread
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Configure logging
-log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
-log_handlers = [logging.StreamHandler()]
-
-# Add file handler if logs directory exists or can be created
-try:
-    os.makedirs('logs', exist_ok=True)
-    log_handlers.append(logging.FileHandler('logs/bot.log'))
-except (OSError, PermissionError):
-    pass  # Continue with just console logging
-
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=getattr(logging, log_level, logging.INFO),
-    handlers=log_handlers
-)
+logger = logging.getLogger(__name__)
 
-# Disable httpx verbose logging
-logging.getLogger('httpx').setLevel(logging.WARNING)
+class _PilLayout:
+    """Draws on a PIL image as draw_receipt() calls it, in layout units times dpi_scale"""
+
+    def __init__(self, img: Image.Image, dpi_scale: int, logo: Image.Image):
+        self.img = img
+        self.draw = ImageDraw.Draw(img)
+        self.dpi_scale = dpi_scale
+        self.logo_image = logo
+        self.font = FontManager.get_monospace_font(10 * dpi_scale)
+        self.bold_font = FontManager.get_bold_font(12 * dpi_scale)
+        self.line_height = 12 * dpi_scale
+        self.y = 10 * dpi_scale
+
+    def text(self, text: str, x: float = 5, center: bool = False, bold: bool = False) -> None:
+        font = self.bold_font if bold else self.font
+        if center:
+            left = (self.img.width - self.draw.textlength(text, font=font)) // 2
+        else:
+            left = x * self.dpi_scale
+        self.draw.text((left, self.y), text, fill='black', font=font)
+        self.y += self.line_height
+
+    def item(self, name: str, price: str) -> None:
+        # Left align the name, right align the price, on tighter lines
+        scale = self.dpi_scale
+        self.draw.text((8 * scale, self.y), name, fill='black', font=self.font)
+        price_width = self.draw.textlength(price, font=self.font)
+        self.draw.text((self.img.width - price_width - 7 * scale - 100, self.y), price, fill='black', font=self.font)
+        self.y += int(self.line_height * 0.9)
+
+    def gap(self, height: float) -> None:
+        self.y += int(height * self.dpi_scale)
+
+    def logo(self) -> None:
+        logo = self.logo_image
+        # Paste with proper alpha handling
+        self.img.paste(logo, ((self.img.width - logo.width) // 2, self.y), logo if logo.mode == 'RGBA' else None)
+        self.y += logo.height + 6 * self.dpi_scale
+
+    def qr(self, payload: str) -> None:
+        # Scaled up from its module matrix in one go
+        qr = Image.fromarray(rasterize_qr(qr_matrix(payload), QR_MODULE * self.dpi_scale))
+        self.img.paste(qr, ((self.img.width - qr.width) // 2, self.y))
+        self.y += qr.height
 
-logger = logging.getLogger(__name__)
 
 class FoodReceiptGenerator:
-    def __init__(self):
-        self.possible_items = [
-            {'name': 'GURKE', 'price': 0.79, 'tax_rate': 7},
-            {'name': 'BANANEN', 'price': 1.29, 'tax_rate': 7},
-            {'name': 'REWE Bio Apfel', 'price': 2.49, 'tax_rate': 7},
-            {'name': 'Milch 1,5%', 'price': 1.19, 'tax_rate': 7},
-            {'name': 'Butter', 'price': 2.29, 'tax_rate': 7},
-            {'name': 'Brot', 'price': 2.00, 'tax_rate': 7},
-            {'name': 'Joghurt', 'price': 0.59, 'tax_rate': 7},
-            {'name': 'Vollkornbrot', 'price': 1.89, 'tax_rate': 19},
-            {'name': 'Salami', 'price': 1.99, 'tax_rate': 19},
-            {'name': 'Käse', 'price': 2.99, 'tax_rate': 19},
-            {'name': 'Energy Drink', 'price': 1.49, 'tax_rate': 19},
-            {'name': 'Kaffee Crema', 'price': 0.99, 'tax_rate': 7},
-            {'name': 'Wasser', 'price': 5.99, 'tax_rate': 19},
-        ]
+    # Receipts are drawn at BASE size x DPI_SCALE and scaled down
+    BASE_WIDTH = 300
+    BASE_HEIGHT = 1150
+    DPI_SCALE = 4  # Reduced from 7 to 4 for better Docker performance
+    # Bump whenever a change alters how an existing (date, seed) renders
+    LAYOUT_VERSION = 2
+    # Output sizes below the full-resolution canvas, each reduced from the one before
+    PYRAMID_REDUCTIONS = {'preview': DPI_SCALE, 'thumbnail': 3}
+
+    def __init__(
+        self,
+        catalog: Optional[Catalog] = None,
+        cart_filters: Optional[Dict[str, Any]] = None,
+        cart_target: Optional[Dict[str, Any]] = None,
+    ):
+        # Products come from catalog.csv (or CATALOG_PATH), loaded once per process
+        self.catalog = catalog or load_catalog()
+        self.cart_selection = self.catalog.select(**(cart_filters if cart_filters is not None else cart_filters_from_env()))
+        
+        # Scaled logos by DPI scale, see scaled_logo()
+        self._logo_cache: Dict[int, Image.Image] = {}
+        
+        # Recently drawn receipts at all their sizes, see receipt_pyramid()
+        self.pyramid_cache_bytes = int(float(os.getenv('RECEIPT_PYRAMID_CACHE_MB', '24')) * 1024 * 1024)
+        self._pyramids: OrderedDict = OrderedDict()
+        self._pyramid_lock = threading.Lock()
+        
+        # Optional thermal-print look (fading, density, grain, skew) applied after drawing
+        self.thermal_effects = os.getenv('THERMAL_EFFECTS', '0').lower() in ('1', 'true', 'yes')
+        
+        # Optional exact total / total range and item count, e.g. {'min_total': 12.5, 'max_total': 12.5}
+        self.cart_target = cart_target if cart_target is not None else cart_target_from_env()
+        self.target_sampler = None
+        if self.cart_target:
+            self.target_sampler = get_target_sampler(
+                self.cart_selection,
+                self.cart_target.get('max_items') or len(self.cart_selection),
+                round(self.cart_target.get('max_total', self.cart_target['min_total']) * 100),
+            )
 
     def get_working_days(self, days_back: int) -> List[datetime]:
         """Get list of working days going back from today"""
@@ -64,32 +148,19 @@ class FoodReceiptGenerator:
         
         while days_found < days_back:
             # Monday = 0, Sunday = 6 (so 0-4 are weekdays)
-            if current_date.weekday() < 7:  # Monday to Friday
+            if current_date.weekday() < 5:  # Monday to Friday
                 working_days.append(current_date)
                 days_found += 1
             current_date -= timedelta(days=1)
         
         return list(reversed(working_days))  # Return in chronological order
 
-    def generate_random_shopping_cart(self) -> List[Dict[str, Any]]:
-        """Generate a random shopping cart with total over 7 EUR"""
-        shopping_cart = []
-        current_total = 0
-        
-        # Keep track of used items to avoid duplicates
-        available_items = self.possible_items.copy()
-        
-        while current_total < 7 and available_items:
-            random_item = random.choice(available_items)
-            shopping_cart.append(random_item.copy())
-            current_total += random_item['price']
-            # Remove the selected item from available items
-            available_items.remove(random_item)
-            
-        # If we run out of unique items but haven't reached minimum total,
-        # just return what we have so far
-        
-        return shopping_cart
+    def generate_random_shopping_cart(self, rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
+        """Generate a random shopping cart with total over 7 EUR, or matching the configured target"""
+        if self.target_sampler is not None:
+            return self.target_sampler.sample(rng, **self.cart_target)
+        # Unique items; if they run out before 7 EUR the cart is returned as is
+        return self.cart_selection.sample_cart(rng, min_total=7.0, unique=True)
 
     def calculate_tax_summary(self, shopping_cart: List[Dict[str, Any]]) -> Dict[int, Dict[str, float]]:
         """Calculate tax breakdown for the shopping cart"""
@@ -110,21 +181,22 @@ class FoodReceiptGenerator:
         
         return tax_summary
 
-    def generate_receipt_data(self, target_date: datetime) -> Dict[str, Any]:
+    def generate_receipt_data(self, target_date: datetime, rng: Optional[random.Random] = None) -> Dict[str, Any]:
         """Generate all data needed for a receipt for a specific date"""
-        shopping_cart = self.generate_random_shopping_cart()
+        rng = rng or random
+        shopping_cart = self.generate_random_shopping_cart(rng)
         total = sum(item['price'] for item in shopping_cart)
         tax_summary = self.calculate_tax_summary(shopping_cart)
         
         # Generate random times between 8 AM and 6 PM
-        receipt_hour = random.randint(8, 17)
-        receipt_minute = random.randint(0, 59)
-        receipt_second = random.randint(0, 59)
+        receipt_hour = rng.randint(8, 17)
+        receipt_minute = rng.randint(0, 59)
+        receipt_second = rng.randint(0, 59)
         
         receipt_time = target_date.replace(hour=receipt_hour, minute=receipt_minute, second=receipt_second)
-        transaction_time = receipt_time - timedelta(minutes=random.randint(3, 5))
+        transaction_time = receipt_time - timedelta(minutes=rng.randint(3, 5))
         
-        return {
+        data = {
             'items': shopping_cart,
             'total': total,
             'tax_summary': tax_summary,
@@ -132,15 +204,18 @@ class FoodReceiptGenerator:
             'time1': transaction_time.strftime('%H:%M'),
             'seconds1': transaction_time.strftime('%S'),
             'time2': receipt_time.strftime('%H:%M'),
-            'beleg_nr': f"{random.randint(1000, 9999):04d}",
-            'trace_nr': f"{random.randint(100000, 999999):06d}",
-            'bon_nr': str(random.randint(5000, 9999)),
-            'bed_nr': f"{random.randint(100000, 999999):06d}",
-            'kasse_nr': str(random.randint(10, 99)),
-            'vu_nr': f"{random.randint(100000000, 999999999):09d}",
-            'terminal_id': f"{random.randint(10000000, 99999999):08d}",
-            'last4_digits': f"{random.randint(1000, 9999):04d}",
+            'beleg_nr': f"{rng.randint(1000, 9999):04d}",
+            'trace_nr': f"{rng.randint(100000, 999999):06d}",
+            'bon_nr': str(rng.randint(5000, 9999)),
+            'bed_nr': f"{rng.randint(100000, 999999):06d}",
+            'kasse_nr': str(rng.randint(10, 99)),
+            'vu_nr': f"{rng.randint(100000000, 999999999):09d}",
+            'terminal_id': f"{rng.randint(10000000, 99999999):08d}",
+            'last4_digits': f"{rng.randint(1000, 9999):04d}",
         }
+        # Drawn last, so the fields above stay what they were for a given seed
+        data['tse'] = generate_tse_data(data, transaction_time, receipt_time, rng)
+        return data
 
     def create_svg_logo(self, width: int, height: int = 40) -> Image.Image:
         """Create REWE logo from SVG data using PIL - black and white for thermal receipt style"""
@@ -227,223 +302,133 @@ class FoodReceiptGenerator:
             logger.warning(f"Could not download logo: {e}, using text logo")
             return None
 
-    def create_receipt_image(self, target_date: datetime) -> bytes:
-        """Create a receipt image using PIL - taller and narrower like real receipts with high DPI"""
-        data = self.generate_receipt_data(target_date)
-        
-        # Image settings - optimized resolution for Docker compatibility
-        dpi_scale = 4  # Reduced from 7 to 4 for better Docker performance
-        width = 300 * dpi_scale  # 1200px final width
-        height = 900 * dpi_scale  # 3600px final height
-        background_color = 'white'
-        text_color = 'black'
-        
-        # Create image with high resolution
-        img = Image.new('RGB', (width, height), color=background_color)
-        draw = ImageDraw.Draw(img)
-        
-        # Scale font sizes accordingly
-        base_font_size = 10 * dpi_scale
-        bold_font_size = 12 * dpi_scale
-        
-        # Try to use a monospace font, fallback to default if not available
-        font = FontManager.get_monospace_font(base_font_size)
-        
-        # Try to get a bold font for headers
-        bold_font = FontManager.get_bold_font(bold_font_size)
-        
-        # Current y position for drawing text (scaled)
-        y = 10 * dpi_scale
-        line_height = 12 * dpi_scale
-        
-        def draw_text(text, x=5*dpi_scale, center=False, bold=False):
-            nonlocal y
-            current_font = bold_font if bold else font
-            if center:
-                text_width = draw.textlength(text, font=current_font)
-                x = (width - text_width) // 2
-            draw.text((x, y), text, fill=text_color, font=current_font)
-            y += line_height
-        
-        def draw_separator(height=3):
-            nonlocal y
-            y += height * dpi_scale
-        
-        def draw_line(char="=", length=40):
-            nonlocal y
-            line_text = char * length
-            text_width = draw.textlength(line_text, font=font)
-            x = (width - text_width) // 2
-            draw.text((x, y), line_text, fill=text_color, font=font)
-            y += line_height
-        
-        # Add REWE logo at the top - prioritize vector-style logo
-        logo_width = (width - 40*dpi_scale) // dpi_scale
+    def render_version(self, renderer: str) -> str:
+        """Everything besides date and seed that decides a receipt rendered by renderer, for caches of renders"""
+        catalog = 0
+        for column in (
+            '\n'.join(self.catalog.names).encode('utf-8'),
+            self.catalog.price_cents.tobytes(),
+            self.catalog.tax_rates.tobytes(),
+            self.catalog.category_ids.tobytes(),
+            '\n'.join(self.catalog.categories).encode('utf-8'),
+        ):
+            catalog = zlib.crc32(column, catalog)
+        selection = zlib.crc32(repr((list(self.cart_selection.starts), list(self.cart_selection.offsets), self.cart_target)).encode())
+        return (
+            f"layout{self.LAYOUT_VERSION}-{renderer}-{self.BASE_WIDTH}x{self.BASE_HEIGHT}@{self.DPI_SCALE}"
+            f"-thermal{int(self.thermal_effects)}-catalog{catalog:08x}-cart{selection:08x}"
+        )
+
+    def estimate_render_bytes(self, dpi_scale: Optional[int] = None) -> int:
+        """Estimate peak memory of one create_receipt_image call"""
+        dpi_scale = dpi_scale or self.DPI_SCALE
+        width, height = self.BASE_WIDTH * dpi_scale, self.BASE_HEIGHT * dpi_scale
+        canvas = width * height  # grayscale canvas
+        logo = width * 40 * dpi_scale * 4  # scaled RGBA logo
+        # The half-size pre-shrink before the LANCZOS pass, the preview (and its thermal
+        # pass) and the PNG buffer; the thumbnail is negligible
+        resized = canvas // 4 + 3 * self.BASE_WIDTH * self.BASE_HEIGHT
+        # Headroom for PIL/Python bookkeeping
+        return int((canvas + logo + resized) * 1.3)
+
+    def scaled_logo(self, dpi_scale: int) -> Image.Image:
+        """The logo at render resolution; cached, as it is the same on every receipt"""
+        if dpi_scale in self._logo_cache:
+            return self._logo_cache[dpi_scale]
+        logo_width = (self.BASE_WIDTH * dpi_scale - 40*dpi_scale) // dpi_scale
         logo_height = 35  # Optimized height for better proportions
+        # Prioritize vector-style logo, then the enhanced one, then plain text
+        logo = (
+            self.create_rewe_vector_logo(logo_width, logo_height)
+            or self.create_svg_logo(logo_width, logo_height)
+            or self.create_text_logo(logo_width)
+        )
+        scaled = logo.resize((logo.width * dpi_scale, logo.height * dpi_scale), Image.Resampling.LANCZOS)
+        self._logo_cache[dpi_scale] = scaled
+        return scaled
+
+    def create_receipt_image(
+        self, target_date: datetime, seed: Optional[int] = None, thermal: Optional[bool] = None, level: str = 'preview'
+    ) -> bytes:
+        """Create a receipt image using PIL - taller and narrower like real receipts with high DPI.
+
+        level is 'preview' (BASE_WIDTH wide, the photo sent to Telegram), 'full'
+        (DPI_SCALE times that, for archiving) or 'thumbnail'.
+        """
+        return self.receipt_pyramid(target_date, seed, thermal).png(level)
+
+    def draw_receipt_image(self, target_date: datetime, seed: Optional[int] = None, thermal: Optional[bool] = None) -> Image.Image:
+        """The receipt as a BASE_WIDTH x BASE_HEIGHT image, before PNG encoding"""
+        return self.receipt_pyramid(target_date, seed, thermal).image('preview')
+
+    def receipt_pyramid(self, target_date: datetime, seed: Optional[int] = None, thermal: Optional[bool] = None) -> ImagePyramid:
+        """The receipt rasterized once, with its smaller sizes reduced and encoded on demand.
+
+        Pyramids of the most recent seeded receipts are kept, up to
+        RECEIPT_PYRAMID_CACHE_MB of levels and PNGs, so another size of a recent
+        receipt never lays it out and draws it again.
+        """
+        if thermal is None:
+            thermal = self.thermal_effects
+        key = (target_date.date(), seed, thermal)
+        if seed is not None:
+            with self._pyramid_lock:
+                pyramid = self._pyramids.get(key)
+                if pyramid is not None:
+                    self._pyramids.move_to_end(key)
+                    return pyramid
+
+        pyramid = self._draw_receipt_pyramid(target_date, seed, thermal)
+        if seed is not None and pyramid.nbytes() <= self.pyramid_cache_bytes:
+            with self._pyramid_lock:
+                self._pyramids[key] = pyramid
+                # Levels and PNGs are added lazily, so sizes are taken again on every insert
+                cached = sum(entry.nbytes() for entry in self._pyramids.values())
+                while cached > self.pyramid_cache_bytes:
+                    _, evicted = self._pyramids.popitem(last=False)
+                    cached -= evicted.nbytes()
+        return pyramid
+
+    def _draw_receipt_pyramid(self, target_date: datetime, seed: Optional[int], thermal: bool) -> ImagePyramid:
+        # A seed makes the receipt reproducible, e.g. when resuming a job after a restart
+        rng = random.Random(seed) if seed is not None else None
+        data = self.generate_receipt_data(target_date, rng)
         
-        # Try vector-style logo first (most professional)
-        vector_logo = self.create_rewe_vector_logo(logo_width, logo_height)
-        if vector_logo:
-            # Scale up the vector logo
-            logo_scaled = vector_logo.resize(
-                (vector_logo.width * dpi_scale, vector_logo.height * dpi_scale), 
-                Image.Resampling.LANCZOS
-            )
-            logo_x = (width - logo_scaled.width) // 2  # Center the logo
-            # Paste with proper alpha handling
-            if logo_scaled.mode == 'RGBA':
-                img.paste(logo_scaled, (logo_x, y), logo_scaled)
-            else:
-                img.paste(logo_scaled, (logo_x, y))
-            y += logo_scaled.height + 6*dpi_scale  # Optimized padding
-        else:
-            # Try enhanced logo as fallback
-            svg_logo = self.create_svg_logo(logo_width, logo_height)
-            if svg_logo:
-                # Scale up the enhanced logo
-                logo_scaled = svg_logo.resize(
-                    (svg_logo.width * dpi_scale, svg_logo.height * dpi_scale), 
-                    Image.Resampling.LANCZOS
-                )
-                logo_x = (width - logo_scaled.width) // 2  # Center the logo
-                # Paste with proper alpha handling
-                if logo_scaled.mode == 'RGBA':
-                    img.paste(logo_scaled, (logo_x, y), logo_scaled)
-                else:
-                    img.paste(logo_scaled, (logo_x, y))
-                y += logo_scaled.height + 6*dpi_scale  # Optimized padding
-            else:
-                # Final fallback to simple text logo
-                text_logo = self.create_text_logo(logo_width)
-                logo_scaled = text_logo.resize(
-                    (text_logo.width * dpi_scale, text_logo.height * dpi_scale), 
-                    Image.Resampling.LANCZOS
-                )
-                logo_x = (width - logo_scaled.width) // 2  # Center the logo
-                # Paste with proper alpha handling
-                if logo_scaled.mode == 'RGBA':
-                    img.paste(logo_scaled, (logo_x, y), logo_scaled)
-                else:
-                    img.paste(logo_scaled, (logo_x, y))
-                y += logo_scaled.height + 6*dpi_scale  # Optimized padding
-        
-        draw_separator(5)
-        
-        # Store header (without REWE since we have the logo)
-        draw_text("Reichenhainer Str. 55", center=True)
-        draw_text("09126 Chemnitz", center=True)
-        draw_text("Tel.: 0371-24088670", center=True)
-        draw_text("UID Nr.: DE812706034", center=True)
-        draw_separator(10)
-        
-        # Items section - reduced spacing for tighter look
-        for item in data['items']:
-            tax_code = 'B' if item['tax_rate'] == 7 else 'A'
-            name = item['name'][:22]  # Allow slightly longer names in narrow format
-            price_str = f"EUR {item['price']:6.2f} {tax_code} *"
-            
-            # Left align item name, right align price - much tighter spacing
-            draw.text((8*dpi_scale, y), name, fill=text_color, font=font)
-            price_width = draw.textlength(price_str, font=font)
-            draw.text((width - price_width - 7*dpi_scale-100, y), price_str, fill=text_color, font=font)
-            y += int(line_height * 0.9)  # Reduced line height for tighter spacing
-        
-        # Separator line
-        draw_line("=", 38)
-        
-        # Total section
-        
-        total_str = f" SUMME                           EUR {data['total']:6.2f}"
-        draw_text(total_str, x=5*dpi_scale)
-        draw_line("=", 38)
-        payment_str = f" Geg. Mastercard                 EUR {data['total']:6.2f}"
-        draw_text(payment_str, x=5*dpi_scale)
-        draw_separator(10)
-        
-        # Customer receipt section
-        draw_text("* * Kundenbeleg * *", center=True, bold=True)
-        draw_separator(8)
-        
-        draw_text(f"Datum:      {data['date']}", x=5*dpi_scale)
-        draw_text(f"Uhrzeit:    {data['time1']}:{data['seconds1']} Uhr", x=5*dpi_scale)
-        draw_text(f"Beleg-Nr.   {data['beleg_nr']}", x=5*dpi_scale)
-        draw_text(f"Trace-Nr.   {data['trace_nr']}", x=5*dpi_scale)
-        draw_separator(8)
-        
-        # Payment info
-        draw_text("Bezahlung", center=True)
-        draw_text("Kontaktlos", center=True)
-        draw_text("DEBIT MASTERCARD", center=True)
-        draw_text(f"############{data['last4_digits']} 0001", center=True)
-        draw_text("Nr.", x=5*dpi_scale)
-        draw_text(f"VU-Nr.                   {data['vu_nr']}", x=5*dpi_scale)
-        draw_text(f"Terminal-ID              {data['terminal_id']}", x=5*dpi_scale)
-        draw_text("Pos-Info                 00 073 00", x=5*dpi_scale)
-        draw_text(f"AS-Zeit {data['date'][:5]}.             {data['time1']} Uhr", x=5*dpi_scale)
-        draw_text("AS-Proc-Code = 00 075 00", x=5*dpi_scale)
-        draw_text("Capt.-Ref. = 0000", x=5*dpi_scale)
-        draw_text("00 GENEHMIGT", x=5*dpi_scale)
-        draw_text(f"Betrag EUR               {data['total']:6.2f}", x=5*dpi_scale)
-        draw_separator(8)
-        
-        draw_text("Zahlung erfolgt", center=True)
-        draw_separator(8)
-        
-        # Tax summary
-        draw_text("Steuer %  Netto  Steuer  Brutto", x=5*dpi_scale, bold=True)
-        
-        if data['tax_summary'][7]['brutto'] > 0:
-            tax_7 = data['tax_summary'][7]
-            draw_text(f"B=  7,0%  {tax_7['net']:5.2f}  {tax_7['tax']:5.2f}  {tax_7['brutto']:5.2f}", x=5*dpi_scale)
-        
-        if data['tax_summary'][19]['brutto'] > 0:
-            tax_19 = data['tax_summary'][19]
-            draw_text(f"A= 19,0%  {tax_19['net']:5.2f}  {tax_19['tax']:5.2f}  {tax_19['brutto']:5.2f}", x=5*dpi_scale)
-        
-        gesamt_netto = data['tax_summary'][7]['net'] + data['tax_summary'][19]['net']
-        gesamt_tax = data['tax_summary'][7]['tax'] + data['tax_summary'][19]['tax']
-        draw_text(f"Gesamtbetrag {gesamt_netto:5.2f}  {gesamt_tax:5.2f}  {data['total']:5.2f}", x=5*dpi_scale)
-        draw_separator(10)
-        
-        # Footer with date and transaction details
-        footer_line1 = f"{data['date']}     {data['time2']}  Bon-Nr.:{data['bon_nr']}"
-        draw_text(footer_line1, x=5*dpi_scale)
-        footer_line2 = f"Markt:0112         Kasse:{data['kasse_nr']}  Bed.:{data['bed_nr']}"
-        draw_text(footer_line2, x=5*dpi_scale)
-        
-        # Stars separator
-        draw_line("*", 38)
-        
-        # PAYBACK section
-        draw_text("Jetzt mit PAYBACK Punkten bezahlen!", x=5*dpi_scale)
-        draw_text("Einfach REWE Guthaben am Service-Punkt", x=5*dpi_scale)
-        draw_text("aufladen.", center=True)
-        draw_separator(5)
-        
-        draw_text("Für die mit * gekennzeichneten Produkte", x=5*dpi_scale)
-        draw_text("erhalten Sie leider keine Rabatte", x=5*dpi_scale)
-        draw_text("oder PAYBACK Punkte.", center=True)
-        
-        # Stars separator
-        draw_line("*", 38)
-        draw_separator(5)
-        
-        # Final footer
-        draw_text("REWE Markt GmbH", center=True, bold=True)
-        draw_text("Vielen Dank für Ihren Einkauf", center=True)
-        draw_text("Bitte beachten Sie unsere kunden-", x=5*dpi_scale)
-        draw_text("freundlichen Öffnungszeiten am Markt", x=5*dpi_scale)
-        draw_separator(8)
-        draw_text("Sie haben Fragen?", center=True)
-        draw_text("Antworten gibt es unter", center=True)
-        draw_text("www.rewe.de", center=True, bold=True)
-        
-        # Convert to high-quality PNG
-        buffer = BytesIO()
-        # Scale down while maintaining high quality
-        final_img = img.resize((width // dpi_scale, height // dpi_scale), Image.Resampling.LANCZOS)
-        final_img.save(buffer, format='PNG', optimize=True, dpi=(300, 300))
-        return buffer.getvalue()
+        # Draw at high resolution; grayscale, as receipts have no colour
+        dpi_scale = self.DPI_SCALE
+        img = Image.new('L', (self.BASE_WIDTH * dpi_scale, self.BASE_HEIGHT * dpi_scale), color='white')
+        draw_receipt(data, _PilLayout(img, dpi_scale, self.scaled_logo(dpi_scale)))
+        
+        # Smaller sizes are reduced from this canvas when asked for; the thermal
+        # look is tuned for the preview size and carries over to the thumbnail
+        effects = {}
+        if thermal:
+            effect_seed = (rng or random).getrandbits(32)
+            effects['preview'] = lambda image: apply_thermal_effects(image, effect_seed)
+        return ImagePyramid(img, self.PYRAMID_REDUCTIONS, dpi=300 * dpi_scale, effects=effects)
+
+    def create_contact_sheet(
+        self, days: List[datetime], seeds: List[int], columns: Optional[int] = None, thermal: Optional[bool] = None
+    ) -> Tuple[bytes, int]:
+        """A grid of as many of these receipts as fit on one photo; returns its PNG and how many it holds"""
+        columns = columns or sheet_columns(len(days), self.BASE_WIDTH)
+        sheet, used = build_sheet(
+            lambda day, seed: self.draw_receipt_image(day, seed, thermal),
+            days, seeds, columns,
+            tile_size=(self.BASE_WIDTH, self.BASE_HEIGHT),
+            label_font=FontManager.get_bold_font(14),
+        )
+        return encode_sheet(sheet), used
+
+    def create_receipt_svg(self, target_date: datetime, seed: Optional[int] = None) -> str:
+        """The same receipt as create_receipt_image() for this seed, as SVG text"""
+        rng = random.Random(seed) if seed is not None else None
+        return receipt_svg(self.generate_receipt_data(target_date, rng))
+
+    def create_receipt_escpos(self, target_date: datetime, seed: Optional[int] = None, **options) -> bytes:
+        """The same receipt as an ESC/POS command stream for thermal printers (see escpos.py)"""
+        rng = random.Random(seed) if seed is not None else None
+        return encode_receipt(self.generate_receipt_data(target_date, rng), **options)
 
     def create_rewe_vector_logo(self, width: int, height: int = 35) -> Image.Image:
         """Create a proper REWE vector-style logo based on the official design"""
@@ -479,10 +464,27 @@ class FoodReceiptGenerator:
             logger.warning(f"Error creating vector-style logo: {e}")
             return None
 
+def _thread_cached(loader):
+    """Cache loaded fonts by size, per thread - FreeType faces must not be shared across threads"""
+    cache = threading.local()
+    
+    @functools.wraps(loader)
+    def wrapper(size: int):
+        fonts = getattr(cache, 'fonts', None)
+        if fonts is None:
+            fonts = cache.fonts = {}
+        if size not in fonts:
+            fonts[size] = loader(size)
+        return fonts[size]
+    
+    return wrapper
+
+
 class FontManager:
     """Manages font selection across different platforms"""
     
     @staticmethod
+    @_thread_cached
     def get_monospace_font(size: int) -> ImageFont.FreeTypeFont:
         """Get the best available monospace font for the platform"""
         # Define font fallback order for different platforms
@@ -502,12 +504,12 @@ class FontManager:
                 "FreeMono.ttf",
             ]
         
-        logger.info(f"Trying to load monospace font with size {size} on {platform.system()}")
+        logger.debug(f"Trying to load monospace font with size {size} on {platform.system()}")
         
         for font_path in fonts:
             try:
                 font = ImageFont.truetype(font_path, size)
-                logger.info(f"Successfully loaded font: {font_path}")
+                logger.debug(f"Successfully loaded font: {font_path}")
                 return font
             except (OSError, IOError) as e:
                 logger.debug(f"Failed to load font {font_path}: {e}")
@@ -518,6 +520,7 @@ class FontManager:
         return ImageFont.load_default()
     
     @staticmethod
+    @_thread_cached
     def get_bold_font(size: int) -> ImageFont.FreeTypeFont:
         """Get the best available bold font for the platform"""
         if platform.system() == "Windows":
@@ -553,6 +556,7 @@ class FontManager:
         return FontManager.get_monospace_font(size)
     
     @staticmethod
+    @_thread_cached
     def get_logo_font(size: int) -> ImageFont.FreeTypeFont:
         """Get the best available font for the REWE logo"""
         if platform.system() == "Windows":
@@ -590,79 +594,754 @@ class FontManager:
 
 
 class TelegramBot:
-    def __init__(self, token: str, allowed_user_id: int):
+    # Longest /history listing sent as one message
+    HISTORY_LINES = 60
+    # Inline results per answer (Telegram allows up to 50) and how long clients may cache them
+    INLINE_PAGE_SIZE = 10
+    INLINE_CACHE_TIME = 30
+    # Archive owner of the receipts pre-uploaded for inline queries
+    INLINE_STOCK_USER = 0
+
+    def __init__(self, token: str, allowed_user_ids: Union[int, Iterable[int]], base_url: Optional[str] = None):
         self.token = token
-        self.allowed_user_id = allowed_user_id
+        if isinstance(allowed_user_ids, int):
+            allowed_user_ids = [allowed_user_ids]
+        self.allowed_user_ids = set(allowed_user_ids)
+        self.max_days_back = int(os.getenv('MAX_DAYS_BACK', '30'))
+        # Date ranges ('food 2026-01-01..2026-06-30') are capped by how many receipts can be
+        # delivered in RANGE_BUDGET_SECONDS at the measured rate, and sent RANGE_CHUNK_SIZE at a time
+        self.range_budget = ThroughputBudget(
+            float(os.getenv('RANGE_BUDGET_SECONDS', '600')),
+            initial_rate=float(os.getenv('RANGE_INITIAL_RATE', '1.0')),
+        )
+        self.range_chunk_size = max(1, min(10, int(os.getenv('RANGE_CHUNK_SIZE', '10'))))
+        self.holidays = extra_holidays_from_env()
+        # Data-only exports (/export) are generated in batches without rendering, up to this many receipts
+        self.export_max_receipts = int(os.getenv('EXPORT_MAX_RECEIPTS', '50000'))
         self.receipt_generator = FoodReceiptGenerator()
-        self.application = Application.builder().token(token).build()
+        data_dir = os.getenv('DATA_DIR', 'data')
+        self.job_store = JobStore(os.path.join(data_dir, 'jobs.sqlite3'))
+        self.archive = ReceiptArchive(os.path.join(data_dir, 'receipts.sqlite3'))
+        # Inline queries only answer from uploaded receipts; with a cache chat to upload
+        # to, a receipt for each recent working day is kept ready in the background
+        inline_cache_chat = os.getenv('INLINE_CACHE_CHAT_ID')
+        self.inline_cache_chat_id = int(inline_cache_chat) if inline_cache_chat else None
+        self.inline_refresh_interval = float(os.getenv('INLINE_REFRESH_INTERVAL', '3600'))
+        self._inline_stock_task: Optional[asyncio.Task] = None
+        # Render through a shared, pre-warmed render service, or hand renders to separate
+        # worker processes through the durable render queue, when one is configured
+        render_service_url = os.getenv('RENDER_SERVICE_URL')
+        render_queue = os.getenv('RENDER_QUEUE')
+        if render_service_url:
+            # render_service builds on this module, so it is only imported when used
+            from render_service import RenderServiceClient
+            self.render_client = RenderServiceClient(render_service_url)
+        elif render_queue:
+            self.render_client = RenderQueueClient(render_queue, timeout=float(os.getenv('RENDER_QUEUE_TIMEOUT', '120')))
+        else:
+            self.render_client = None
+        # Rendered receipts are kept in an append-only pack when RENDER_PACK_DIR is set,
+        # so a receipt is rendered once however often it is sent or exported; it is
+        # opened by open_render_pack() once the renderer is known
+        self.render_pack_dir = os.getenv('RENDER_PACK_DIR')
+        self.render_pack: Optional[ReceiptPack] = None
+        # Local renders use PIL until the startup benchmark has picked the best backend
+        self.renderer: ReceiptRenderer = PilRenderer()
+        # Only start local renders while their estimated memory fits the budget,
+        # less what the generator's cache of recent receipts may hold
+        self.render_governor = RenderGovernor(max(memory_budget_from_env() - self.receipt_generator.pyramid_cache_bytes, 0))
+        self.scheduler = JobScheduler(
+            workers=int(os.getenv('RENDER_WORKERS', '2')),
+            max_jobs_per_user=int(os.getenv('MAX_JOBS_PER_USER', '2')),
+        )
+        # Health endpoint served from its own thread, so a blocked event loop shows up as not live
+        self.health_port = int(os.getenv('HEALTH_PORT', '8081'))
+        self.loop_monitor = LoopLagMonitor()
+        self.health_server: Optional[HealthServer] = None
+        self.started_at = time.time()
+        self.last_update_at: Optional[float] = None
+        self.updates_received = 0
+        # Separate, tuned connection pools for API calls/uploads and for getUpdates
+        self.api_request, self.updates_request = build_requests()
+        # Bot API endpoint, e.g. a local Bot API server or the fake one in fake_telegram.py
+        base_url = base_url or os.getenv('TELEGRAM_BASE_URL', 'https://api.telegram.org/bot')
+        self.application = (
+            Application.builder()
+            .token(token)
+            .base_url(base_url)
+            .request(self.api_request)
+            .get_updates_request(self.updates_request)
+            .rate_limiter(RetryAfterLimiter(int(os.getenv('TELEGRAM_MAX_RETRIES', '3'))))
+            .concurrent_updates(True)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
         
         # Add handlers
+        # A group of its own, so it sees every update without keeping other handlers from running
+        self.application.add_handler(TypeHandler(Update, self.track_update), group=-2)
         self.application.add_handler(CommandHandler("start", self.start_command))
+        self.application.add_handler(CommandHandler("history", self.history_command))
+        self.application.add_handler(CommandHandler("resend", self.resend_command))
+        self.application.add_handler(CommandHandler("export", self.export_command))
+        self.application.add_handler(InlineQueryHandler(self.inline_query))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
 
+    async def _post_init(self, application: Application) -> None:
+        self.loop_monitor.start()
+        if self.health_port:
+            self.health_server = HealthServer(
+                self.loop_monitor,
+                self.health_snapshot,
+                host=os.getenv('HEALTH_HOST', '127.0.0.1'),
+                port=self.health_port,
+                max_lag=float(os.getenv('HEALTH_MAX_LAG', '5')),
+            )
+            self.health_server.start()
+        if self.render_client is None:
+            loop = asyncio.get_running_loop()
+            self.renderer = await loop.run_in_executor(None, select_renderer, self.receipt_generator)
+        if self.render_pack_dir:
+            await asyncio.get_running_loop().run_in_executor(None, self.open_render_pack)
+        if self.render_pack is not None and self.render_pack.dead_ratio() > float(os.getenv('RENDER_PACK_COMPACT_RATIO', '0.5')):
+            freed = await asyncio.get_running_loop().run_in_executor(None, self.render_pack.compact)
+            logger.info(f"Compacted the render pack, freed {freed / 2**20:.1f} MB")
+        await self.scheduler.start()
+        await self.resume_jobs()
+        if self.inline_cache_chat_id is not None:
+            self._inline_stock_task = asyncio.create_task(self.keep_inline_stock())
+        if self.health_server is not None:
+            self.health_server.ready = True
+
+    def open_render_pack(self) -> None:
+        """Open RENDER_PACK_DIR for the current renderer; a pack of other renders is emptied"""
+        # Remote renders come from whatever backend the service or workers picked
+        renderer = self.renderer.name if self.render_client is None else f"remote-{self.render_client.base_url}"
+        if self.render_pack is not None:
+            self.render_pack.close()
+        self.render_pack = ReceiptPack(self.render_pack_dir, version=self.receipt_generator.render_version(renderer))
+
+    async def _post_shutdown(self, application: Application) -> None:
+        if self.health_server is not None:
+            self.health_server.stop()
+        self.loop_monitor.stop()
+        if self._inline_stock_task is not None:
+            self._inline_stock_task.cancel()
+        await self.scheduler.stop()
+        self.job_store.close()
+        self.archive.close()
+        if self.render_client is not None:
+            await self.render_client.close()
+        if self.render_pack is not None:
+            self.render_pack.close()
+
+    async def resume_jobs(self) -> None:
+        """Re-queue jobs that were interrupted by a restart"""
+        for record in self.job_store.unfinished_jobs():
+            total = self.job_total(record)
+            logger.info(f"Resuming job {record['id']} for user {record['user_id']} at receipt {record['delivered'] + 1}/{total}")
+            try:
+                self.scheduler.submit(Job(record['user_id'], record['key'], self.send_receipts(record)))
+            except JobRejected as e:
+                logger.warning(f"Could not resume job {record['id']}: {e}")
+                self.job_store.finish_job(record['id'], status='rejected')
+                continue
+            try:
+                await self.application.bot.send_message(
+                    chat_id=record['chat_id'],
+                    text=f"The bot was restarted, continuing your receipts from {record['delivered'] + 1}/{total}...",
+                )
+            except Exception as e:
+                logger.warning(f"Could not notify chat {record['chat_id']} about resumed job: {e}")
+
+    def request_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Connection pool usage for the API and getUpdates backends"""
+        return {
+            'api': self.api_request.metrics.snapshot(),
+            'get_updates': self.updates_request.metrics.snapshot(),
+        }
+
+    async def track_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Note when the last update arrived, for the health endpoint"""
+        self.last_update_at = time.time()
+        self.updates_received += 1
+
+    async def health_snapshot(self) -> Dict[str, Any]:
+        """Render queue, worker pool and update figures served on /health"""
+        render_jobs = None
+        if isinstance(self.render_client, RenderQueueClient):
+            # A SQLite query, run on the queue client's own thread
+            render_jobs = await self.render_client.stats()
+        now = time.time()
+        governor = self.render_governor.stats()
+        scheduler = self.scheduler.stats()
+        return {
+            'uptime_s': round(now - self.started_at),
+            'updates_received': self.updates_received,
+            'seconds_since_last_update': round(now - self.last_update_at, 1) if self.last_update_at else None,
+            'render_queue': {
+                'jobs': scheduler['jobs'],
+                'renders_waiting': governor['queued'],
+                'renders_running': governor['running'],
+            },
+            'workers': {
+                **scheduler,
+                'renderer': self.render_client.base_url if self.render_client else self.renderer.name,
+            },
+            'render_governor': governor,
+            'render_jobs': render_jobs,
+            'render_pack': self.render_pack.stats() if self.render_pack is not None else None,
+        }
+
+    def is_authorized(self, user_id: int) -> bool:
+        """Check whether a Telegram user may use the bot"""
+        return user_id in self.allowed_user_ids
+
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle the /start command"""
-        if update.effective_user.id != self.allowed_user_id:
+        if not self.is_authorized(update.effective_user.id):
             await update.message.reply_text("Sorry, you are not authorized to use this bot.")
             return
         
         await update.message.reply_text(
-            "Welcome! Send me a message like 'food 5' or 'Food 3' to generate receipts for the last N working days."
+            "Welcome! Send me a message like 'food 5' or 'Food 3' to generate receipts for the last N working days.\n"
+            "Add 'sheet' (e.g. 'food 20 sheet') to get them tiled into one image.\n"
+            "'food 2026-01-01..2026-06-30' covers a date range: Monday to Friday by default, "
+            "add 'workdays' to skip public holidays or 'all' for every day.\n"
+            "/history 2026-03 lists the receipts you generated, /resend 2026-03-02..2026-03-06 sends them again.\n"
+            "/export 2026-01..2026-06 csv 1000 sends receipt data (items, totals, tax) as a file, without images."
         )
 
+        # Deep link from the inline results button, e.g. /start food5
+        match = re.fullmatch(r'food(\d+)', context.args[0]) if context.args else None
+        if match and 0 < int(match.group(1)) <= self.max_days_back:
+            await self.queue_receipts(update, int(match.group(1)))
+
+    async def history_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /history [period]: list archived receipts, this month by default"""
+        if not self.is_authorized(update.effective_user.id):
+            await update.message.reply_text("Sorry, you are not authorized to use this bot.")
+            return
+
+        try:
+            start, end = parse_period(context.args[0] if context.args else datetime.now().strftime('%Y-%m'))
+        except ValueError:
+            await update.message.reply_text("Please use /history 2026-03, /history 2026-03-02 or /history 2026-03-02..2026-03-13")
+            return
+
+        receipts = self.archive.history(update.effective_user.id, start, end)
+        if not receipts:
+            await update.message.reply_text(f"No receipts generated for {start:%d.%m.%Y} - {end:%d.%m.%Y}.")
+            return
+
+        lines = [
+            f"{receipt['day']:%a %d.%m.%Y}  {receipt['total']:6.2f} EUR  Bon {receipt['bon_nr']}"
+            for receipt in receipts[:self.HISTORY_LINES]
+        ]
+        if len(receipts) > self.HISTORY_LINES:
+            lines.append(f"... and {len(receipts) - self.HISTORY_LINES} more")
+        total = sum(receipt['total'] for receipt in receipts)
+        lines.append(f"{len(receipts)} receipts, {total:.2f} EUR")
+        await update.message.reply_text("\n".join(lines))
+
+    async def resend_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /resend period: send archived receipts again by file_id, without rendering"""
+        if not self.is_authorized(update.effective_user.id):
+            await update.message.reply_text("Sorry, you are not authorized to use this bot.")
+            return
+
+        try:
+            start, end = parse_period(context.args[0])
+        except (IndexError, ValueError):
+            await update.message.reply_text("Please use /resend 2026-03-02 or /resend 2026-03-02..2026-03-13")
+            return
+
+        receipts = [
+            receipt for receipt in self.archive.history(update.effective_user.id, start, end, latest_per_day=True)
+            if receipt['file_id']
+        ]
+        if not receipts:
+            await update.message.reply_text(f"No archived receipts for {start:%d.%m.%Y} - {end:%d.%m.%Y}.")
+            return
+
+        # Photos Telegram already has can be sent ten at a time; a media group needs at least two
+        for i in range(0, len(receipts), 10):
+            chunk = receipts[i:i + 10]
+            captions = [f"Receipt - {receipt['day']:%A, %d.%m.%Y}" for receipt in chunk]
+            if len(chunk) == 1:
+                await update.message.reply_photo(photo=chunk[0]['file_id'], caption=captions[0])
+            else:
+                await update.message.reply_media_group([
+                    InputMediaPhoto(receipt['file_id'], caption=caption) for receipt, caption in zip(chunk, captions)
+                ])
+
+    async def export_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /export [period] [weekdays|workdays|all] [jsonl|csv] [count]: receipt data as a document"""
+        if not self.is_authorized(update.effective_user.id):
+            await update.message.reply_text("Sorry, you are not authorized to use this bot.")
+            return
+
+        args = [arg.lower() for arg in context.args or []]
+        period = args.pop(0) if args and is_range(args[0]) else datetime.now().strftime('%Y-%m')
+        output_format, day_filter, count = 'jsonl', '', None
+        try:
+            for arg in args:
+                if arg in FORMATS:
+                    output_format = arg
+                elif arg in DAY_FILTERS:
+                    day_filter = arg
+                elif arg.isdigit() and int(arg) > 0:
+                    count = int(arg)
+                else:
+                    raise ValueError(arg)
+            start, end, day_filter = parse_range(f"{period} {day_filter}")
+        except ValueError:
+            await update.message.reply_text(
+                "Please use /export 2026-03, /export 2026-01-01..2026-06-30 csv or /export 2026-03 workdays 1000"
+            )
+            return
+
+        # Counting and exporting walk every day of the period, so bound the period first;
+        # a count spreads its receipts over at most as many days as one export may hold
+        if (end - start).days + 1 > self.export_max_receipts:
+            await update.message.reply_text(f"Please export at most {self.export_max_receipts} days at a time.")
+            return
+        loop = asyncio.get_running_loop()
+        day_count = await loop.run_in_executor(
+            None, functools.partial(count_days, start, end, day_filter, self.holidays, limit=self.export_max_receipts),
+        )
+        total = count or day_count
+        if not day_count:
+            await update.message.reply_text(f"There are no {day_filter} between {start:%d.%m.%Y} and {end:%d.%m.%Y}.")
+            return
+        if total > self.export_max_receipts:
+            await update.message.reply_text(f"Please export at most {self.export_max_receipts} receipts at a time.")
+            return
+
+        # Telegram refuses documents over 50 MB; find out before generating the whole export
+        estimate = await loop.run_in_executor(None, estimate_export_bytes, self.receipt_generator, start, total, output_format)
+        if estimate > DOCUMENT_LIMIT:
+            await update.message.reply_text(
+                f"That export would be about {estimate / 2**20:.0f} MB, more than the 50 MB Telegram accepts. "
+                f"Please export fewer receipts or a shorter period."
+            )
+            return
+
+        document = await loop.run_in_executor(
+            None, self.export_document, start, end, day_filter, day_count, count, output_format,
+        )
+        with document:
+            if os.fstat(document.fileno()).st_size > DOCUMENT_LIMIT:
+                await update.message.reply_text("That export is larger than the 50 MB Telegram accepts, please export fewer receipts.")
+                return
+            await update.message.reply_document(
+                document=document,
+                filename=f"receipts_{start:%Y-%m-%d}_{end:%Y-%m-%d}.{output_format}",
+                caption=f"{total} receipts, {start:%d.%m.%Y} - {end:%d.%m.%Y} ({day_filter})",
+            )
+
+    def export_document(
+        self, start: date, end: date, day_filter: str, day_count: int, count: Optional[int], output_format: str,
+    ) -> BinaryIO:
+        """Receipt data for a period as a JSON Lines or CSV file, written batch by batch to a temporary file"""
+        document = tempfile.TemporaryFile()
+        text = TextIOWrapper(document, encoding='utf-8', newline='')
+        days = iter_days(start, end, day_filter, self.holidays)
+        export_receipts(self.receipt_generator, spread(days, day_count, count), text, output_format)
+        text.flush()
+        text.detach()
+        document.seek(0)
+        return document
+
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle incoming messages"""
-        if update.effective_user.id != self.allowed_user_id:
+        if not self.is_authorized(update.effective_user.id):
             await update.message.reply_text("Sorry, you are not authorized to use this bot.")
             return
         
         message_text = update.message.text.strip().lower()
         
-        # Parse the message (e.g., "food 5" or "Food 3")
-        if message_text.startswith('food '):
+        # Parse the message (e.g., "food 5", "Food 3", "food 20 sheet" or "food 2026-01-01..2026-06-30")
+        if message_text.startswith('food ') and is_range(message_text[5:]):
             try:
-                days_str = message_text.split('food ')[1].strip()
+                start, end, day_filter = parse_range(message_text[5:])
+            except ValueError:
+                await update.message.reply_text(
+                    "Invalid range. Please use 'food 2026-01-01..2026-06-30', optionally followed by "
+                    "'weekdays' (default), 'workdays' (without public holidays) or 'all'"
+                )
+                return
+            await self.queue_range_receipts(update, start, end, day_filter)
+        elif message_text.startswith('food '):
+            try:
+                days_str, _, option = message_text.split('food ')[1].strip().partition(' ')
                 days_back = int(days_str)
+                if option.strip() not in ('', 'sheet'):
+                    raise ValueError(option)
                 
-                if days_back <= 0 or days_back > 30:
-                    await update.message.reply_text("Please specify a number between 1 and 30.")
+                if days_back <= 0 or days_back > self.max_days_back:
+                    await update.message.reply_text(f"Please specify a number between 1 and {self.max_days_back}.")
                     return
                 
-                await update.message.reply_text(f"Generating receipts for the last {days_back} working days...")
-                
-                # Get working days
-                working_days = self.receipt_generator.get_working_days(days_back)
-                
-                # Generate and send receipts
-                for i, day in enumerate(working_days, 1):
-                    try:
-                        # Generate receipt image
-                        png_data = self.receipt_generator.create_receipt_image(day)
-                        
-                        # Send the image
-                        caption = f"Receipt {i}/{len(working_days)} - {day.strftime('%A, %d.%m.%Y')}"
-                        await update.message.reply_photo(
-                            photo=BytesIO(png_data),
-                            caption=caption
-                        )
-                        
-                        # Small delay between messages
-                        await asyncio.sleep(1)
-                        
-                    except Exception as e:
-                        logger.error(f"Error generating receipt for {day}: {e}")
-                        await update.message.reply_text(f"Error generating receipt for {day.strftime('%d.%m.%Y')}: {str(e)}")
-                
-                await update.message.reply_text("All receipts have been generated!")
+                await self.queue_receipts(update, days_back, sheet=option.strip() == 'sheet')
                 
             except ValueError:
-                await update.message.reply_text("Invalid format. Please use 'food [number]', for example: 'food 5'")
+                await update.message.reply_text(
+                    "Invalid format. Please use 'food [number]', for example: 'food 5', or 'food 20 sheet' for one image"
+                )
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
                 await update.message.reply_text(f"An error occurred: {str(e)}")
         else:
             await update.message.reply_text("Please send a message like 'food 5' to generate receipts.")
 
+    async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Answer '@bot food N' from any chat with already uploaded receipts, never rendering"""
+        query = update.inline_query
+        if not self.is_authorized(query.from_user.id):
+            await query.answer([], cache_time=self.INLINE_CACHE_TIME, is_personal=True)
+            return
+
+        match = re.fullmatch(r'(?:food)?\s*(\d*)', query.query.strip().lower())
+        days_back = int(match.group(1)) if match and match.group(1) else 5
+        if not match or not 0 < days_back <= self.max_days_back:
+            await query.answer([], cache_time=self.INLINE_CACHE_TIME, is_personal=True)
+            return
+
+        receipts = self.inline_receipts(query.from_user.id, days_back)
+        offset = int(query.offset) if query.offset.isdigit() else 0
+        page = receipts[offset:offset + self.INLINE_PAGE_SIZE]
+        results = [
+            InlineQueryResultCachedPhoto(
+                id=str(receipt['id']),
+                photo_file_id=receipt['file_id'],
+                caption=f"Receipt - {receipt['day']:%A, %d.%m.%Y}",
+            )
+            for receipt in page
+        ]
+
+        button = None
+        missing = days_back - len(receipts)
+        if missing and offset == 0:
+            button = InlineQueryResultsButton(
+                text=f"{missing} not ready yet - generate in private chat",
+                start_parameter=f"food{days_back}",
+            )
+        more = offset + self.INLINE_PAGE_SIZE < len(receipts)
+        await query.answer(
+            results,
+            cache_time=self.INLINE_CACHE_TIME,
+            is_personal=True,
+            next_offset=str(offset + self.INLINE_PAGE_SIZE) if more else '',
+            button=button,
+        )
+
+    def inline_receipts(self, user_id: int, days_back: int) -> List[Dict[str, Any]]:
+        """Uploaded receipts for the last days_back working days: the user's own, else pre-uploaded stock"""
+        working_days = [day.date() for day in self.receipt_generator.get_working_days(days_back)]
+        start, end = working_days[0], working_days[-1]
+        by_day = {}
+        for owner in (self.INLINE_STOCK_USER, user_id):
+            for receipt in self.archive.history(owner, start, end, latest_per_day=True):
+                if receipt['file_id']:
+                    by_day[receipt['day']] = receipt
+        return [by_day[day] for day in working_days if day in by_day]
+
+    async def keep_inline_stock(self) -> None:
+        """Periodically top up the pre-uploaded receipts used by inline queries"""
+        while True:
+            try:
+                added = await self.fill_inline_stock()
+                if added:
+                    logger.info(f"Uploaded {added} receipts for inline queries")
+            except Exception as e:
+                logger.warning(f"Could not prepare receipts for inline queries: {e}")
+            await asyncio.sleep(self.inline_refresh_interval)
+
+    async def fill_inline_stock(self) -> int:
+        """Render and upload a receipt for each recent working day that has none in stock yet"""
+        working_days = self.receipt_generator.get_working_days(self.max_days_back)
+        stocked = {
+            receipt['day']
+            for receipt in self.archive.history(self.INLINE_STOCK_USER, working_days[0].date(), working_days[-1].date())
+            if receipt['file_id']
+        }
+        record = {'user_id': self.INLINE_STOCK_USER, 'chat_id': self.inline_cache_chat_id}
+        added = 0
+        for day in working_days:
+            if day.date() in stocked:
+                continue
+            seed = random.getrandbits(32)
+            png_data = await self.render_receipt(day, seed)
+            message = await self.application.bot.send_photo(
+                chat_id=self.inline_cache_chat_id,
+                photo=BytesIO(png_data),
+                caption=f"Inline receipt - {day.strftime('%A, %d.%m.%Y')}",
+                disable_notification=True,
+            )
+            self.archive_receipt(record, day, seed, message)
+            added += 1
+        return added
+
+    async def queue_receipts(self, update: Update, days_back: int, sheet: bool = False) -> None:
+        """Create a job for the last days_back working days and hand it to the scheduler"""
+        # Get working days
+        working_days = self.receipt_generator.get_working_days(days_back)
+
+        # Persist the job first so it can be resumed after a restart
+        key = f"food {days_back} sheet" if sheet else f"food {days_back}"
+        record = self.job_store.create_job(
+            user_id=update.effective_user.id,
+            chat_id=update.effective_chat.id,
+            key=key,
+            dates=working_days,
+            seeds=[random.getrandbits(32) for _ in working_days],
+        )
+        try:
+            ahead = self.scheduler.submit(Job(update.effective_user.id, key, self.send_receipts(record)))
+        except JobRejected as e:
+            self.job_store.finish_job(record['id'], status='rejected')
+            await update.message.reply_text(str(e))
+            return
+
+        if ahead:
+            await update.message.reply_text(
+                f"Queued receipts for the last {days_back} working days, starting after your current request..."
+            )
+        else:
+            await update.message.reply_text(f"Generating receipts for the last {days_back} working days...")
+
+    async def queue_range_receipts(self, update: Update, start: date, end: date, day_filter: str) -> None:
+        """Create a job for a date range; its days and seeds are generated while it runs, not stored"""
+        limit = self.range_budget.max_receipts()
+        total = count_days(start, end, day_filter, self.holidays, limit=limit)
+        if total == 0:
+            await update.message.reply_text(f"There are no {day_filter} between {start:%d.%m.%Y} and {end:%d.%m.%Y}.")
+            return
+        if total > limit:
+            await update.message.reply_text(
+                f"That range has more than {limit} receipts, about what can be delivered in "
+                f"{self.range_budget.seconds / 60:.0f} minutes at the current rate. Please pick a shorter range."
+            )
+            return
+
+        key = range_key(start, end, day_filter)
+        record = self.job_store.create_job(
+            user_id=update.effective_user.id,
+            chat_id=update.effective_chat.id,
+            key=key,
+            dates=[datetime(start.year, start.month, start.day), datetime(end.year, end.month, end.day)],
+            seeds=[random.getrandbits(32)],
+        )
+        try:
+            ahead = self.scheduler.submit(Job(update.effective_user.id, key, self.send_receipts(record)))
+        except JobRejected as e:
+            self.job_store.finish_job(record['id'], status='rejected')
+            await update.message.reply_text(str(e))
+            return
+
+        minutes = self.range_budget.estimate_seconds(total) / 60
+        queued = "Queued" if ahead else "Generating"
+        await update.message.reply_text(
+            f"{queued} {total} receipts for {start:%d.%m.%Y} - {end:%d.%m.%Y} ({day_filter}), about {minutes:.0f} min..."
+        )
+
+    def job_total(self, record: Dict[str, Any]) -> int:
+        """Number of receipts a job delivers"""
+        if is_range(record['key'][5:]):
+            start, end, day_filter = parse_range(record['key'][5:])
+            return count_days(start, end, day_filter, self.holidays)
+        return len(record['dates'])
+
+    async def render_receipt(self, day: datetime, seed: int) -> bytes:
+        """Render one receipt, through the render service or render queue if configured"""
+        # Pack reads and appends are file I/O, kept off the event loop like the render itself
+        loop = asyncio.get_running_loop()
+        if self.render_pack is not None:
+            packed = await loop.run_in_executor(None, self._packed_receipt, day, seed)
+            if packed is not None:
+                return packed
+        if self.render_client is not None:
+            png_data = await self.render_client.render(day, seed)
+        else:
+            # Render off the event loop so other updates keep flowing
+            async with self.render_governor.admit(self.receipt_generator.estimate_render_bytes()):
+                png_data = await loop.run_in_executor(None, self.renderer.render, self.receipt_generator, day, seed)
+        if self.render_pack is not None:
+            await loop.run_in_executor(None, self.render_pack.put, day, seed, png_data)
+        return png_data
+
+    def _packed_receipt(self, day: datetime, seed: int) -> Optional[bytes]:
+        try:
+            packed = self.render_pack.get(day, seed)
+        except CorruptEntry as e:
+            logger.warning(f"{e}, rendering it again")
+            return None
+        return bytes(packed) if packed is not None else None
+
+    async def send_receipts(self, record: Dict[str, Any]) -> AsyncIterator[None]:
+        """Render and send one receipt per scheduler step, starting at the first undelivered one"""
+        if record['key'].endswith(' sheet'):
+            async for step in self.send_contact_sheets(record):
+                yield step
+            return
+        if is_range(record['key'][5:]):
+            async for step in self.send_range_receipts(record):
+                yield step
+            return
+        bot = self.application.bot
+        job_id = record['id']
+        working_days = record['dates']
+        for idx in range(record['delivered'], len(working_days)):
+            day = working_days[idx]
+            seed = record['seeds'][idx]
+            try:
+                caption = f"Receipt {idx + 1}/{len(working_days)} - {day.strftime('%A, %d.%m.%Y')}"
+                file_id = self.archive.find_file_id(day, seed)
+                if file_id is not None:
+                    # Uploaded before, Telegram can send it again without a render or upload
+                    message = await bot.send_photo(chat_id=record['chat_id'], photo=file_id, caption=caption)
+                else:
+                    png_data = self.job_store.load_render(job_id, idx)
+                    if png_data is None:
+                        png_data = await self.render_receipt(day, seed)
+                        self.job_store.save_render(job_id, idx, png_data)
+
+                    # Send the image
+                    message = await bot.send_photo(
+                        chat_id=record['chat_id'],
+                        photo=BytesIO(png_data),
+                        caption=caption
+                    )
+                self.archive_receipt(record, day, seed, message)
+                
+                # Small delay between messages
+                await asyncio.sleep(1)
+                
+            except Exception as e:
+                logger.error(f"Error generating receipt for {day}: {e}")
+                await bot.send_message(
+                    chat_id=record['chat_id'],
+                    text=f"Error generating receipt for {day.strftime('%d.%m.%Y')}: {str(e)}",
+                )
+            self.job_store.mark_delivered(job_id, idx)
+            yield
+        
+        self.job_store.finish_job(job_id)
+        await bot.send_message(chat_id=record['chat_id'], text="All receipts have been generated!")
+
+    async def send_range_receipts(self, record: Dict[str, Any]) -> AsyncIterator[None]:
+        """Render and send a date range one chunk (media group) per scheduler step.
+
+        Days come from a generator and seeds are derived from the job seed, so
+        only the current chunk is ever held in memory, however long the range.
+        """
+        bot = self.application.bot
+        job_id = record['id']
+        start, end, day_filter = parse_range(record['key'][5:])
+        total = count_days(start, end, day_filter, self.holidays)
+        days = islice(iter_days(start, end, day_filter, self.holidays), record['delivered'], None)
+        job_seed = record['seeds'][0]
+        idx = record['delivered']
+        while True:
+            chunk = list(islice(days, self.range_chunk_size))
+            if not chunk:
+                break
+            seeds = [seed_for(job_seed, day) for day in chunk]
+            started = time.monotonic()
+            try:
+                photos = await asyncio.gather(*(self.range_photo(day, seed) for day, seed in zip(chunk, seeds)))
+                captions = [
+                    f"Receipt {idx + i + 1}/{total} - {day.strftime('%A, %d.%m.%Y')}" for i, day in enumerate(chunk)
+                ]
+                if len(chunk) == 1:
+                    messages = [await bot.send_photo(chat_id=record['chat_id'], photo=photos[0], caption=captions[0])]
+                else:
+                    messages = await bot.send_media_group(
+                        chat_id=record['chat_id'],
+                        media=[InputMediaPhoto(photo, caption=caption) for photo, caption in zip(photos, captions)],
+                    )
+                for day, seed, message in zip(chunk, seeds, messages):
+                    self.archive_receipt(record, day, seed, message)
+
+                # Small delay between messages
+                await asyncio.sleep(1)
+                self.range_budget.observe(len(chunk), time.monotonic() - started)
+            except Exception as e:
+                logger.error(f"Error generating receipts from {chunk[0]}: {e}")
+                await bot.send_message(
+                    chat_id=record['chat_id'],
+                    text=f"Error generating receipts {chunk[0]:%d.%m.%Y} - {chunk[-1]:%d.%m.%Y}: {str(e)}",
+                )
+            idx += len(chunk)
+            self.job_store.mark_delivered(job_id, idx - 1)
+            yield
+
+        self.job_store.finish_job(job_id)
+        await bot.send_message(chat_id=record['chat_id'], text="All receipts have been generated!")
+
+    async def range_photo(self, day: datetime, seed: int) -> Union[str, BytesIO]:
+        """The file_id of an earlier upload of this receipt, otherwise a fresh render"""
+        file_id = self.archive.find_file_id(day, seed)
+        if file_id is not None:
+            return file_id
+        return BytesIO(await self.render_receipt(day, seed))
+
+    async def send_contact_sheets(self, record: Dict[str, Any]) -> AsyncIterator[None]:
+        """Send the receipts tiled into as few photos as stay readable, one sheet per scheduler step"""
+        bot = self.application.bot
+        job_id = record['id']
+        days, seeds = record['dates'], record['seeds']
+        columns = sheet_columns(len(days), self.receipt_generator.BASE_WIDTH)
+        # Receipts are drawn straight into the sheet, which is the big allocation here
+        cost = self.receipt_generator.estimate_render_bytes() + MAX_SIDE * MAX_SIDE * 3
+        loop = asyncio.get_running_loop()
+        idx = record['delivered']
+        while idx < len(days):
+            used = None
+            try:
+                async with self.render_governor.admit(cost):
+                    png_data, used = await loop.run_in_executor(
+                        None, self.receipt_generator.create_contact_sheet, days[idx:], seeds[idx:], columns,
+                    )
+                first, last = days[idx], days[idx + used - 1]
+                await bot.send_photo(
+                    chat_id=record['chat_id'],
+                    photo=BytesIO(png_data),
+                    caption=f"Receipts {idx + 1}-{idx + used}/{len(days)} - {first:%d.%m.%Y} to {last:%d.%m.%Y}",
+                )
+                # A sheet's file_id is not a single receipt, so these cannot be re-sent one by one
+                for day, seed in zip(days[idx:idx + used], seeds[idx:idx + used]):
+                    data = self.receipt_generator.generate_receipt_data(day, random.Random(seed))
+                    self.archive.record(record['user_id'], record['chat_id'], day, seed, data)
+            except Exception as e:
+                logger.error(f"Error generating contact sheet from {days[idx]}: {e}")
+                await bot.send_message(
+                    chat_id=record['chat_id'],
+                    text=f"Error generating receipts from {days[idx].strftime('%d.%m.%Y')}: {str(e)}",
+                )
+                if used is None:
+                    # The sheet was never built; skip no more than one sheet can hold
+                    used = min(len(days) - idx, sheet_capacity(columns, self.receipt_generator.BASE_HEIGHT))
+            idx += used
+            self.job_store.mark_delivered(job_id, idx - 1)
+            yield
+
+        self.job_store.finish_job(job_id)
+        await bot.send_message(chat_id=record['chat_id'], text="All receipts have been generated!")
+
+    def archive_receipt(self, record: Dict[str, Any], day: datetime, seed: int, message: Message) -> None:
+        """Record a delivered receipt with the file_id Telegram assigned to the upload"""
+        # Totals and receipt numbers are reproduced from the seed, no need to keep the render around
+        data = self.receipt_generator.generate_receipt_data(day, random.Random(seed))
+        photo = message.photo[-1] if message.photo else None
+        self.archive.record(
+            record['user_id'], record['chat_id'], day, seed, data,
+            file_id=photo.file_id if photo else None,
+            file_unique_id=photo.file_unique_id if photo else None,
+        )
+
     def run(self):
         """Start the bot"""
         logger.info("Starting bot...")
@@ -686,10 +1365,43 @@ class TelegramBot:
         except Exception as e:
             logger.debug(f"Error detecting Docker environment: {e}")
 
-        self.application.run_polling()
+        bot_mode = os.getenv('BOT_MODE', 'polling').lower()
+        if bot_mode == 'webhook':
+            settings = self.get_webhook_settings()
+            logger.info(f"Serving updates via webhook on {settings['listen']}:{settings['port']}/{settings['url_path']}")
+            self.application.run_webhook(**settings)
+        else:
+            if bot_mode != 'polling':
+                logger.warning(f"Unknown BOT_MODE '{bot_mode}', falling back to polling")
+            self.application.run_polling()
+
+    def get_webhook_settings(self) -> Dict[str, Any]:
+        """Read webhook server settings from the environment"""
+        webhook_url = os.getenv('WEBHOOK_URL')
+        if not webhook_url:
+            raise ValueError("WEBHOOK_URL must be set when BOT_MODE=webhook")
+
+        url_path = os.getenv('WEBHOOK_PATH', 'telegram').strip('/')
+        secret_token = os.getenv('WEBHOOK_SECRET_TOKEN')
+        if not secret_token:
+            # Telegram echoes this back in X-Telegram-Bot-Api-Secret-Token, so a fresh
+            # random token per start is enough as long as nobody else needs to know it
+            secret_token = secrets.token_urlsafe(32)
+            logger.info("WEBHOOK_SECRET_TOKEN not set, generated a random secret token")
+
+        return {
+            'listen': os.getenv('WEBHOOK_LISTEN', '0.0.0.0'),
+            'port': int(os.getenv('WEBHOOK_PORT', '8443')),
+            'url_path': url_path,
+            'webhook_url': f"{webhook_url.rstrip('/')}/{url_path}",
+            'secret_token': secret_token,
+        }
 
 
 if __name__ == "__main__":
+    # Log through a background writer so file I/O never blocks the event loop
+    configure_logging('bot.log')
+
     # Try to load configuration from multiple sources
     BOT_TOKEN = None
     ALLOWED_USER_ID = None
@@ -700,9 +1412,10 @@ if __name__ == "__main__":
     
     if ALLOWED_USER_ID_STR:
         try:
-            ALLOWED_USER_ID = int(ALLOWED_USER_ID_STR)
+            # Several users can share one instance: ALLOWED_USER_ID=123,456
+            ALLOWED_USER_ID = [int(user_id) for user_id in ALLOWED_USER_ID_STR.split(',') if user_id.strip()]
         except ValueError:
-            print("Error: ALLOWED_USER_ID must be a number")
+            print("Error: ALLOWED_USER_ID must be a number or a comma-separated list of numbers")
             exit(1)
     
     # If not found in environment, try config.py
@@ -735,6 +1448,6 @@ if __name__ == "__main__":
         print("Get your user ID from @userinfobot on Telegram")
         exit(1)
     
-    print(f"Starting bot for user ID: {ALLOWED_USER_ID}")
+    print(f"Starting bot for user ID(s): {ALLOWED_USER_ID}")
     bot = TelegramBot(BOT_TOKEN, ALLOWED_USER_ID)
     bot.run()
@@ -0,0 +1,95 @@
+"""
+Prefork model for render worker processes
+A forkserver imports this module once with PREFORK_RENDERER set, which loads
+the catalog, fonts, logo and templates and draws one warm-up receipt. Every
+worker is then forked from that process and shares those pages copy-on-write
+instead of loading them again, so starting (or recycling) a worker costs a
+fork rather than an import and warm-up.
+"""
+
+import os
+import gc
+import logging
+import multiprocessing
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_ENV = 'PREFORK_RENDERER'
+LOG_FILE_ENV = 'PREFORK_LOG_FILE'
+
+_generator = None
+_renderer = None
+
+
+def _load(renderer_name: str) -> Tuple[Any, Any]:
+    from main_simple import FoodReceiptGenerator
+    from renderers import BENCHMARK_DATE, RENDERERS
+
+    generator = FoodReceiptGenerator()
+    renderer = RENDERERS[renderer_name]()
+    # Loads fonts (and their glyph caches), the scaled logo and templates
+    renderer.render(generator, BENCHMARK_DATE, seed=0, thermal=False)
+    generator.create_receipt_svg(BENCHMARK_DATE, seed=0)
+    return generator, renderer
+
+
+def preloaded(renderer_name: str = 'pil') -> Tuple[Any, Any]:
+    """Generator and renderer for this worker, inherited from the forkserver when possible"""
+    global _generator, _renderer
+    if _renderer is None or _renderer.name != renderer_name:
+        _generator, _renderer = _load(renderer_name)
+    return _generator, _renderer
+
+
+def context(renderer_name: str = 'pil', log_file: Optional[str] = None):
+    """Multiprocessing context whose workers start with everything for renderer_name loaded.
+
+    Falls back to spawn where there is no forkserver (Windows); workers then
+    load everything themselves on first use.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    # The forkserver is started on first use and inherits this environment.
+    # It does not get our sys.path, so make this directory importable for it
+    os.environ[PRELOAD_ENV] = renderer_name
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = os.environ.get('PYTHONPATH', '').split(os.pathsep)
+    if here not in paths:
+        os.environ['PYTHONPATH'] = os.pathsep.join([here] + [path for path in paths if path])
+    if log_file:
+        os.environ[LOG_FILE_ENV] = log_file
+    ctx = multiprocessing.get_context('forkserver')
+    # '__main__' too, so forked workers do not import the main script again
+    ctx.set_forkserver_preload(['__main__', __name__])
+    return ctx
+
+
+def private_memory(pid: int) -> Optional[int]:
+    """Bytes a process does not share with others (Linux only), None if unknown"""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if line.startswith('Private_'))
+    except OSError:
+        return None
+    return sum(int(value.split()[0]) for value in fields.values()) * 1024
+
+
+def _preload_in_forkserver() -> None:
+    log_file = os.environ.get(LOG_FILE_ENV)
+    if log_file:
+        from log_pipeline import configure_logging
+        # Its own file: the parent keeps writing (and rotating) the shared name
+        configure_logging(log_file, per_process=True)
+    started = datetime.now()
+    preloaded(os.environ[PRELOAD_ENV])
+    # Keep the collector from touching (and so copying) the preloaded objects in every worker
+    gc.freeze()
+    logger.info(f"Forkserver preloaded the {os.environ[PRELOAD_ENV]} renderer in "
+                f"{(datetime.now() - started).total_seconds() * 1000:.0f} ms")
+
+
+if multiprocessing.parent_process() is None and os.environ.get(PRELOAD_ENV) and _renderer is None:
+    # Only in the forkserver: the process that set PRELOAD_ENV imported this module before setting it
+    _preload_in_forkserver()
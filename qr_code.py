@@ -0,0 +1,325 @@
+"""
+QR codes for the TSE block of a receipt
+A byte-mode QR encoder (error correction level M) built on NumPy: everything
+that only depends on the symbol version (finder, timing and alignment patterns,
+format and version areas, the module placement order and the mask patterns) is
+computed once per version, so a receipt only pays for Reed-Solomon coding, one
+scatter of its codewords and the mask choice, all vectorized.
+"""
+
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+# Error correction level M, per version: (EC codewords per block,
+# (blocks, data codewords each) for both block groups). The TSE payload of a
+# receipt is 300-450 bytes, which these versions cover
+VERSIONS_M: Dict[int, Tuple[int, Tuple[Tuple[int, int], ...]]] = {
+    10: (26, ((4, 43), (1, 44))),
+    11: (30, ((1, 50), (4, 51))),
+    12: (22, ((6, 36), (2, 37))),
+    13: (22, ((8, 37), (1, 38))),
+    14: (24, ((4, 40), (5, 41))),
+    15: (24, ((5, 41), (5, 42))),
+    16: (28, ((7, 45), (3, 46))),
+    17: (28, ((10, 46), (1, 47))),
+}
+# Format information: level M is 00, then the mask number
+LEVEL_M_BITS = 0b00
+QUIET_ZONE = 4
+
+# 10111010000 and 00001011101
+_FINDER_LIKE = (0b10111010000, 0b00001011101)
+_PAD_BYTES = np.array([0xEC, 0x11], dtype=np.uint8)
+
+# GF(256) with the QR polynomial x^8 + x^4 + x^3 + x^2 + 1
+_GF_EXP = np.zeros(512, dtype=np.int32)
+_GF_LOG = np.zeros(256, dtype=np.int32)
+_value = 1
+for _power in range(255):
+    _GF_EXP[_power] = _value
+    _GF_LOG[_value] = _power
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11D
+_GF_EXP[255:510] = _GF_EXP[:255]
+
+
+def size_of(version: int) -> int:
+    return version * 4 + 17
+
+
+def capacity(version: int) -> int:
+    """Payload bytes a version holds at level M in byte mode (4 bit mode, 16 bit count)"""
+    _, groups = VERSIONS_M[version]
+    return (sum(blocks * data for blocks, data in groups) * 8 - 20) // 8
+
+
+def choose_version(length: int) -> int:
+    for version in VERSIONS_M:
+        if capacity(version) >= length:
+            return version
+    raise ValueError(f"QR payload of {length} bytes exceeds {capacity(max(VERSIONS_M))} bytes")
+
+
+def alignment_positions(version: int) -> Tuple[int, ...]:
+    count = version // 7 + 2
+    step = (version * 8 + count * 3 + 5) // (count * 4 - 4) * 2
+    last = size_of(version) - 7
+    return (6,) + tuple(reversed([last - i * step for i in range(count - 1)]))
+
+
+def _bch(data: int, generator: int, degree: int) -> int:
+    remainder = data << degree
+    for shift in range(data.bit_length() + degree - 1, degree - 1, -1):
+        if remainder >> shift & 1:
+            remainder ^= generator << (shift - degree)
+    return data << degree | remainder
+
+
+def format_bits(mask: int) -> int:
+    """15 format bits for level M and a mask pattern, BCH(15,5) coded and masked"""
+    return _bch(LEVEL_M_BITS << 3 | mask, 0x537, 10) ^ 0x5412
+
+
+def version_bits(version: int) -> int:
+    """18 version information bits, BCH(18,6) coded"""
+    return _bch(version, 0x1F25, 12)
+
+
+def _format_positions(size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(row, column) of format bit 0..14, for both copies"""
+    first = [(i, 8) for i in range(6)] + [(7, 8), (8, 8), (8, 7)] + [(8, 14 - i) for i in range(9, 15)]
+    second = [(8, size - 1 - i) for i in range(8)] + [(size - 15 + i, 8) for i in range(8, 15)]
+    rows, columns = zip(*(first + second))
+    return np.array(rows), np.array(columns)
+
+
+@lru_cache(maxsize=None)
+def _template(version: int) -> Dict[str, np.ndarray]:
+    """The parts of a symbol that do not depend on its contents, computed once per version"""
+    size = size_of(version)
+    modules = np.zeros((size, size), dtype=bool)
+    function = np.zeros((size, size), dtype=bool)
+
+    # Timing patterns
+    modules[6, :] = modules[:, 6] = np.arange(size) % 2 == 0
+    function[6, :] = function[:, 6] = True
+
+    # Finder patterns with their separators
+    offsets = np.arange(-4, 5)
+    ring = np.maximum(np.abs(offsets)[:, None], np.abs(offsets)[None, :])
+    finder = (ring != 2) & (ring != 4)
+    for row, column in ((3, 3), (3, size - 4), (size - 4, 3)):
+        rows = slice(max(row - 4, 0), min(row + 5, size))
+        columns = slice(max(column - 4, 0), min(column + 5, size))
+        modules[rows, columns] = finder[rows.start - row + 4:rows.stop - row + 4, columns.start - column + 4:columns.stop - column + 4]
+        function[rows, columns] = True
+
+    # Alignment patterns, except where they would overlap the finders
+    positions = alignment_positions(version)
+    alignment = ring[2:7, 2:7] != 1
+    for row in positions:
+        for column in positions:
+            if (row, column) in ((6, 6), (6, positions[-1]), (positions[-1], 6)):
+                continue
+            modules[row - 2:row + 3, column - 2:column + 3] = alignment
+            function[row - 2:row + 3, column - 2:column + 3] = True
+
+    # Format areas (filled in per mask below) and the dark module
+    format_rows, format_columns = _format_positions(size)
+    function[format_rows, format_columns] = True
+    modules[size - 8, 8] = function[size - 8, 8] = True
+
+    # Version information, two 6x3 blocks
+    if version >= 7:
+        bits = version_bits(version)
+        block = np.array([bits >> i & 1 for i in range(18)], dtype=bool).reshape(6, 3)
+        modules[:6, size - 11:size - 8] = block
+        modules[size - 11:size - 8, :6] = block.T
+        function[:6, size - 11:size - 8] = function[size - 11:size - 8, :6] = True
+
+    # The function patterns with each mask's format bits in place
+    masked = np.repeat(modules[None], 8, axis=0)
+    for mask in range(8):
+        bits = format_bits(mask)
+        masked[mask, format_rows, format_columns] = np.tile([bits >> i & 1 for i in range(15)], 2).astype(bool)
+
+    # Data modules in placement order: two-module columns from the right,
+    # alternately upwards and downwards, skipping the vertical timing pattern
+    order = []
+    right = size - 1
+    while right >= 1:
+        if right == 6:
+            right = 5
+        rows = range(size - 1, -1, -1) if (right + 1) & 2 == 0 else range(size)
+        order.extend((row, column) for row in rows for column in (right, right - 1) if not function[row, column])
+        right -= 2
+    order_rows, order_columns = np.array(order).T
+
+    i, j = np.indices((size, size))
+    patterns = np.stack([
+        (i + j) % 2 == 0,
+        i % 2 == 0,
+        j % 3 == 0,
+        (i + j) % 3 == 0,
+        (i // 2 + j // 3) % 2 == 0,
+        (i * j) % 2 + (i * j) % 3 == 0,
+        ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+        ((i + j) % 2 + (i * j) % 3) % 2 == 0,
+    ]) & ~function
+
+    return {
+        'function': function,
+        'masked': masked,
+        'rows': order_rows,
+        'columns': order_columns,
+        'patterns': patterns,
+        **_block_layout(version),
+    }
+
+
+def _block_layout(version: int) -> Dict[str, np.ndarray]:
+    """Index arrays splitting the data codewords into blocks and interleaving them.
+
+    Blocks are left-padded to the longest block length with a zero codeword,
+    which leaves their Reed-Solomon remainder unchanged.
+    """
+    _, groups = VERSIONS_M[version]
+    longest = max(data for _, data in groups)
+    padded, interleaved, start = [], [], 0
+    for blocks, data in groups:
+        for _ in range(blocks):
+            padded.append([-1] * (longest - data) + list(range(start, start + data)))
+            interleaved.append(list(range(start, start + data)) + [-1] * (longest - data))
+            start += data
+    interleaved = np.array(interleaved).T.ravel()
+    return {'blocks': np.array(padded), 'interleave': interleaved[interleaved >= 0]}
+
+
+@lru_cache(maxsize=None)
+def _generator_table(degree: int) -> np.ndarray:
+    """Rows of factor * generator polynomial (without its leading 1) for every factor 0..255"""
+    generator = np.array([1], dtype=np.int32)
+    for power in range(degree):
+        # Multiply by (x - a^power)
+        shifted = np.append(generator, 0)
+        scaled = np.zeros(len(shifted), dtype=np.int32)
+        nonzero = generator != 0
+        scaled[1:][nonzero] = _GF_EXP[_GF_LOG[generator[nonzero]] + power]
+        generator = shifted ^ scaled
+    factors = np.arange(256)
+    table = _GF_EXP[_GF_LOG[factors][:, None] + _GF_LOG[generator[1:]][None, :]]
+    table[0] = 0
+    return table.astype(np.uint8)
+
+
+def reed_solomon(blocks: np.ndarray, degree: int) -> np.ndarray:
+    """EC codewords for each row of a (blocks, codewords) uint8 array"""
+    table = _generator_table(degree)
+    remainder = np.zeros((len(blocks), degree), dtype=np.uint8)
+    for column in blocks.T:
+        factor = column ^ remainder[:, 0]
+        remainder[:, :-1] = remainder[:, 1:]
+        remainder[:, -1] = 0
+        remainder ^= table[factor]
+    return remainder
+
+
+def _codewords(payload: bytes, version: int) -> np.ndarray:
+    """Data and EC codewords of a payload in transmission order"""
+    degree, groups = VERSIONS_M[version]
+    layout = _template(version)
+    data_count = sum(blocks * data for blocks, data in groups)
+
+    # Byte mode indicator 0100 and the 16 bit length, then the bytes and a terminator
+    header = np.array([0b0100 << 16 | len(payload)], dtype='>u4').view(np.uint8)
+    bits = np.concatenate([
+        np.unpackbits(header)[12:],
+        np.unpackbits(np.frombuffer(payload, dtype=np.uint8)),
+        np.zeros(min(4, data_count * 8 - 20 - len(payload) * 8), dtype=np.uint8),
+    ])
+    data = np.packbits(bits)
+    data = np.concatenate([data, np.resize(_PAD_BYTES, data_count - len(data))])
+
+    padded = np.concatenate([data, [0]]).astype(np.uint8)[layout['blocks']]
+    ec = reed_solomon(padded, degree)
+    return np.concatenate([data[layout['interleave']], ec.T.ravel()])
+
+
+def _penalties(candidates: np.ndarray) -> np.ndarray:
+    """Mask evaluation score of each of a (masks, size, size) stack of symbols"""
+    count, size, _ = candidates.shape
+    scores = np.zeros(count, dtype=np.int64)
+    for symbols in (candidates, candidates.transpose(0, 2, 1)):
+        # Runs of five or more same-coloured modules in a row: 3 + (length - 5)
+        rows = np.pad(symbols.astype(np.int8), ((0, 0), (0, 0), (1, 1)), constant_values=2).reshape(-1)
+        starts = np.flatnonzero(np.diff(rows)) + 1
+        lengths = np.diff(starts)
+        long_runs = lengths >= 5
+        scores += np.bincount(starts[:-1][long_runs] // (size * (size + 2)), lengths[long_runs] - 2, count).astype(np.int64)
+
+        # Finder-like 1:1:3:1:1 patterns with four light modules on one side,
+        # found by reading every 11-module window as an 11-bit number
+        padded = np.pad(symbols, ((0, 0), (0, 0), (QUIET_ZONE, QUIET_ZONE))).astype(np.int16)
+        windows = np.zeros(padded[:, :, 10:].shape, dtype=np.int16)
+        for offset in range(11):
+            windows = windows << 1 | padded[:, :, offset:offset + windows.shape[2]]
+        scores += 40 * ((windows == _FINDER_LIKE[0]) | (windows == _FINDER_LIKE[1])).sum(axis=(1, 2))
+
+    # 2x2 blocks of one colour
+    same = (
+        (candidates[:, :-1, :-1] == candidates[:, 1:, :-1])
+        & (candidates[:, :-1, :-1] == candidates[:, :-1, 1:])
+        & (candidates[:, :-1, :-1] == candidates[:, 1:, 1:])
+    )
+    scores += 3 * same.sum(axis=(1, 2))
+
+    # Dark share away from 50%, in steps of 5%
+    total = size * size
+    dark = candidates.sum(axis=(1, 2))
+    scores += 10 * ((np.abs(dark * 20 - total * 10) + total - 1) // total - 1)
+    return scores
+
+
+def qr_matrix(payload: Union[str, bytes], mask: Optional[int] = None) -> np.ndarray:
+    """Module matrix (True = dark) of a payload, at level M in the smallest version
+    that fits; the mask with the lowest penalty is used unless one is given"""
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    version = choose_version(len(payload))
+    layout = _template(version)
+
+    codewords = _codewords(payload, version)
+    bits = np.unpackbits(codewords).astype(bool)
+    data = np.zeros(layout['function'].shape, dtype=bool)
+    data[layout['rows'][:len(bits)], layout['columns'][:len(bits)]] = bits
+
+    if mask is not None:
+        return np.where(layout['function'], layout['masked'][mask], data ^ layout['patterns'][mask])
+    candidates = np.where(layout['function'], layout['masked'], data ^ layout['patterns'])
+    return candidates[int(np.argmin(_penalties(candidates)))]
+
+
+def rasterize(matrix: np.ndarray, module: int, quiet_zone: int = QUIET_ZONE) -> np.ndarray:
+    """8-bit grayscale pixels of a module matrix, module x module pixels per module"""
+    light = np.pad(~matrix, quiet_zone, constant_values=True)
+    return np.kron(light, np.ones((module, module), dtype=bool)).astype(np.uint8) * 255
+
+
+def svg_path(matrix: np.ndarray) -> str:
+    """Path data in module units for a stroke of width 1: one horizontal line per run of dark modules"""
+    padded = np.pad(matrix.astype(np.int8), ((0, 0), (1, 1)))
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    parts = []
+    previous_row = previous_end = None
+    for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+        if row == previous_row:
+            parts.append(f"m{start - previous_end} 0h{end - start}")
+        else:
+            parts.append(f"M{start} {row}.5h{end - start}")
+        previous_row, previous_end = row, end
+    return ''.join(parts)
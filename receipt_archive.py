@@ -0,0 +1,125 @@
+import os
+import time
+import sqlite3
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def parse_period(text: str) -> Tuple[date, date]:
+    """Parse '2026-03', '2026-03-02' or '2026-03-02..2026-03-13' into an inclusive date range"""
+    text = text.strip()
+    if '..' in text:
+        start_text, end_text = text.split('..', 1)
+        start, end = parse_period(start_text)[0], parse_period(end_text)[1]
+    elif len(text) == 7:
+        start = datetime.strptime(text, '%Y-%m').date()
+        try:
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        except OverflowError:
+            raise ValueError(f"Period is out of range: {text}") from None
+    else:
+        start = end = datetime.strptime(text, '%Y-%m-%d').date()
+    if end < start:
+        raise ValueError(f"Period ends before it starts: {text}")
+    return start, end
+
+
+class ReceiptArchive:
+    """SQLite archive of every receipt that was delivered.
+
+    Besides the date, seed, total and receipt numbers it keeps the Telegram
+    file_id of the uploaded photo. Sending that file_id again re-sends the
+    receipt without rendering or uploading it, and the (user, day) index
+    makes history lookups a range scan.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS receipts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                chat_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                seed INTEGER NOT NULL,
+                total_cents INTEGER NOT NULL,
+                items INTEGER NOT NULL,
+                bon_nr TEXT NOT NULL,
+                beleg_nr TEXT NOT NULL,
+                file_id TEXT,
+                file_unique_id TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS receipts_user_day ON receipts (user_id, day);
+            CREATE INDEX IF NOT EXISTS receipts_day_seed ON receipts (day, seed);
+        """)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def record(
+        self,
+        user_id: int,
+        chat_id: int,
+        day: datetime,
+        seed: int,
+        data: Dict[str, Any],
+        file_id: Optional[str] = None,
+        file_unique_id: Optional[str] = None,
+    ) -> int:
+        """Archive a delivered receipt; data is its generate_receipt_data() dict"""
+        cursor = self.conn.execute(
+            "INSERT INTO receipts (user_id, chat_id, day, seed, total_cents, items, bon_nr, beleg_nr,"
+            " file_id, file_unique_id, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                user_id, chat_id, day.date().isoformat(), seed, round(data['total'] * 100), len(data['items']),
+                data['bon_nr'], data['beleg_nr'], file_id, file_unique_id, time.time(),
+            ),
+        )
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def find_file_id(self, day: datetime, seed: int) -> Optional[str]:
+        """file_id of an earlier upload of exactly this receipt, if any"""
+        row = self.conn.execute(
+            "SELECT file_id FROM receipts WHERE day = ? AND seed = ? AND file_id IS NOT NULL ORDER BY id DESC LIMIT 1",
+            (day.date().isoformat(), seed),
+        ).fetchone()
+        return row['file_id'] if row else None
+
+    def history(self, user_id: int, start: date, end: date, latest_per_day: bool = False) -> List[Dict[str, Any]]:
+        """Receipts delivered to a user for days in [start, end], oldest day first"""
+        query = "SELECT * FROM receipts WHERE user_id = ? AND day BETWEEN ? AND ?"
+        if latest_per_day:
+            query += " AND id IN (SELECT MAX(id) FROM receipts WHERE user_id = ? AND day BETWEEN ? AND ? GROUP BY day)"
+            params = (user_id, start.isoformat(), end.isoformat()) * 2
+        else:
+            params = (user_id, start.isoformat(), end.isoformat())
+        rows = self.conn.execute(query + " ORDER BY day, id", params).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'chat_id': row['chat_id'],
+            'day': date.fromisoformat(row['day']),
+            'seed': row['seed'],
+            'total': row['total_cents'] / 100,
+            'items': row['items'],
+            'bon_nr': row['bon_nr'],
+            'beleg_nr': row['beleg_nr'],
+            'file_id': row['file_id'],
+        }
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Receipt data export without rendering
+Generates the contents of receipts (items, totals, tax breakdown, Beleg/Trace/
+Bon numbers) in vectorized batches and streams them as JSON Lines or CSV, for
+analytics and test fixtures.
+
+python receipt_export.py [--days N | --range 2026-01-01..2026-06-30] [--count N] [--format jsonl|csv] [--output FILE]
+"""
+
+import os
+import sys
+import csv
+import json
+import random
+import argparse
+import functools
+from datetime import datetime
+from io import StringIO
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from catalog import TAX_RATES
+
+FORMATS = ('jsonl', 'csv')
+# Largest document a bot can send
+DOCUMENT_LIMIT = 50 * 1024 * 1024
+BATCH_SIZE = 65536
+# Products drawn per receipt up front; a cart not complete after these comes
+# from the generator's own sampler
+MAX_DRAWS = 32
+MIN_TOTAL_CENTS = 700
+
+CSV_FIELDS = (
+    'day', 'transaction_time', 'receipt_time', 'beleg_nr', 'trace_nr', 'bon_nr', 'bed_nr', 'kasse_nr', 'vu_nr',
+    'terminal_id', 'item_count', 'total', 'net_7', 'tax_7', 'brutto_7', 'net_19', 'tax_19', 'brutto_19', 'items',
+)
+
+# receipt_record() as one line of JSON, filled in with % formatting. The numbers'
+# ranges all have a fixed number of digits, so they need no zero padding
+_JSONL_TEMPLATE = (
+    '{"day": "%s", "transaction_time": "%s", "receipt_time": "%s", '
+    '"beleg_nr": "%d", "trace_nr": "%d", "bon_nr": "%d", "bed_nr": "%d", "kasse_nr": "%d", '
+    '"vu_nr": "%d", "terminal_id": "%d", "total": %s, '
+    '"tax": {"7": {"net": %s, "tax": %s, "brutto": %s}, "19": {"net": %s, "tax": %s, "brutto": %s}}, '
+    '"items": [%s]}\n'
+)
+
+
+def receipt_record(day: datetime, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Export record of one receipt from FoodReceiptGenerator.generate_receipt_data()"""
+    return {
+        'day': day.strftime('%Y-%m-%d'),
+        'transaction_time': f"{data['time1']}:{data['seconds1']}",
+        'receipt_time': data['time2'],
+        'beleg_nr': data['beleg_nr'],
+        'trace_nr': data['trace_nr'],
+        'bon_nr': data['bon_nr'],
+        'bed_nr': data['bed_nr'],
+        'kasse_nr': data['kasse_nr'],
+        'vu_nr': data['vu_nr'],
+        'terminal_id': data['terminal_id'],
+        'total': round(data['total'], 2),
+        'tax': {
+            str(rate): {key: round(value, 2) for key, value in data['tax_summary'][rate].items()}
+            for rate in TAX_RATES
+        },
+        'items': data['items'],
+    }
+
+
+def spread(days: Iterable[datetime], day_count: int, count: Optional[int] = None) -> Iterator[Tuple[datetime, int]]:
+    """(day, receipts) for count receipts spread evenly over day_count days, one per day by default"""
+    if count is None:
+        for day in days:
+            yield day, 1
+        return
+    for i, day in enumerate(days):
+        receipts = (i + 1) * count // day_count - i * count // day_count
+        if receipts:
+            yield day, receipts
+
+
+def batches(day_counts: Iterable[Tuple[datetime, int]], batch_size: int = BATCH_SIZE) -> Iterator[List[Tuple[datetime, int]]]:
+    """Split (day, receipts) into runs of at most batch_size receipts"""
+    batch: List[Tuple[datetime, int]] = []
+    size = 0
+    for day, receipts in day_counts:
+        while receipts:
+            take = min(receipts, batch_size - size)
+            batch.append((day, take))
+            size += take
+            receipts -= take
+            if size == batch_size:
+                yield batch
+                batch, size = [], 0
+    if batch:
+        yield batch
+
+
+class BatchGenerator:
+    """Receipt contents for a whole batch of receipts at once, with NumPy instead of a loop per draw.
+
+    Carts are drawn like FoodReceiptGenerator's: unique products from its
+    catalog selection until the total reaches 7 EUR. Each receipt draws
+    MAX_DRAWS products up front, repeats are masked out and a cumulative sum
+    finds where each cart is complete. The rare cart that is not complete by
+    then, and every cart when a cart target is configured, comes from
+    the generator's own sampler. Receipts follow the distributions of
+    rendered ones, but are not reproducible from per-receipt seeds.
+    """
+
+    def __init__(self, generator, seed: Optional[int] = None):
+        self.generator = generator
+        self.rng = np.random.default_rng(seed)
+        self.fallback_rng = random.Random(seed)
+        selection = generator.cart_selection
+        catalog = selection.catalog
+        rows = selection.rows()
+        self.prices = np.array([catalog.price_cents[row] for row in rows], dtype=np.int64)
+        self.tax_rates = np.array([catalog.tax_rates[row] for row in rows], dtype=np.int64)
+        # Products serialized once; receipts only join them
+        items = [catalog.item(row) for row in rows]
+        self.item_json = [json.dumps(item, ensure_ascii=False) for item in items]
+        self.item_text = [f"{item['name']}:{item['price']:.2f}" for item in items]
+        self._positions = {(item['name'], item['price']): position for position, item in enumerate(items)}
+
+    def generate(self, day_counts: List[Tuple[datetime, int]]) -> Dict[str, Any]:
+        """Columns of sum(receipts) receipts: days, carts, totals, tax breakdown, times and numbers"""
+        n = sum(receipts for _, receipts in day_counts)
+        rng = self.rng
+        flat, sizes = self._carts(n)
+        columns: Dict[str, Any] = {'n': n, 'items': flat, 'item_count': sizes}
+
+        # Totals and tax per receipt, summed over the flattened carts
+        owner = np.repeat(np.arange(n), sizes)
+        prices = self.prices[flat]
+        columns['total'] = np.bincount(owner, weights=prices, minlength=n) / 100
+        for rate in TAX_RATES:
+            brutto = np.bincount(owner, weights=prices * (self.tax_rates[flat] == rate), minlength=n) / 100
+            net = brutto / (1 + rate / 100)
+            columns[f'brutto_{rate}'], columns[f'net_{rate}'], columns[f'tax_{rate}'] = brutto, net, brutto - net
+
+        # Receipt between 8:00 and 17:59, card transaction 3 to 5 minutes before it
+        receipt = rng.integers(8, 18, n) * 3600 + rng.integers(0, 60, n) * 60 + rng.integers(0, 60, n)
+        columns['receipt_time'] = receipt // 60
+        columns['transaction_time'] = receipt - rng.integers(3, 6, n) * 60
+        for name, low, high in (
+            ('beleg_nr', 1000, 9999), ('trace_nr', 100000, 999999), ('bon_nr', 5000, 9999),
+            ('bed_nr', 100000, 999999), ('kasse_nr', 10, 99), ('vu_nr', 100000000, 999999999),
+            ('terminal_id', 10000000, 99999999),
+        ):
+            columns[name] = rng.integers(low, high + 1, n)
+        columns['day'] = list(chain.from_iterable([day.strftime('%Y-%m-%d')] * receipts for day, receipts in day_counts))
+        return columns
+
+    def _carts(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Product positions of n carts, concatenated, and the number of items in each"""
+        size = len(self.prices)
+        if self.generator.target_sampler is not None or size == 0:
+            return self._fallback_carts(n)
+        draws = min(MAX_DRAWS, 2 * size)
+        positions = self.rng.integers(0, size, size=(n, draws))
+        # A product drawn again within a cart is masked; the stable sort keeps its first draw
+        order = np.argsort(positions, axis=1, kind='stable')
+        ordered = np.take_along_axis(positions, order, axis=1)
+        repeated = np.zeros(ordered.shape, dtype=bool)
+        repeated[:, 1:] = ordered[:, 1:] == ordered[:, :-1]
+        duplicate = np.empty_like(repeated)
+        np.put_along_axis(duplicate, order, repeated, axis=1)
+
+        totals = np.cumsum(np.where(duplicate, 0, self.prices[positions]), axis=1)
+        complete = totals >= MIN_TOTAL_CENTS
+        lengths = complete.argmax(axis=1) + 1
+        keep = (np.arange(draws) < lengths[:, None]) & ~duplicate
+        incomplete = np.flatnonzero(~complete[:, -1])
+        if incomplete.size:
+            # Carts not complete after all draws are redrawn one by one and spliced in
+            keep[incomplete] = False
+            sizes = keep.sum(axis=1)
+            fallback_flat, fallback_sizes = self._fallback_carts(incomplete.size)
+            sizes[incomplete] = fallback_sizes
+            flat = np.empty(sizes.sum(), dtype=np.int64)
+            starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            is_fallback = np.zeros(flat.size, dtype=bool)
+            for start, count in zip(starts[incomplete].tolist(), fallback_sizes.tolist()):
+                is_fallback[start:start + count] = True
+            flat[is_fallback] = fallback_flat
+            flat[~is_fallback] = positions[keep]
+            return flat, sizes
+        return positions[keep], keep.sum(axis=1)
+
+    def _fallback_carts(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        carts = [self.generator.generate_random_shopping_cart(self.fallback_rng) for _ in range(n)]
+        flat = [self._positions[(item['name'], item['price'])] for cart in carts for item in cart]
+        return np.array(flat, dtype=np.int64), np.array([len(cart) for cart in carts], dtype=np.int64)
+
+
+@functools.lru_cache(maxsize=None)
+def _clock(seconds: bool) -> List[str]:
+    """'HH:MM:SS' for every second of the day, or 'HH:MM' for every minute"""
+    if seconds:
+        return [f"{t // 3600:02d}:{t // 60 % 60:02d}:{t % 60:02d}" for t in range(86400)]
+    return [f"{t // 60:02d}:{t % 60:02d}" for t in range(1440)]
+
+
+_CENTS: List[str] = []
+
+
+def _money(values: np.ndarray) -> List[str]:
+    """Euro amounts as '12.34', looked up by cents instead of formatting each float"""
+    cents = np.rint(values * 100).astype(np.int64)
+    highest = int(cents.max(initial=0))
+    if highest >= len(_CENTS):
+        _CENTS.extend(f"{c // 100}.{c % 100:02d}" for c in range(len(_CENTS), max(highest + 1, 2 * len(_CENTS), 10000)))
+    return [_CENTS[c] for c in cents.tolist()]
+
+
+def _item_lists(strings: List[str], columns: Dict[str, Any], separator: str) -> Iterator[str]:
+    """Each receipt's items, joined from the strings of its products"""
+    items = [strings[position] for position in columns['items'].tolist()]
+    start = 0
+    for size in columns['item_count'].tolist():
+        yield separator.join(items[start:start + size])
+        start += size
+
+
+def _rows(columns: Dict[str, Any], strings: List[str], separator: str) -> Iterator[tuple]:
+    seconds, minutes = _clock(True), _clock(False)
+    return zip(
+        columns['day'],
+        [seconds[t] for t in columns['transaction_time'].tolist()],
+        [minutes[t] for t in columns['receipt_time'].tolist()],
+        *(columns[name].tolist() for name in (
+            'beleg_nr', 'trace_nr', 'bon_nr', 'bed_nr', 'kasse_nr', 'vu_nr', 'terminal_id',
+        )),
+        *(_money(columns[name]) for name in ('total', 'net_7', 'tax_7', 'brutto_7', 'net_19', 'tax_19', 'brutto_19')),
+        _item_lists(strings, columns, separator),
+    )
+
+
+def write_jsonl(generator: BatchGenerator, columns: Dict[str, Any], out: TextIO) -> None:
+    out.writelines(
+        _JSONL_TEMPLATE % row
+        for row in _rows(columns, generator.item_json, ', ')
+    )
+
+
+def write_csv(generator: BatchGenerator, columns: Dict[str, Any], writer) -> None:
+    sizes = columns['item_count'].tolist()
+    writer.writerows(
+        row[:10] + (size,) + row[10:]
+        for row, size in zip(
+            _rows(columns, generator.item_text, '|'), sizes,
+        )
+    )
+
+
+def export_receipts(
+    generator,
+    day_counts: Iterable[Tuple[datetime, int]],
+    out: TextIO,
+    output_format: str = 'jsonl',
+    seed: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+) -> int:
+    """Write receipts for (day, receipts) pairs to out, one batch at a time; returns how many were written"""
+    if output_format not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    batch_generator = BatchGenerator(generator, seed)
+    writer = None
+    if output_format == 'csv':
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(CSV_FIELDS)
+    written = 0
+    for batch in batches(day_counts, batch_size):
+        columns = batch_generator.generate(batch)
+        if writer is not None:
+            write_csv(batch_generator, columns, writer)
+        else:
+            write_jsonl(batch_generator, columns, out)
+        written += columns['n']
+    return written
+
+
+def estimate_export_bytes(generator, day: datetime, receipts: int, output_format: str = 'jsonl', sample: int = 64) -> int:
+    """Expected size of an export of this many receipts, from a small sample written in memory"""
+    buffer = StringIO()
+    export_receipts(generator, [(day, sample)], buffer, output_format, seed=0)
+    # Item names vary in length, so leave some headroom over the sample's average
+    return int(len(buffer.getvalue().encode('utf-8')) / sample * receipts * 1.1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export receipt data as JSON Lines or CSV, without rendering")
+    period = parser.add_mutually_exclusive_group()
+    period.add_argument('--days', type=int, help="the last N working days (default 30)")
+    period.add_argument('--range', help="a date range such as 2026-01-01..2026-06-30 [weekdays|workdays|all]")
+    parser.add_argument('--count', type=int, help="receipts in total, spread over the days (default one per day)")
+    parser.add_argument('--format', choices=FORMATS, default='jsonl')
+    parser.add_argument('--seed', type=int, help="seed for reproducible output")
+    parser.add_argument('--output', help="file to write (default stdout)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from main_simple import FoodReceiptGenerator
+    from date_range import count_days, extra_holidays_from_env, iter_days, parse_range
+
+    generator = FoodReceiptGenerator()
+    if args.range:
+        start, end, day_filter = parse_range(args.range)
+        holidays = extra_holidays_from_env()
+        days: Iterable[datetime] = iter_days(start, end, day_filter, holidays)
+        day_count = count_days(start, end, day_filter, holidays)
+    else:
+        days = generator.get_working_days(args.days or 30)
+        day_count = len(days)
+    if not day_count:
+        parser.error("the period has no days")
+
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        written = export_receipts(generator, spread(days, day_count, args.count), out, args.format, args.seed)
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {written} receipts", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
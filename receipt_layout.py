@@ -0,0 +1,99 @@
+from typing import Any, Dict
+
+# Size of a QR module in layout units
+QR_MODULE = 2
+
+
+def draw_receipt(data: Dict[str, Any], canvas) -> None:
+    """Lay out the receipt for generate_receipt_data() output on a canvas.
+
+    The canvas provides logo(), text(text, x=5, center=False, bold=False),
+    item(name, price), gap(height) and qr(payload), a centered QR code with
+    its quiet zone at QR_MODULE per module, in the units of the PIL receipt at DPI
+    scale 1 (300 wide, 12 per text line). The PIL, SVG and ESC/POS outputs
+    share this layout so they print the same receipt.
+    """
+    text, gap = canvas.text, canvas.gap
+
+    canvas.logo()
+    gap(5)
+    for line in ("Reichenhainer Str. 55", "09126 Chemnitz", "Tel.: 0371-24088670", "UID Nr.: DE812706034"):
+        text(line, center=True)
+    gap(10)
+
+    for item in data['items']:
+        tax_code = 'B' if item['tax_rate'] == 7 else 'A'
+        canvas.item(item['name'][:22], f"EUR {item['price']:6.2f} {tax_code} *")
+
+    text("=" * 38, center=True)
+    text(f" SUMME                           EUR {data['total']:6.2f}")
+    text("=" * 38, center=True)
+    text(f" Geg. Mastercard                 EUR {data['total']:6.2f}")
+    gap(10)
+
+    text("* * Kundenbeleg * *", center=True, bold=True)
+    gap(8)
+    text(f"Datum:      {data['date']}")
+    text(f"Uhrzeit:    {data['time1']}:{data['seconds1']} Uhr")
+    text(f"Beleg-Nr.   {data['beleg_nr']}")
+    text(f"Trace-Nr.   {data['trace_nr']}")
+    gap(8)
+
+    for line in ("Bezahlung", "Kontaktlos", "DEBIT MASTERCARD", f"############{data['last4_digits']} 0001"):
+        text(line, center=True)
+    text("Nr.")
+    text(f"VU-Nr.                   {data['vu_nr']}")
+    text(f"Terminal-ID              {data['terminal_id']}")
+    text("Pos-Info                 00 073 00")
+    text(f"AS-Zeit {data['date'][:5]}.             {data['time1']} Uhr")
+    text("AS-Proc-Code = 00 075 00")
+    text("Capt.-Ref. = 0000")
+    text("00 GENEHMIGT")
+    text(f"Betrag EUR               {data['total']:6.2f}")
+    gap(8)
+    text("Zahlung erfolgt", center=True)
+    gap(8)
+
+    tax_summary = data['tax_summary']
+    text("Steuer %  Netto  Steuer  Brutto", bold=True)
+    for rate, label in ((7, 'B=  7,0%'), (19, 'A= 19,0%')):
+        if tax_summary[rate]['brutto'] > 0:
+            tax = tax_summary[rate]
+            text(f"{label}  {tax['net']:5.2f}  {tax['tax']:5.2f}  {tax['brutto']:5.2f}")
+    gesamt_netto = tax_summary[7]['net'] + tax_summary[19]['net']
+    gesamt_tax = tax_summary[7]['tax'] + tax_summary[19]['tax']
+    text(f"Gesamtbetrag {gesamt_netto:5.2f}  {gesamt_tax:5.2f}  {data['total']:5.2f}")
+    gap(10)
+
+    tse = data['tse']
+    text(f"TSE-Transaktion:       {tse['transaction']}")
+    text(f"TSE-Signaturzähler:    {tse['signature_counter']}")
+    text(f"TSE-Start: {tse['start']}")
+    text(f"TSE-Stop:  {tse['end']}")
+    text("TSE-Seriennummer:")
+    text(tse['serial'][:32])
+    text(tse['serial'][32:])
+    # The quiet zone around the code separates it from the text
+    canvas.qr(tse['qr_payload'])
+
+    text(f"{data['date']}     {data['time2']}  Bon-Nr.:{data['bon_nr']}")
+    text(f"Markt:0112         Kasse:{data['kasse_nr']}  Bed.:{data['bed_nr']}")
+    text("*" * 38, center=True)
+    text("Jetzt mit PAYBACK Punkten bezahlen!")
+    text("Einfach REWE Guthaben am Service-Punkt")
+    text("aufladen.", center=True)
+    gap(5)
+    text("Für die mit * gekennzeichneten Produkte")
+    text("erhalten Sie leider keine Rabatte")
+    text("oder PAYBACK Punkte.", center=True)
+    text("*" * 38, center=True)
+    gap(5)
+
+    text("REWE Markt GmbH", center=True, bold=True)
+    text("Vielen Dank für Ihren Einkauf", center=True)
+    text("Bitte beachten Sie unsere kunden-")
+    text("freundlichen Öffnungszeiten am Markt")
+    gap(8)
+    text("Sie haben Fragen?", center=True)
+    text("Antworten gibt es unter", center=True)
+    text("www.rewe.de", center=True, bold=True)
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Append-only pack files for rendered receipts
+Receipts are appended to a few large segment files instead of one small
+file each; a memory-mapped, fixed-width hash index finds any (date, seed)
+in O(1) and reads come straight out of the mapped segment.
+
+python receipt_pack.py stats|verify|compact|rebuild DIRECTORY
+"""
+
+import os
+import sys
+import mmap
+import zlib
+import struct
+import logging
+import argparse
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+HEADER_NAME = 'pack.rph'
+# magic, then the render version as UTF-8
+HEADER_MAGIC = b'RPH1'
+INDEX_NAME = 'index.rpi'
+INDEX_MAGIC = b'RPI1'
+# magic, capacity, live entries, used slots (live and deleted), dead bytes in segments
+INDEX_HEADER = struct.Struct('<4sIQQQ')
+# date ordinal (0: empty), seed, segment, crc32, offset, length, state
+SLOT = struct.Struct('<IIIIQII')
+LIVE, DELETED = 1, 2
+MIN_CAPACITY = 1024
+MAX_LOAD = 0.7
+
+ENTRY_MAGIC = b'RPE1'
+TOMBSTONE_MAGIC = b'RPD1'
+# magic, date ordinal, seed, length, crc32; the data follows
+ENTRY_HEADER = struct.Struct('<4sIIII')
+SEGMENT_SIZE = 256 * 2**20
+
+Day = Union[date, datetime]
+
+
+class CorruptEntry(Exception):
+    """Stored bytes do not match the entry's checksum"""
+
+
+def _slot_hash(ordinal: int, seed: int) -> int:
+    return ((ordinal * 0x9E3779B1) ^ (seed * 0x85EBCA77)) & 0xFFFFFFFF
+
+
+def _ordinal(day: Day) -> int:
+    return (day.date() if isinstance(day, datetime) else day).toordinal()
+
+
+class ReceiptPack:
+    """Rendered receipts keyed by (date, seed) in append-only segments.
+
+    put() appends the bytes with a small header and a CRC32 to the current
+    segment (a new one starts at segment_size) and then points the index
+    slot at them. Replaced and deleted entries stay in the segments as dead
+    bytes until compact() copies the live entries into fresh segments. The
+    index can always be rebuilt by replaying the segments. One process
+    writes a pack; get() returns a memoryview of the mapped segment that is
+    valid until the next compact() or close().
+
+    version names everything besides (date, seed) that decides the rendered
+    bytes. It is kept in the pack header, and a pack written under another
+    version is emptied on open. None keeps whatever version is stored.
+    """
+
+    def __init__(self, directory: str, segment_size: int = SEGMENT_SIZE, version: Optional[str] = None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.version = version
+        self._lock = threading.RLock()
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._index_file = None
+        self._index: Optional[mmap.mmap] = None
+        self.capacity = self.count = self.used = self.dead_bytes = 0
+        self._check_version()
+        self._segment = max(self._segments(), default=1)
+        # Cut a torn append off the open segment before anything is written behind it
+        if os.path.exists(self._segment_path(self._segment)):
+            for _ in self._scan(self._segment):
+                pass
+        self._open_index()
+
+    # Header
+
+    def _check_version(self) -> None:
+        """Drop the stored receipts if they were rendered under another version"""
+        path = os.path.join(self.directory, HEADER_NAME)
+        try:
+            with open(path, 'rb') as f:
+                header = f.read()
+        except FileNotFoundError:
+            header = b''
+        stored = header[len(HEADER_MAGIC):].decode('utf-8', 'replace') if header.startswith(HEADER_MAGIC) else None
+        if self.version is None:
+            self.version = stored or ''
+        if stored == self.version:
+            return
+        segments = list(self._segments())
+        if segments:
+            logger.warning(
+                f"Pack {self.directory} holds receipts rendered under version {stored!r}, not {self.version!r};"
+                f" dropping its {len(segments)} segments"
+            )
+        for segment in segments:
+            os.remove(self._segment_path(segment))
+        if os.path.exists(self._index_path()):
+            os.remove(self._index_path())
+        with open(path + '.tmp', 'wb') as f:
+            f.write(HEADER_MAGIC + self.version.encode('utf-8'))
+        os.replace(path + '.tmp', path)
+
+    # Index
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_NAME)
+
+    def _open_index(self) -> None:
+        path = self._index_path()
+        try:
+            self._map_index(path)
+        except (OSError, ValueError, struct.error) as e:
+            if os.path.exists(path):
+                logger.warning(f"Pack index {path} is unreadable ({e}), rebuilding it from the segments")
+            self.rebuild_index()
+
+    def _map_index(self, path: str) -> None:
+        index_file = open(path, 'r+b')
+        try:
+            index = mmap.mmap(index_file.fileno(), 0)
+        except ValueError:
+            index_file.close()
+            raise
+        magic, capacity, count, used, dead_bytes = INDEX_HEADER.unpack_from(index, 0)
+        if magic != INDEX_MAGIC or len(index) != INDEX_HEADER.size + capacity * SLOT.size:
+            index.close()
+            index_file.close()
+            raise ValueError("not a pack index")
+        self._close_index()
+        self._index_file, self._index = index_file, index
+        self.capacity, self.count, self.used, self.dead_bytes = capacity, count, used, dead_bytes
+
+    def _close_index(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index_file.close()
+            self._index = self._index_file = None
+
+    def _write_header(self) -> None:
+        INDEX_HEADER.pack_into(self._index, 0, INDEX_MAGIC, self.capacity, self.count, self.used, self.dead_bytes)
+
+    @staticmethod
+    def _create_index(path: str, capacity: int) -> None:
+        with open(path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, capacity, 0, 0, 0))
+            f.truncate(INDEX_HEADER.size + capacity * SLOT.size)
+
+    def _find(self, ordinal: int, seed: int) -> Tuple[int, Optional[tuple]]:
+        """Slot number for the key and its contents if present, else the slot to insert into"""
+        mask = self.capacity - 1
+        slot = _slot_hash(ordinal, seed) & mask
+        free = None
+        while True:
+            entry = SLOT.unpack_from(self._index, INDEX_HEADER.size + slot * SLOT.size)
+            if entry[0] == 0:
+                return (slot if free is None else free), None
+            if entry[0] == ordinal and entry[1] == seed:
+                return slot, entry
+            if entry[6] == DELETED and free is None:
+                free = slot
+            slot = (slot + 1) & mask
+
+    def _set(self, ordinal: int, seed: int, segment: int, crc: int, offset: int, length: int, state: int) -> None:
+        slot, entry = self._find(ordinal, seed)
+        if entry is not None and entry[6] == LIVE:
+            self.count -= 1
+            self.dead_bytes += ENTRY_HEADER.size + entry[5]
+        elif entry is None:
+            # A new slot, unless a deleted entry's slot is reused
+            current = SLOT.unpack_from(self._index, INDEX_HEADER.size + slot * SLOT.size)
+            if current[0] == 0:
+                self.used += 1
+        if state == LIVE:
+            self.count += 1
+        SLOT.pack_into(self._index, INDEX_HEADER.size + slot * SLOT.size, ordinal, seed, segment, crc, offset, length, state)
+
+    def _grow(self) -> None:
+        """Rehash the live entries into an index twice as large, dropping deleted slots"""
+        self._rehash(self.capacity * 2)
+
+    def _rehash(self, capacity: int, entries: Optional[Iterator[tuple]] = None, dead_bytes: Optional[int] = None) -> None:
+        path = self._index_path()
+        tmp_path = path + '.tmp'
+        if entries is None:
+            entries = iter(list(self._live_slots()))
+        self._create_index(tmp_path, capacity)
+        old = (self._index, self._index_file, self.capacity, self.count, self.used, self.dead_bytes)
+        self._index_file = open(tmp_path, 'r+b')
+        self._index = mmap.mmap(self._index_file.fileno(), 0)
+        self.capacity, self.count, self.used = capacity, 0, 0
+        self.dead_bytes = old[5] if dead_bytes is None else dead_bytes
+        for entry in entries:
+            self._set(*entry[:6], LIVE)
+        self._write_header()
+        self._index.flush()
+        new_index, new_file = self._index, self._index_file
+        new_index.close()
+        new_file.close()
+        old[0].close()
+        old[1].close()
+        os.replace(tmp_path, path)
+        self._index = self._index_file = None
+        self._map_index(path)
+
+    def _live_slots(self) -> Iterator[tuple]:
+        for slot in range(self.capacity):
+            entry = SLOT.unpack_from(self._index, INDEX_HEADER.size + slot * SLOT.size)
+            if entry[0] and entry[6] == LIVE:
+                yield entry
+
+    # Segments
+
+    def _segments(self) -> Iterator[int]:
+        for name in os.listdir(self.directory):
+            if name.startswith('segment-') and name.endswith('.rpk'):
+                yield int(name[8:-4])
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:06d}.rpk")
+
+    def _view(self, segment: int, offset: int, length: int) -> memoryview:
+        segment_map = self._maps.get(segment)
+        if segment_map is None or offset + length > len(segment_map):
+            # Mapped before the segment grew past this entry
+            with open(self._segment_path(segment), 'rb') as f:
+                self._maps[segment] = segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(segment_map)[offset:offset + length]
+
+    def _append(self, magic: bytes, ordinal: int, seed: int, data: bytes) -> Tuple[int, int, int]:
+        """Append an entry to the current segment, returns (segment, data offset, crc)"""
+        path = self._segment_path(self._segment)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size and size + ENTRY_HEADER.size + len(data) > self.segment_size:
+            self._segment += 1
+            path, size = self._segment_path(self._segment), 0
+        crc = zlib.crc32(data)
+        with open(path, 'ab') as f:
+            f.write(ENTRY_HEADER.pack(magic, ordinal, seed, len(data), crc))
+            f.write(data)
+        return self._segment, size + ENTRY_HEADER.size, crc
+
+    def _scan(self, segment: int) -> Iterator[Tuple[bytes, int, int, int, int, int]]:
+        """Entries of a segment as (magic, ordinal, seed, offset, length, crc), up to the first torn one"""
+        path = self._segment_path(segment)
+        size = os.path.getsize(path)
+        offset = 0
+        with open(path, 'rb') as f:
+            while offset + ENTRY_HEADER.size <= size:
+                f.seek(offset)
+                magic, ordinal, seed, length, crc = ENTRY_HEADER.unpack(f.read(ENTRY_HEADER.size))
+                data_offset = offset + ENTRY_HEADER.size
+                if magic not in (ENTRY_MAGIC, TOMBSTONE_MAGIC) or data_offset + length > size:
+                    # Torn by a crash mid-append; cut it off so new entries follow the last good one
+                    logger.warning(f"Pack segment {path} ends in a partial entry at {offset}, truncating it")
+                    os.truncate(path, offset)
+                    return
+                yield magic, ordinal, seed, data_offset, length, crc
+                offset = data_offset + length
+
+    # Public API
+
+    def put(self, day: Day, seed: int, data: bytes) -> None:
+        """Store the rendered receipt for (day, seed), replacing an earlier one"""
+        ordinal = _ordinal(day)
+        with self._lock:
+            if self.used + 1 > self.capacity * MAX_LOAD:
+                self._grow()
+            segment, offset, crc = self._append(ENTRY_MAGIC, ordinal, seed, data)
+            self._set(ordinal, seed, segment, crc, offset, len(data), LIVE)
+            self._write_header()
+
+    def get(self, day: Day, seed: int, verify: bool = True) -> Optional[memoryview]:
+        """The stored bytes as a view of the mapped segment, or None; CorruptEntry on a checksum mismatch"""
+        with self._lock:
+            _, entry = self._find(_ordinal(day), seed)
+            if entry is None or entry[6] != LIVE:
+                return None
+            _, _, segment, crc, offset, length, _ = entry
+            view = self._view(segment, offset, length)
+        if verify and zlib.crc32(view) != crc:
+            raise CorruptEntry(f"Receipt {day:%Y-%m-%d}/{seed} in segment {segment} at {offset} fails its checksum")
+        return view
+
+    def __contains__(self, key: Tuple[Day, int]) -> bool:
+        with self._lock:
+            _, entry = self._find(_ordinal(key[0]), key[1])
+            return entry is not None and entry[6] == LIVE
+
+    def __len__(self) -> int:
+        return self.count
+
+    def keys(self) -> Iterator[Tuple[date, int]]:
+        with self._lock:
+            entries = list(self._live_slots())
+        for entry in entries:
+            yield date.fromordinal(entry[0]), entry[1]
+
+    def delete(self, day: Day, seed: int) -> bool:
+        """Drop an entry; its bytes are reclaimed by the next compact()"""
+        ordinal = _ordinal(day)
+        with self._lock:
+            slot, entry = self._find(ordinal, seed)
+            if entry is None or entry[6] != LIVE:
+                return False
+            self._append(TOMBSTONE_MAGIC, ordinal, seed, b'')
+            SLOT.pack_into(self._index, INDEX_HEADER.size + slot * SLOT.size, *entry[:6], DELETED)
+            self.count -= 1
+            self.dead_bytes += 2 * ENTRY_HEADER.size + entry[5]
+            self._write_header()
+            return True
+
+    def segment_bytes(self) -> int:
+        return sum(os.path.getsize(self._segment_path(segment)) for segment in self._segments())
+
+    def dead_ratio(self) -> float:
+        """Share of the segment bytes taken by replaced and deleted entries"""
+        total = self.segment_bytes()
+        return self.dead_bytes / total if total else 0.0
+
+    def stats(self) -> Dict[str, Union[int, float, str]]:
+        return {
+            'entries': self.count,
+            'segments': len(list(self._segments())),
+            'bytes': self.segment_bytes(),
+            'dead_bytes': self.dead_bytes,
+            'index_capacity': self.capacity,
+            'version': self.version,
+        }
+
+    def verify(self) -> int:
+        """Check every entry against its checksum, returns the number of bad ones"""
+        bad = 0
+        for day, seed in self.keys():
+            try:
+                self.get(day, seed)
+            except CorruptEntry as e:
+                logger.error(str(e))
+                bad += 1
+        return bad
+
+    def compact(self) -> int:
+        """Copy the live entries into fresh segments and delete the old ones, returns the bytes freed"""
+        with self._lock:
+            before = self.segment_bytes()
+            old_segments = sorted(self._segments())
+            self._segment = max(old_segments, default=0) + 1
+            moved = []
+            # Date order, so a range of days reads sequentially afterwards
+            for entry in sorted(self._live_slots()):
+                ordinal, seed, segment, crc, offset, length, _ = entry
+                data = self._view(segment, offset, length)
+                if zlib.crc32(data) != crc:
+                    logger.error(f"Dropping corrupt receipt {date.fromordinal(ordinal)}/{seed} while compacting")
+                    continue
+                new_segment, new_offset, _ = self._append(ENTRY_MAGIC, ordinal, seed, data)
+                moved.append((ordinal, seed, new_segment, crc, new_offset, length))
+            capacity = MIN_CAPACITY
+            while len(moved) + 1 > capacity * MAX_LOAD:
+                capacity *= 2
+            self._rehash(capacity, iter(moved), dead_bytes=0)
+            self._release_maps()
+            for segment in old_segments:
+                os.remove(self._segment_path(segment))
+            return before - self.segment_bytes()
+
+    def rebuild_index(self) -> int:
+        """Recreate the index by replaying every segment, returns the number of live entries"""
+        with self._lock:
+            latest: Dict[Tuple[int, int], tuple] = {}
+            dead_bytes = 0
+            for segment in sorted(self._segments()):
+                for magic, ordinal, seed, offset, length, crc in self._scan(segment):
+                    previous = latest.pop((ordinal, seed), None)
+                    if previous is not None:
+                        dead_bytes += ENTRY_HEADER.size + previous[5]
+                    if magic == ENTRY_MAGIC:
+                        latest[(ordinal, seed)] = (ordinal, seed, segment, crc, offset, length)
+                    else:
+                        dead_bytes += ENTRY_HEADER.size
+            capacity = MIN_CAPACITY
+            while len(latest) + 1 > capacity * MAX_LOAD:
+                capacity *= 2
+            path = self._index_path()
+            if self._index is None:
+                # Nothing mapped yet: start from an empty index to rehash into
+                self._create_index(path, MIN_CAPACITY)
+                self._map_index(path)
+            self._rehash(capacity, iter(latest.values()), dead_bytes=dead_bytes)
+            return self.count
+
+    def _release_maps(self) -> None:
+        for segment_map in self._maps.values():
+            try:
+                segment_map.close()
+            except BufferError:
+                # A view handed out by get() is still alive; the map goes with it
+                pass
+        self._maps.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._release_maps()
+            if self._index is not None:
+                self._write_header()
+            self._close_index()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect and maintain a receipt pack")
+    parser.add_argument('command', choices=('stats', 'verify', 'compact', 'rebuild'))
+    parser.add_argument('directory', nargs='?', default=os.getenv('RENDER_PACK_DIR', os.path.join(os.getenv('DATA_DIR', 'data'), 'renders')))
+    args = parser.parse_args()
+
+    pack = ReceiptPack(args.directory)
+    try:
+        if args.command == 'verify':
+            bad = pack.verify()
+            print(f"{len(pack) - bad} entries ok, {bad} corrupt")
+            sys.exit(1 if bad else 0)
+        elif args.command == 'compact':
+            print(f"Freed {pack.compact() / 2**20:.1f} MB")
+        elif args.command == 'rebuild':
+            print(f"Indexed {pack.rebuild_index()} entries")
+        for name, value in pack.stats().items():
+            print(f"{name}: {value}")
+    finally:
+        pack.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
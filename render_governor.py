@@ -0,0 +1,119 @@
+import os
+import asyncio
+import logging
+import contextlib
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CGROUP_LIMIT_FILES = (
+    '/sys/fs/cgroup/memory.max',                     # cgroup v2
+    '/sys/fs/cgroup/memory/memory.limit_in_bytes',   # cgroup v1
+)
+
+
+def read_cgroup_memory_limit() -> Optional[int]:
+    """Memory limit of the container in bytes, or None when unlimited"""
+    for path in CGROUP_LIMIT_FILES:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value == 'max':
+            return None
+        limit = int(value)
+        # cgroup v1 reports "unlimited" as a huge page-aligned number
+        return limit if limit < 1 << 60 else None
+    return None
+
+
+def memory_budget_from_env() -> int:
+    """Render memory budget: RENDER_MEMORY_BUDGET_MB, else a share of the cgroup limit or physical memory"""
+    if os.getenv('RENDER_MEMORY_BUDGET_MB'):
+        return int(float(os.environ['RENDER_MEMORY_BUDGET_MB']) * 1024 * 1024)
+
+    fraction = float(os.getenv('RENDER_MEMORY_FRACTION', '0.5'))
+    limit = read_cgroup_memory_limit()
+    source = 'cgroup limit'
+    if limit is None:
+        limit = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        source = 'physical memory'
+    budget = int(limit * fraction)
+    logger.info(f"Render memory budget {budget // (1024 * 1024)} MB ({fraction:.0%} of {source})")
+    return budget
+
+
+class RenderGovernor:
+    """Admits renders only while their estimated memory fits in a budget.
+
+    Jobs are admitted first come, first served; a job that does not fit waits
+    (and holds back the ones behind it, so large jobs are not starved). A job
+    larger than the whole budget still runs, but only on its own.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget = budget_bytes
+        self.used = 0
+        self.running = 0
+        self.admitted = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    @contextlib.asynccontextmanager
+    async def admit(self, cost: int) -> AsyncIterator[None]:
+        await self._acquire(cost)
+        try:
+            yield
+        finally:
+            self._release(cost)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'budget_bytes': self.budget,
+            'used_bytes': self.used,
+            'running': self.running,
+            'queued': len(self._waiters),
+            'queued_bytes': sum(cost for cost, _ in self._waiters),
+            'admitted': self.admitted,
+        }
+
+    def _fits(self, cost: int) -> bool:
+        return self.running == 0 or self.used + cost <= self.budget
+
+    def _take(self, cost: int) -> None:
+        self.used += cost
+        self.running += 1
+        self.admitted += 1
+
+    async def _acquire(self, cost: int) -> None:
+        if not self._waiters and self._fits(cost):
+            self._take(cost)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (cost, future)
+        self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just before the cancellation arrived
+                self._release(cost)
+            else:
+                self._waiters.remove(waiter)
+                self._wake()
+            raise
+
+    def _release(self, cost: int) -> None:
+        self.used -= cost
+        self.running -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._fits(self._waiters[0][0]):
+            cost, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._take(cost)
+            future.set_result(None)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Durable render queue shared by the bot and separate render workers
+The bot enqueues (date, seed) jobs in a SQLite file and waits for the PNG;
+any number of worker processes or containers on the same host claim jobs
+under a lease, render them and store the result.
+
+python render_queue.py [--processes N]   run render workers on RENDER_QUEUE
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import logging
+import sqlite3
+import argparse
+import multiprocessing
+import multiprocessing.connection
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import prefork
+from log_pipeline import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+class RenderFailed(Exception):
+    """A render job failed on every attempt"""
+
+
+class RenderQueue:
+    """SQLite-backed render jobs with leases, retries and at-least-once delivery.
+
+    A worker claims the oldest available job, which leases it for
+    lease_seconds. If the worker dies, the lease runs out and another worker
+    claims the job again, so a job can be rendered more than once but is never
+    lost. A failed render goes back to the queue after retry_delay seconds
+    until it has been tried max_attempts times. The file lives on a volume
+    shared by the bot and the worker containers; WAL mode lets them read while
+    one of them writes.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60.0, max_attempts: int = 3, retry_delay: float = 2.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        # Autocommit, with explicit transactions where a read and a write must not interleave
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS render_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                day TEXT NOT NULL,
+                seed INTEGER NOT NULL,
+                thermal INTEGER,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                png BLOB,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS render_jobs_status ON render_jobs (status, available_at);
+        """)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def enqueue(self, day: datetime, seed: int, thermal: Optional[bool] = None) -> int:
+        """Add a render job and return its id"""
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO render_jobs (day, seed, thermal, available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (day.isoformat(), seed, None if thermal is None else int(thermal), now, now, now),
+        )
+        return cursor.lastrowid
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest job that is queued or whose lease ran out, if any"""
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers cannot claim the same job
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A job whose last allowed attempt lost its lease is not tried again
+            expired = self.conn.execute(
+                "UPDATE render_jobs SET status = 'failed', error = 'lease expired on the last attempt',"
+                " lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            ).rowcount
+            if expired:
+                logger.warning(f"{expired} render jobs failed after their last lease expired")
+            row = self.conn.execute(
+                "SELECT * FROM render_jobs WHERE (status = 'queued' AND available_at <= ?)"
+                " OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            if row['status'] == 'leased':
+                logger.warning(f"Lease of render job {row['id']} held by {row['lease_owner']} expired, reclaiming")
+            self.conn.execute(
+                "UPDATE render_jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?,"
+                " lease_expires = ?, updated_at = ? WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row['id']),
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return {
+            'id': row['id'],
+            'day': datetime.fromisoformat(row['day']),
+            'seed': row['seed'],
+            'thermal': None if row['thermal'] is None else bool(row['thermal']),
+            'attempt': row['attempts'] + 1,
+        }
+
+    def complete(self, job_id: int, worker: str, png_data: bytes) -> bool:
+        """Store a job's result; False if it was already completed by another worker"""
+        cursor = self.conn.execute(
+            "UPDATE render_jobs SET status = 'done', png = ?, lease_owner = ?, lease_expires = NULL, updated_at = ?"
+            " WHERE id = ? AND status != 'done'",
+            (png_data, worker, time.time(), job_id),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str) -> None:
+        """Give a failed job back for a retry, or mark it failed after max_attempts"""
+        now = time.time()
+        self.conn.execute(
+            "UPDATE render_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,"
+            " available_at = ?, lease_owner = NULL, lease_expires = NULL, error = ?, updated_at = ?"
+            " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (self.max_attempts, now + self.retry_delay, error, now, job_id, worker),
+        )
+
+    def result(self, job_id: int) -> Optional[bytes]:
+        """The PNG of a finished job, None while it is pending; raises RenderFailed"""
+        row = self.conn.execute("SELECT status, png, error FROM render_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown render job {job_id}")
+        if row['status'] == 'failed':
+            raise RenderFailed(row['error'])
+        return row['png'] if row['status'] == 'done' else None
+
+    def delete(self, job_id: int) -> None:
+        self.conn.execute("DELETE FROM render_jobs WHERE id = ?", (job_id,))
+
+    def purge(self, older_than: float = 3600.0) -> int:
+        """Drop results nobody collected, e.g. because the bot restarted while waiting"""
+        cursor = self.conn.execute(
+            "DELETE FROM render_jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (time.time() - older_than,),
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        counts = dict.fromkeys(('queued', 'leased', 'done', 'failed'), 0)
+        for row in self.conn.execute("SELECT status, COUNT(*) AS n FROM render_jobs GROUP BY status"):
+            counts[row['status']] = row['n']
+        return counts
+
+
+class RenderQueueClient:
+    """Used by the bot in place of local rendering: enqueue, then poll for the result"""
+
+    def __init__(self, path: str, timeout: float = 120.0, poll_interval: float = 0.05):
+        # SQLite calls block, so they run off the event loop on one thread that owns the connection
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='render-queue')
+        self.queue = self.executor.submit(RenderQueue, path).result()
+        # Shown where the bot reports which renderer it uses
+        self.base_url = f"sqlite:///{os.path.abspath(path)}"
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        purged = self.executor.submit(self.queue.purge).result()
+        if purged:
+            logger.info(f"Purged {purged} uncollected render results")
+
+    async def render(self, day: datetime, seed: int) -> bytes:
+        loop = asyncio.get_running_loop()
+        job_id = await loop.run_in_executor(self.executor, self.queue.enqueue, day, seed)
+        deadline = time.monotonic() + self.timeout
+        try:
+            while True:
+                png_data = await loop.run_in_executor(self.executor, self.queue.result, job_id)
+                if png_data is not None:
+                    return png_data
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No render worker finished the receipt within {self.timeout:.0f}s")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            await loop.run_in_executor(self.executor, self.queue.delete, job_id)
+
+    async def stats(self) -> Dict[str, int]:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.queue.stats)
+
+    async def close(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.queue.close)
+        self.executor.shutdown()
+
+
+def work(path: str, worker: str, renderer_name: Optional[str] = None, poll_interval: float = 0.2,
+         max_jobs: Optional[int] = None) -> int:
+    """Claim and render jobs until interrupted (or max_jobs are done); returns the number rendered"""
+    queue = RenderQueue(
+        path,
+        lease_seconds=float(os.getenv('RENDER_QUEUE_LEASE', '60')),
+        max_attempts=int(os.getenv('RENDER_QUEUE_ATTEMPTS', '3')),
+    )
+    if renderer_name is None:
+        from main_simple import FoodReceiptGenerator
+        from renderers import select_renderer
+        renderer_name = select_renderer(FoodReceiptGenerator()).name
+    # Already loaded when forked from the prefork forkserver
+    generator, renderer = prefork.preloaded(renderer_name)
+    logger.info(f"Render worker {worker} ready ({renderer.name})")
+
+    rendered = 0
+    try:
+        while max_jobs is None or rendered < max_jobs:
+            job = queue.claim(worker)
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            try:
+                png_data = renderer.render(generator, job['day'], job['seed'], job['thermal'])
+            except Exception as e:
+                logger.error(f"Render job {job['id']} failed (attempt {job['attempt']}): {e}")
+                queue.fail(job['id'], worker, str(e))
+                continue
+            if not queue.complete(job['id'], worker, png_data):
+                logger.info(f"Render job {job['id']} was already completed by another worker")
+            rendered += 1
+    finally:
+        queue.close()
+    return rendered
+
+
+def _worker_main(path: str, renderer_name: str, max_jobs: Optional[int]) -> None:
+    try:
+        work(path, f"{socket.gethostname()}-{os.getpid()}", renderer_name, max_jobs=max_jobs)
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render receipts from the shared render queue")
+    parser.add_argument('--queue', default=os.getenv('RENDER_QUEUE', os.path.join(os.getenv('DATA_DIR', 'data'), 'render_queue.sqlite3')))
+    parser.add_argument('--processes', type=int, default=int(os.getenv('RENDER_WORKER_PROCESSES', '1')))
+    parser.add_argument('--max-jobs', type=int, default=int(os.getenv('RENDER_WORKER_MAX_JOBS', '200')),
+                        help="replace a worker process after this many receipts (0: never)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    # Benchmark once here, every worker process then uses the winner
+    from main_simple import FoodReceiptGenerator
+    from renderers import select_renderer
+    renderer_name = select_renderer(FoodReceiptGenerator()).name
+
+    # Workers fork from a forkserver holding the loaded renderer; one that has
+    # rendered max_jobs receipts exits and is replaced by a fresh fork
+    ctx = prefork.context(renderer_name, 'render_worker.log')
+    processes: List[Optional[multiprocessing.Process]] = [None] * max(1, args.processes)
+    try:
+        while True:
+            for i, process in enumerate(processes):
+                if process is None or not process.is_alive():
+                    if process is not None and process.exitcode:
+                        logger.warning(f"Render worker {process.pid} exited with code {process.exitcode}")
+                    processes[i] = ctx.Process(
+                        target=_worker_main, args=(args.queue, renderer_name, args.max_jobs or None), daemon=True,
+                    )
+                    processes[i].start()
+            multiprocessing.connection.wait([process.sentinel for process in processes])
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    configure_logging('render_worker.log')
+    main()
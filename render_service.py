@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Local receipt rendering service
+Serves FoodReceiptGenerator over HTTP from a pool of pre-warmed render processes,
+so the bot and other automations share one warm renderer.
+
+POST /render  {"days": 5} or {"dates": ["2026-03-02", ...]},
+              optional "seeds": [...], "thermal": true|false and "format": "png" | "zip" | "pdf" | "svg"
+              (svg is built without the worker pool; several receipts come as a zip of SVGs)
+GET  /health
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import zipfile
+from io import BytesIO
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import httpx
+import tornado.web
+from tornado.httpserver import HTTPServer
+
+import prefork
+from main_simple import FoodReceiptGenerator
+from render_governor import RenderGovernor, memory_budget_from_env
+from log_pipeline import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Set in each worker process by _init_worker
+_generator = None
+_renderer = None
+
+
+def _init_worker(renderer_name: str = 'pil') -> None:
+    """Pick up the generator, renderer, fonts and logo preloaded by the forkserver"""
+    global _generator, _renderer
+    _generator, _renderer = prefork.preloaded(renderer_name)
+
+
+def _render_batch(jobs: List[Tuple[str, int, Optional[bool]]]) -> List[bytes]:
+    return [
+        _renderer.render(_generator, datetime.fromisoformat(day), seed, thermal)
+        for day, seed, thermal in jobs
+    ]
+
+
+def _warm_up() -> int:
+    # Stay busy briefly, so each warm-up task lands on a different worker
+    time.sleep(0.05)
+    return os.getpid()
+
+
+class RenderPool:
+    """Process pool fed with micro-batches of receipts.
+
+    Workers are forked from a forkserver that preloaded the renderer (see
+    prefork.py), and replaced after max_tasks_per_child batches to keep heap
+    fragmentation in check. Receipts requested within batch_window seconds of each other (across all
+    HTTP requests) are sent to a worker as one task, up to batch_size receipts,
+    which keeps per-task IPC overhead off small requests.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        batch_size: int = 8,
+        batch_window: float = 0.005,
+        governor: Optional[RenderGovernor] = None,
+        renderer: str = 'pil',
+        max_tasks_per_child: Optional[int] = None,
+        log_file: Optional[str] = None,
+    ):
+        self.processes = processes
+        self.renderer = renderer
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        # A worker renders its batch one receipt at a time, so a batch costs one render
+        self.governor = governor
+        self.render_cost = 0
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=prefork.context(renderer, log_file),
+            initializer=_init_worker,
+            initargs=(renderer,),
+            max_tasks_per_child=max_tasks_per_child,
+        )
+        self._pending = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def warm_up(self) -> None:
+        """Start every worker process up front so no request pays the cold start"""
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.processes)))
+        private = [prefork.private_memory(pid) for pid in set(pids)]
+        known = [size for size in private if size is not None]
+        memory = f", {max(known) / 2**20:.1f} MB private memory per worker" if known else ""
+        logger.info(f"Render pool warmed up with {len(set(pids))} worker processes{memory}")
+        if self.governor is not None:
+            self.render_cost = FoodReceiptGenerator().estimate_render_bytes()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+    async def render(self, day: datetime, seed: int, thermal: Optional[bool] = None) -> bytes:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((day.isoformat(), seed, thermal, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run_batch([job[:3] for job in batch]))
+
+        def deliver(done: asyncio.Future) -> None:
+            error = done.exception()
+            for i, (*_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(done.result()[i])
+
+        task.add_done_callback(deliver)
+
+    async def _run_batch(self, jobs: List[Tuple[str, int, Optional[bool]]]) -> List[bytes]:
+        loop = asyncio.get_running_loop()
+        if self.governor is None:
+            return await loop.run_in_executor(self.executor, _render_batch, jobs)
+        async with self.governor.admit(self.render_cost):
+            return await loop.run_in_executor(self.executor, _render_batch, jobs)
+
+
+class RenderService:
+    """Request handling shared by the HTTP handlers"""
+
+    def __init__(self, pool: RenderPool, max_concurrent: int = 4, max_queued: int = 16, max_receipts: int = 100):
+        self.pool = pool
+        self.max_receipts = max_receipts
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.limit = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        # Working days and SVG receipts come from this one generator; neither renders through the pool
+        self.generator = FoodReceiptGenerator()
+
+    def parse_request(self, payload: dict) -> Tuple[List[datetime], List[int], str, Optional[bool]]:
+        """Validate a render request, raising ValueError with a readable message"""
+        if not isinstance(payload, dict):
+            raise ValueError("request body must be a JSON object")
+        output_format = payload.get('format', 'png')
+        if output_format not in ('png', 'zip', 'pdf', 'svg'):
+            raise ValueError("format must be one of png, zip, pdf, svg")
+
+        # Bound the request before generating anything for it
+        limit = f"between 1 and {self.max_receipts} receipts can be rendered per request"
+        if 'dates' in payload:
+            dates = payload['dates']
+            if not isinstance(dates, list) or not 1 <= len(dates) <= self.max_receipts:
+                raise ValueError(limit)
+            days = [datetime.strptime(day, '%Y-%m-%d') for day in dates]
+        elif 'days' in payload:
+            count = payload['days']
+            if not isinstance(count, int) or isinstance(count, bool):
+                raise ValueError("'days' must be an integer")
+            if not 1 <= count <= self.max_receipts:
+                raise ValueError(limit)
+            days = self.generator.get_working_days(count)
+        else:
+            raise ValueError("either 'dates' or 'days' is required")
+        if output_format == 'png' and len(days) > 1:
+            raise ValueError("png output holds a single receipt, use zip or pdf for several")
+
+        seeds = payload.get('seeds') or [random.getrandbits(32) for _ in days]
+        if len(seeds) != len(days):
+            raise ValueError("'seeds' must have one entry per receipt")
+        thermal = payload.get('thermal')
+        if thermal is not None and not isinstance(thermal, bool):
+            raise ValueError("'thermal' must be true or false")
+        return days, [int(seed) for seed in seeds], output_format, thermal
+
+    async def render(
+        self, days: List[datetime], seeds: List[int], output_format: str, thermal: Optional[bool] = None
+    ) -> Tuple[bytes, str, str]:
+        """Render receipts and package them, returning (body, content type, file name)"""
+        if output_format == 'svg':
+            return self._svg(days, seeds)
+        async with self.limit:
+            pngs = await asyncio.gather(*(self.pool.render(day, seed, thermal) for day, seed in zip(days, seeds)))
+        loop = asyncio.get_running_loop()
+        if output_format == 'png':
+            return pngs[0], 'image/png', f"receipt_{days[0]:%Y-%m-%d}.png"
+        if output_format == 'zip':
+            body = await loop.run_in_executor(None, self._zip, days, pngs)
+            return body, 'application/zip', 'receipts.zip'
+        body = await loop.run_in_executor(None, self._pdf, pngs)
+        return body, 'application/pdf', 'receipts.pdf'
+
+    def _svg(self, days: List[datetime], seeds: List[int]) -> Tuple[bytes, str, str]:
+        # SVG is string templating, cheap enough to skip the worker pool entirely
+        svgs = [self.generator.create_receipt_svg(day, seed).encode('utf-8') for day, seed in zip(days, seeds)]
+        if len(svgs) == 1:
+            return svgs[0], 'image/svg+xml', f"receipt_{days[0]:%Y-%m-%d}.svg"
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for i, (day, svg) in enumerate(zip(days, svgs), 1):
+                archive.writestr(f"{i:03d}_receipt_{day:%Y-%m-%d}.svg", svg)
+        return buffer.getvalue(), 'application/zip', 'receipts.zip'
+
+    @staticmethod
+    def _zip(days: List[datetime], pngs: List[bytes]) -> bytes:
+        buffer = BytesIO()
+        # PNGs are already compressed, storing them is much cheaper than deflating again
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for i, (day, png_data) in enumerate(zip(days, pngs), 1):
+                archive.writestr(f"{i:03d}_receipt_{day:%Y-%m-%d}.png", png_data)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _pdf(pngs: List[bytes]) -> bytes:
+        from PIL import Image
+        pages = [Image.open(BytesIO(png_data)).convert('RGB') for png_data in pngs]
+        buffer = BytesIO()
+        pages[0].save(buffer, format='PDF', save_all=True, append_images=pages[1:], resolution=300)
+        return buffer.getvalue()
+
+
+class RenderHandler(tornado.web.RequestHandler):
+    def initialize(self, service: RenderService):
+        self.service = service
+
+    async def post(self):
+        service = self.service
+        if service.active >= service.max_concurrent + service.max_queued:
+            raise tornado.web.HTTPError(503, reason="Render queue is full")
+        try:
+            payload = json.loads(self.request.body or b'{}')
+            days, seeds, output_format, thermal = service.parse_request(payload)
+        except (ValueError, TypeError) as e:
+            self.set_status(400)
+            self.finish({'error': str(e)})
+            return
+
+        service.active += 1
+        try:
+            body, content_type, filename = await service.render(days, seeds, output_format, thermal)
+        finally:
+            service.active -= 1
+
+        self.set_header('Content-Type', content_type)
+        self.set_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.set_header('X-Receipt-Seeds', ','.join(str(seed) for seed in seeds))
+        self.finish(body)
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    def initialize(self, service: RenderService):
+        self.service = service
+
+    def get(self):
+        status = {
+            'status': 'ok',
+            'processes': self.service.pool.processes,
+            'renderer': self.service.pool.renderer,
+            'active_requests': self.service.active,
+        }
+        if self.service.pool.governor is not None:
+            status['memory'] = self.service.pool.governor.stats()
+        self.finish(status)
+
+
+def make_app(service: RenderService) -> tornado.web.Application:
+    return tornado.web.Application([
+        (r"/render", RenderHandler, {'service': service}),
+        (r"/health", HealthHandler, {'service': service}),
+    ])
+
+
+class RenderServiceClient:
+    """Client used by the bot to render through a shared render service"""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip('/')
+        # Keep-alive connections to the local service
+        self.client = httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(keepalive_expiry=60))
+
+    async def render(self, day: datetime, seed: int) -> bytes:
+        response = await self.client.post(
+            f"{self.base_url}/render",
+            json={'dates': [day.strftime('%Y-%m-%d')], 'seeds': [seed], 'format': 'png'},
+        )
+        response.raise_for_status()
+        return response.content
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+async def serve() -> None:
+    host = os.getenv('RENDER_SERVICE_HOST', '127.0.0.1')
+    port = int(os.getenv('RENDER_SERVICE_PORT', '8080'))
+    # Benchmark the backends once here, every worker then uses the winner
+    from renderers import select_renderer
+    renderer = select_renderer(FoodReceiptGenerator())
+    pool = RenderPool(
+        processes=int(os.getenv('RENDER_POOL_SIZE', str(os.cpu_count() or 1))),
+        batch_size=int(os.getenv('RENDER_BATCH_SIZE', '8')),
+        batch_window=float(os.getenv('RENDER_BATCH_WINDOW_MS', '5')) / 1000,
+        governor=RenderGovernor(memory_budget_from_env()),
+        renderer=renderer.name,
+        max_tasks_per_child=int(os.getenv('RENDER_WORKER_MAX_JOBS', '200')) or None,
+        log_file='render_service.log',
+    )
+    service = RenderService(
+        pool,
+        max_concurrent=int(os.getenv('RENDER_MAX_CONCURRENT', '4')),
+        max_queued=int(os.getenv('RENDER_MAX_QUEUED', '16')),
+        max_receipts=int(os.getenv('RENDER_MAX_RECEIPTS', '100')),
+    )
+    await pool.warm_up()
+
+    server = HTTPServer(make_app(service), idle_connection_timeout=75)
+    server.listen(port, address=host)
+    logger.info(f"Render service listening on http://{host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    configure_logging('render_service.log')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,354 @@
+import os
+import time
+import base64
+import random
+import shutil
+import logging
+import functools
+from io import BytesIO
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Type
+
+from PIL import Image
+
+from thermal_effects import apply_thermal_effects
+from qr_code import QUIET_ZONE, qr_matrix, svg_path
+from svg_receipt import rasterize, rasterizer_available, receipt_svg
+
+logger = logging.getLogger(__name__)
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rewe_logo.svg')
+
+# Receipt used for the startup benchmark and quality check
+BENCHMARK_DATE = datetime(2026, 3, 2)
+BENCHMARK_SEED = 1
+
+HTML_TEMPLATE = """
+<html>
+<head>
+  <meta charset="utf-8">
+  <style>
+    body { background-color: #FFF; margin: 0; padding: 0; }
+    #receipt { font-family: 'Courier New', Courier, monospace; font-size: 16px; line-height: 1.4; color: #000; background-color: #FFF; padding: 25px; width: 450px; }
+    .logo { width: 200px; margin: 0 auto 20px auto; display: block; }
+    .center { text-align: center; }
+    .qr { width: 180px; margin: 10px auto; display: block; }
+    pre { font-family: 'Courier New', Courier, monospace; font-size: 16px; margin: 0; padding: 0; }
+  </style>
+</head>
+<body>
+  <div id="receipt">
+    <img class="logo" src="{{ logo_src }}" alt="REWE Logo" />
+    <pre class="center">
+REWE
+Ballindamm 40
+20095 Hamburg
+Tel.: 040-27169854
+UID Nr.: DE812706034
+    </pre>
+    <br>
+    <pre>
+{{ items_html }}
+========================================
+SUMME                              EUR {{ total_padded }}
+========================================
+Geg. Mastercard                    EUR {{ total_padded }}
+
+           * * Kundenbeleg * *
+
+Datum:      {{ date }}
+Uhrzeit:    {{ time1 }}:{{ seconds1 }} Uhr
+Beleg-Nr.   {{ beleg_nr }}
+Trace-Nr.   {{ trace_nr }}
+
+            Bezahlung
+            Kontaktlos
+            DEBIT MASTERCARD
+            ############{{ last4_digits }} 0001
+Nr.
+VU-Nr.                             {{ vu_nr }}
+Terminal-ID                        {{ terminal_id }}
+Pos-Info                           00 073 00
+AS-Zeit {{ date[:5] }}.                       {{ time1 }} Uhr
+AS-Proc-Code = 00 075 00
+Capt.-Ref. = 0000
+00 GENEHMIGT
+Betrag EUR                         {{ total_padded }}
+
+            Zahlung erfolgt
+
+{{ tax_table_html }}
+
+TSE-Transaktion:                   {{ tse.transaction }}
+TSE-Signaturzähler:                {{ tse.signature_counter }}
+TSE-Start:        {{ tse.start }}
+TSE-Stop:         {{ tse.end }}
+TSE-Seriennummer:
+{{ tse.serial }}
+    </pre>
+    <img class="qr" src="{{ qr_src }}" alt="TSE QR-Code" />
+    <pre>
+{{ date }}         {{ time2 }}      Bon-Nr.:{{ bon_nr }}
+Markt:0112             Kasse:{{ kasse_nr }}    Bed.:{{ bed_nr }}
+****************************************
+Jetzt mit PAYBACK Punkten bezahlen!
+Einfach REWE Guthaben am Service-Punkt
+                aufladen.
+
+  Für die mit * gekennzeichneten Produkte
+   erhalten Sie leider keine Rabatte
+           oder PAYBACK Punkte.
+****************************************
+
+          REWE Markt GmbH
+    Vielen Dank für Ihren Einkauf
+Bitte beachten Sie unsere kunden-
+freundlichen Öffnungszeiten am Markt
+
+         Sie haben Fragen?
+     Antworten gibt es unter
+           www.rewe.de
+    </pre>
+  </div>
+</body>
+</html>
+"""
+
+
+def format_items_html(shopping_cart: List[Dict[str, Any]]) -> str:
+    """Format shopping cart items for HTML display"""
+    items_html = []
+    for item in shopping_cart:
+        tax_code = 'B' if item['tax_rate'] == 7 else 'A'
+        name_padded = item['name'].ljust(28)
+        price_padded = f"{item['price']:.2f}".rjust(7)
+        items_html.append(f"{name_padded}EUR {price_padded} {tax_code} *")
+
+    return '\n'.join(items_html)
+
+
+def format_tax_table_html(tax_summary: Dict[int, Dict[str, float]], total: float) -> str:
+    """Format tax summary table for HTML display"""
+    lines = ['Steuer %      Netto      Steuer      Brutto']
+
+    if tax_summary[7]['brutto'] > 0:
+        lines.append(f"B=  7,0%     {tax_summary[7]['net']:7.2f}     {tax_summary[7]['tax']:7.2f}     {tax_summary[7]['brutto']:7.2f}")
+
+    if tax_summary[19]['brutto'] > 0:
+        lines.append(f"A= 19,0%     {tax_summary[19]['net']:7.2f}     {tax_summary[19]['tax']:7.2f}     {tax_summary[19]['brutto']:7.2f}")
+
+    gesamt_netto = tax_summary[7]['net'] + tax_summary[19]['net']
+    gesamt_tax = tax_summary[7]['tax'] + tax_summary[19]['tax']
+    lines.append(f"Gesamtbetrag  {gesamt_netto:7.2f}     {gesamt_tax:7.2f}     {total:7.2f}")
+
+    return '\n'.join(lines)
+
+
+@functools.lru_cache(maxsize=1)
+def _html_template():
+    from jinja2 import Template
+    return Template(HTML_TEMPLATE)
+
+
+@functools.lru_cache(maxsize=1)
+def local_logo_src() -> str:
+    """rewe_logo.svg as a data URI, so rendering does not fetch the logo over the network"""
+    with open(LOGO_PATH, 'rb') as f:
+        return 'data:image/svg+xml;base64,' + base64.b64encode(f.read()).decode('ascii')
+
+
+def qr_image_src(payload: str) -> str:
+    """The TSE QR code as an SVG data URI"""
+    matrix = qr_matrix(payload)
+    modules = len(matrix) + 2 * QUIET_ZONE
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{-QUIET_ZONE} {-QUIET_ZONE} {modules} {modules}">'
+        f'<path stroke="#000" shape-rendering="crispEdges" d="{svg_path(matrix)}"/></svg>'
+    )
+    return 'data:image/svg+xml;base64,' + base64.b64encode(svg.encode('ascii')).decode('ascii')
+
+
+def render_receipt_html(data: Dict[str, Any], logo_src: Optional[str] = None) -> str:
+    """Fill the HTML receipt template with generate_receipt_data() output"""
+    total = float(data['total'])
+    return _html_template().render(
+        **data,
+        logo_src=logo_src or local_logo_src(),
+        total_padded=f"{total:.2f}".rjust(7),
+        items_html=format_items_html(data['items']),
+        tax_table_html=format_tax_table_html(data['tax_summary'], total),
+        qr_src=qr_image_src(data['tse']['qr_payload']),
+    )
+
+
+def _with_thermal_effects(generator, png_data: bytes, rng: random.Random, thermal: Optional[bool]) -> bytes:
+    """Apply the thermal-print stage to a rendered PNG, seeded like the PIL renderer does it"""
+    if thermal is None:
+        thermal = generator.thermal_effects
+    if not thermal:
+        return png_data
+    image = apply_thermal_effects(Image.open(BytesIO(png_data)), rng.getrandbits(32))
+    buffer = BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+class RendererUnavailable(Exception):
+    """A renderer backend cannot run in this environment"""
+
+
+class ReceiptRenderer:
+    """Turns the receipt for a date and seed into PNG bytes.
+
+    Backends take the receipt contents from FoodReceiptGenerator, so the same
+    date and seed give the same receipt whichever backend draws it.
+    """
+
+    name = ''
+
+    def check(self) -> None:
+        """Raise RendererUnavailable if a dependency of this backend is missing"""
+
+    def render(self, generator, target_date: datetime, seed: Optional[int] = None, thermal: Optional[bool] = None) -> bytes:
+        raise NotImplementedError
+
+
+RENDERERS: Dict[str, Type[ReceiptRenderer]] = {}
+
+
+def register_renderer(cls: Type[ReceiptRenderer]) -> Type[ReceiptRenderer]:
+    """Class decorator adding a backend to the registry under its name"""
+    RENDERERS[cls.name] = cls
+    return cls
+
+
+@register_renderer
+class PilRenderer(ReceiptRenderer):
+    """Draws the receipt with PIL (main_simple.py's renderer), needs no external tools"""
+
+    name = 'pil'
+
+    def render(self, generator, target_date: datetime, seed: Optional[int] = None, thermal: Optional[bool] = None) -> bytes:
+        return generator.create_receipt_image(target_date, seed, thermal)
+
+
+@register_renderer
+class HtmlRenderer(ReceiptRenderer):
+    """Renders the HTML receipt template with wkhtmltoimage through imgkit"""
+
+    name = 'html'
+    IMGKIT_OPTIONS = {
+        'width': 500,
+        'encoding': 'UTF-8',
+        'format': 'png',
+        'quiet': '',
+    }
+
+    def check(self) -> None:
+        try:
+            import imgkit  # noqa: F401
+            import jinja2  # noqa: F401
+        except ImportError as e:
+            raise RendererUnavailable(f"{e.name} is not installed")
+        if shutil.which('wkhtmltoimage') is None:
+            raise RendererUnavailable("wkhtmltoimage is not on PATH")
+
+    def render(self, generator, target_date: datetime, seed: Optional[int] = None, thermal: Optional[bool] = None) -> bytes:
+        import imgkit
+
+        rng = random.Random(seed) if seed is not None else random.Random()
+        html = render_receipt_html(generator.generate_receipt_data(target_date, rng))
+        png_data = imgkit.from_string(html, False, options=self.IMGKIT_OPTIONS)
+        return _with_thermal_effects(generator, png_data, rng, thermal)
+
+
+@register_renderer
+class SvgRenderer(ReceiptRenderer):
+    """Builds the SVG receipt by string templating and rasterizes it with cairosvg"""
+
+    name = 'svg'
+    WIDTH = 300
+
+    def check(self) -> None:
+        available, reason = rasterizer_available()
+        if not available:
+            raise RendererUnavailable(f"cairosvg cannot be used: {reason}")
+
+    def render(self, generator, target_date: datetime, seed: Optional[int] = None, thermal: Optional[bool] = None) -> bytes:
+        rng = random.Random(seed) if seed is not None else random.Random()
+        svg = receipt_svg(generator.generate_receipt_data(target_date, rng))
+        return _with_thermal_effects(generator, rasterize(svg, self.WIDTH), rng, thermal)
+
+
+def check_quality(png_data: bytes, min_width: int = 300) -> Optional[str]:
+    """Why a rendered receipt is not usable, or None if it looks like a receipt"""
+    try:
+        image = Image.open(BytesIO(png_data))
+        image.load()
+    except Exception as e:
+        return f"not a readable image ({e})"
+    width, height = image.size
+    if width < min_width:
+        return f"too narrow ({width}px < {min_width}px)"
+    if height < width * 2:
+        return f"not receipt shaped ({width}x{height})"
+    # Share of dark pixels: a blank page or an error message has almost none
+    histogram = image.convert('L').histogram()
+    ink = sum(histogram[:128]) / (width * height)
+    if not 0.01 <= ink <= 0.5:
+        return f"unexpected amount of ink ({ink:.1%})"
+    return None
+
+
+def benchmark_renderers(generator, runs: int = 3) -> List[Dict[str, Any]]:
+    """Try every registered backend on a sample receipt: availability, quality and best time"""
+    results = []
+    for name, cls in RENDERERS.items():
+        result = {'name': name, 'seconds': None, 'problem': None}
+        results.append(result)
+        renderer = cls()
+        try:
+            renderer.check()
+            # The first render also loads fonts and templates, so it is not timed
+            png_data = renderer.render(generator, BENCHMARK_DATE, BENCHMARK_SEED, thermal=False)
+            result['problem'] = check_quality(png_data)
+            if result['problem'] is None:
+                timings = []
+                # A new receipt each run, so no backend is timed on a cached render
+                for _ in range(runs):
+                    seed = random.getrandbits(32)
+                    start = time.perf_counter()
+                    renderer.render(generator, BENCHMARK_DATE, seed, thermal=False)
+                    timings.append(time.perf_counter() - start)
+                result['seconds'] = min(timings)
+        except Exception as e:
+            result['problem'] = str(e)
+    return results
+
+
+def select_renderer(generator, preferred: Optional[str] = None) -> ReceiptRenderer:
+    """Pick the backend from RECEIPT_RENDERER, or the fastest one that passes the quality check.
+
+    A preferred backend that is unknown, unavailable or fails the check falls
+    back to automatic selection; PIL is the last resort as it needs nothing
+    beyond Pillow.
+    """
+    preferred = (preferred or os.getenv('RECEIPT_RENDERER', 'auto')).lower()
+    results = benchmark_renderers(generator)
+    for result in results:
+        if result['problem']:
+            logger.info(f"Renderer {result['name']}: unavailable ({result['problem']})")
+        else:
+            logger.info(f"Renderer {result['name']}: {result['seconds'] * 1000:.1f} ms per receipt")
+
+    usable = [result for result in results if result['problem'] is None]
+    if not usable:
+        logger.warning("No renderer passed the benchmark, using PIL")
+        return PilRenderer()
+    chosen = next((result for result in usable if result['name'] == preferred), None)
+    if chosen is None:
+        if preferred != 'auto':
+            logger.warning(f"Renderer '{preferred}' is not usable here, selecting automatically")
+        chosen = min(usable, key=lambda result: result['seconds'])
+    logger.info(f"Using renderer: {chosen['name']}")
+    return RENDERERS[chosen['name']]()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class JobRejected(Exception):
+    """Raised when a job cannot be queued for a user"""
+
+
+class Job:
+    """A queued request from one user, executed one step at a time"""
+
+    def __init__(self, user_id: int, key: str, steps: AsyncIterator[None], description: str = ''):
+        self.user_id = user_id
+        self.key = key
+        self.steps = steps
+        self.description = description or key
+
+
+class JobScheduler:
+    """Per-user job queues dispatched round-robin to a fixed set of workers.
+
+    Each step of a job (e.g. rendering and sending one receipt) is a unit of
+    work. After a step the user goes to the back of the ready queue, so a long
+    request from one user never starves the others. A user only ever has one
+    step running at a time, which keeps their receipts in order.
+    """
+
+    def __init__(self, workers: int = 2, max_jobs_per_user: int = 2):
+        self.workers = max(1, workers)
+        self.max_jobs_per_user = max(1, max_jobs_per_user)
+        self._queues: Dict[int, Deque[Job]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop"""
+        self._ready = asyncio.Queue()
+        # Users that submitted before start() are waiting for a worker
+        for user_id in self._queues:
+            self._ready.put_nowait(user_id)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"receipt-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Job scheduler started with {self.workers} workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks and drop queued jobs"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in self._queues.values():
+            for job in queue:
+                await self._close(job)
+        self._queues.clear()
+
+    def submit(self, job: Job) -> int:
+        """Queue a job and return how many of the user's jobs are ahead of it"""
+        queue = self._queues.get(job.user_id)
+        if queue is not None:
+            if any(queued.key == job.key for queued in queue):
+                raise JobRejected("This request is already in progress.")
+            if len(queue) >= self.max_jobs_per_user:
+                raise JobRejected(
+                    f"You already have {len(queue)} requests in progress, please wait for them to finish."
+                )
+            queue.append(job)
+        else:
+            queue = self._queues[job.user_id] = deque([job])
+            # A user only enters the ready queue when they had no pending work;
+            # otherwise the worker handling them re-queues them after the step
+            if self._ready is not None:
+                self._ready.put_nowait(job.user_id)
+
+        logger.info(f"Queued job '{job.description}' for user {job.user_id} ({len(queue)} in user queue)")
+        return len(queue) - 1
+
+    def pending(self, user_id: Optional[int] = None) -> int:
+        """Number of queued or running jobs, for one user or overall"""
+        if user_id is not None:
+            return len(self._queues.get(user_id, ()))
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> Dict[str, int]:
+        """Worker and queue figures for health reporting"""
+        return {
+            'workers': self.workers,
+            'workers_alive': sum(1 for task in self._tasks if not task.done()),
+            'users': len(self._queues),
+            'jobs': self.pending(),
+            'ready_users': self._ready.qsize() if self._ready is not None else 0,
+        }
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            user_id = await self._ready.get()
+            queue = self._queues.get(user_id)
+            if not queue:
+                continue
+
+            job = queue[0]
+            finished = False
+            try:
+                await job.steps.__anext__()
+            except StopAsyncIteration:
+                finished = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job '{job.description}' for user {user_id} failed: {e}")
+                await self._close(job)
+                finished = True
+
+            if finished:
+                queue.popleft()
+                logger.info(f"Finished job '{job.description}' for user {user_id} on worker {worker_id}")
+            if queue:
+                self._ready.put_nowait(user_id)
+            else:
+                del self._queues[user_id]
+
+    @staticmethod
+    async def _close(job: Job) -> None:
+        aclose = getattr(job.steps, 'aclose', None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception as e:
+                logger.debug(f"Error closing job '{job.description}': {e}")
@@ -0,0 +1,110 @@
+import os
+import re
+import functools
+from typing import Any, Dict, List, Tuple
+from xml.sax.saxutils import escape
+
+from qr_code import QUIET_ZONE, qr_matrix, svg_path
+from receipt_layout import QR_MODULE, draw_receipt
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rewe_logo.svg')
+
+# Same units as the PIL receipt at DPI scale 1: 300 wide, 10pt text on 12pt lines
+WIDTH = 300
+LINE_HEIGHT = 12
+ITEM_LINE_HEIGHT = 10.8
+FONT_SIZE = 10
+BOLD_FONT_SIZE = 12
+# The wordmark only fills this band of the logo's 24x24 viewBox
+LOGO_VIEWBOX = '0 8.7 24 6.6'
+LOGO_HEIGHT = 35
+
+
+@functools.lru_cache(maxsize=1)
+def _logo_path() -> str:
+    """Path data of the vector logo in rewe_logo.svg"""
+    with open(LOGO_PATH, encoding='utf-8') as f:
+        return re.search(r'<path d="([^"]+)"', f.read()).group(1)
+
+
+class _Layout:
+    """Collects SVG elements top to bottom, as draw_receipt() calls it"""
+
+    def __init__(self):
+        self.y = 10.0
+        self.parts: List[str] = []
+
+    def text(self, text: str, x: float = 5, center: bool = False, bold: bool = False) -> None:
+        size = BOLD_FONT_SIZE if bold else FONT_SIZE
+        attrs = f'x="{WIDTH / 2:g}" text-anchor="middle"' if center else f'x="{x:g}"'
+        if bold:
+            attrs += f' font-size="{size}" font-weight="bold"'
+        # SVG positions text by its baseline, PIL by its top
+        self.parts.append(f'<text {attrs} y="{self.y + size * 0.8:.1f}">{escape(text)}</text>')
+        self.y += LINE_HEIGHT
+
+    def item(self, name: str, price: str) -> None:
+        baseline = self.y + FONT_SIZE * 0.8
+        self.parts.append(f'<text x="8" y="{baseline:.1f}">{escape(name)}</text>')
+        self.parts.append(f'<text x="268" y="{baseline:.1f}" text-anchor="end">{escape(price)}</text>')
+        self.y += ITEM_LINE_HEIGHT
+
+    def gap(self, height: float) -> None:
+        self.y += height
+
+    def logo(self) -> None:
+        x0, y0, width, height = (float(value) for value in LOGO_VIEWBOX.split())
+        logo_width = LOGO_HEIGHT * width / height
+        self.parts.append(
+            f'<svg x="{(WIDTH - logo_width) / 2:.1f}" y="{self.y:.1f}" width="{logo_width:.1f}" '
+            f'height="{LOGO_HEIGHT}" viewBox="{LOGO_VIEWBOX}"><path d="{_logo_path()}"/></svg>'
+        )
+        self.y += LOGO_HEIGHT + 6
+
+    def qr(self, payload: str) -> None:
+        element, size = _qr_element(payload)
+        self.parts.append(element.format(x=f"{(WIDTH - size) / 2:g}", y=f"{self.y:g}"))
+        self.y += size
+
+
+@functools.lru_cache(maxsize=256)
+def _qr_element(payload: str) -> Tuple[str, int]:
+    """Nested SVG of a QR code with its quiet zone, positioned with str.format(x=, y=), and its size"""
+    matrix = qr_matrix(payload)
+    modules = len(matrix) + 2 * QUIET_ZONE
+    size = modules * QR_MODULE
+    return (
+        f'<svg x="{{x}}" y="{{y}}" width="{size}" height="{size}" viewBox="{-QUIET_ZONE} {-QUIET_ZONE} {modules} {modules}">'
+        f'<path stroke="#000" shape-rendering="crispEdges" d="{svg_path(matrix)}"/></svg>'
+    ), size
+
+
+def receipt_svg(data: Dict[str, Any]) -> str:
+    """The receipt for generate_receipt_data() output as compact SVG text"""
+    layout = _Layout()
+    draw_receipt(data, layout)
+
+    height = round(layout.y + 10)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{height}" viewBox="0 0 {WIDTH} {height}" '
+        f'font-family="DejaVu Sans Mono,Liberation Mono,Courier New,monospace" font-size="{FONT_SIZE}" xml:space="preserve">'
+        f'<rect width="100%" height="100%" fill="#fff"/>'
+        + ''.join(layout.parts)
+        + '</svg>'
+    )
+
+
+def rasterizer_available() -> Tuple[bool, str]:
+    """Whether cairosvg (and the cairo library it loads) can be used, and why not"""
+    try:
+        import cairosvg  # noqa: F401
+    except (ImportError, OSError) as e:
+        return False, str(e).splitlines()[0]
+    return True, ''
+
+
+@functools.lru_cache(maxsize=64)
+def rasterize(svg: str, width: int = WIDTH) -> bytes:
+    """PNG of an SVG receipt at the given pixel width, cached so repeat requests are free"""
+    import cairosvg
+    return cairosvg.svg2png(bytestring=svg.encode('utf-8'), output_width=width)
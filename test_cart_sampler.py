@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the target-total cart sampler
+"""
+
+import sys
+import os
+import random
+import itertools
+from collections import Counter
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from catalog import load_catalog
+from cart_sampler import TargetCartSampler, get_target_sampler, table_shape
+from main_simple import FoodReceiptGenerator
+
+
+def test_table_matches_brute_force():
+    """The subset-sum table counts every cart exactly once"""
+    catalog = load_catalog()
+    selection = catalog.select()
+    prices = [catalog.price_cents[row] for row in selection.rows()]
+    expected = Counter()
+    for k in range(1, len(prices) + 1):
+        for combo in itertools.combinations(prices, k):
+            expected[(k, sum(combo))] += 1
+
+    sampler = TargetCartSampler(selection, len(prices), sum(prices))
+    for (k, cents), count in expected.items():
+        assert sampler.ways[-1][k][cents] == count
+
+
+def test_exact_total_and_item_range():
+    """Sampled carts hit the exact total and item count range"""
+    sampler = TargetCartSampler(load_catalog().select(), 13, 1500)
+    rng = random.Random(3)
+    for _ in range(500):
+        cart = sampler.sample(rng, min_total=9.96, max_total=9.96, min_items=3, max_items=5)
+        assert round(sum(item['price'] for item in cart) * 100) == 996
+        assert 3 <= len(cart) <= 5
+        assert len({item['name'] for item in cart}) == len(cart)
+
+
+def test_sampling_is_uniform():
+    """Every matching cart is drawn about equally often"""
+    sampler = TargetCartSampler(load_catalog().select(), 13, 1300)
+    carts = sampler.count(12.0, 12.2)
+    rng = random.Random(0)
+    draws = 100 * carts
+    seen = Counter(tuple(item['name'] for item in sampler.sample(rng, 12.0, 12.2)) for _ in range(draws))
+    assert len(seen) == carts
+    assert min(seen.values()) > 60 and max(seen.values()) < 140
+
+
+def test_generator_uses_target():
+    """FoodReceiptGenerator builds carts for the configured target"""
+    generator = FoodReceiptGenerator(cart_target={'min_total': 7.0, 'max_total': 7.5})
+    for _ in range(100):
+        total = sum(item['price'] for item in generator.generate_random_shopping_cart())
+        assert 7.0 <= round(total, 2) <= 7.5
+
+    generator = FoodReceiptGenerator(cart_target={'min_total': 12.5, 'max_total': 12.5})
+    try:
+        generator.generate_random_shopping_cart()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("12.50 EUR cannot be reached with the bundled catalog")
+
+
+def test_table_size_is_bounded():
+    """Item counts stop at what fits into the total; oversized tables are refused"""
+    assert table_shape([50, 100, 300, 999], 2000, 400) == (5, 3, 401)
+    selection = load_catalog().select()
+    sampler = TargetCartSampler(selection, 2000, 300)
+    cheapest = min(load_catalog().price_cents[row] for row in selection.rows())
+    assert sampler.max_items <= 300 // cheapest and sampler.ways.shape[1] == sampler.max_items + 1
+    try:
+        TargetCartSampler(selection, 2000, 2000, budget_mb=0.01)
+    except ValueError as e:
+        assert 'CART_TABLE_MAX_MB' in str(e)
+    else:
+        raise AssertionError("table over the memory budget was built")
+
+
+def test_generators_share_the_table():
+    """Generators with the same catalog filters and target reuse one table"""
+    target = {'min_total': 7.0, 'max_total': 7.5}
+    first, second = FoodReceiptGenerator(cart_target=target), FoodReceiptGenerator(cart_target=target)
+    assert first.target_sampler is second.target_sampler
+    assert get_target_sampler(load_catalog().select(), 13, 750) is get_target_sampler(load_catalog().select(), 13, 750)
+
+
+if __name__ == "__main__":
+    test_table_matches_brute_force()
+    test_exact_total_and_item_range()
+    test_sampling_is_uniform()
+    test_generator_uses_target()
+    test_table_size_is_bounded()
+    test_generators_share_the_table()
+    print("✅ Cart sampler tests passed!")
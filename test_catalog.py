@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the product catalog and its indexed cart sampling
+"""
+
+import sys
+import os
+import random
+import sqlite3
+import tempfile
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from catalog import Catalog, load_catalog
+
+
+def _large_catalog(count=50000):
+    rng = random.Random(7)
+    categories = ['Obst & Gemüse', 'Molkerei', 'Backwaren', 'Getränke', 'Drogerie']
+    return Catalog(
+        (f"Artikel {i}", rng.randint(19, 1999), rng.choice((7, 19)), rng.choice(categories))
+        for i in range(count)
+    )
+
+
+def test_default_catalog():
+    """The bundled catalog.csv holds the original 13 items"""
+    catalog = load_catalog()
+    assert len(catalog) == 13
+    milk = next(catalog.item(row) for row in range(len(catalog)) if catalog.names[row] == 'Milch 1,5%')
+    assert milk['price'] == 1.19 and milk['tax_rate'] == 7
+
+
+def test_filtered_selection():
+    """Category, tax rate and price filters resolve to exactly the matching rows"""
+    catalog = _large_catalog()
+    selection = catalog.select(categories=('Molkerei', 'Getränke'), tax_rates=(19,), min_price=1.0, max_price=5.0)
+    expected = {
+        row for row in range(len(catalog))
+        if catalog.categories[catalog.category_ids[row]] in ('Molkerei', 'Getränke')
+        and catalog.tax_rates[row] == 19
+        and 100 <= catalog.price_cents[row] <= 500
+    }
+    assert set(selection.rows()) == expected
+    assert catalog.select(categories=('Molkerei',)) is catalog.select(categories=('Molkerei',))
+
+
+def test_sample_cart():
+    """Carts reach the minimum total, respect filters and never repeat unique items"""
+    catalog = _large_catalog()
+    selection = catalog.select(categories=('Backwaren',), max_price=3.0)
+    rng = random.Random(1)
+    for _ in range(200):
+        cart = selection.sample_cart(rng, min_total=7.0)
+        assert sum(item['price'] for item in cart) >= 7.0
+        assert all(item['category'] == 'Backwaren' and item['price'] <= 3.0 for item in cart)
+        assert len({item['name'] for item in cart}) == len(cart)
+
+
+def test_sqlite_catalog():
+    """Catalogs can also be loaded from a SQLite products table"""
+    path = os.path.join(tempfile.mkdtemp(), 'catalog.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE products (name TEXT, price REAL, tax_rate INTEGER, category TEXT)")
+    conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?)", [('Tee', 1.99, 7, 'Getränke'), ('Seife', 0.89, 19, None)])
+    conn.commit()
+    conn.close()
+
+    catalog = load_catalog(path)
+    assert len(catalog) == 2
+    assert catalog.categories == ['Getränke', 'Sonstiges']
+
+
+def test_unsupported_tax_rate():
+    """A product with a tax rate the receipt cannot print is rejected by name"""
+    path = os.path.join(tempfile.mkdtemp(), 'catalog.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("name,price,tax_rate,category\nTee,1.99,7,Getränke\nZeitung,2.50,0,Presse\n")
+
+    try:
+        load_catalog(path)
+    except ValueError as e:
+        assert "product 2 ('Zeitung') has tax rate 0" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    test_default_catalog()
+    test_filtered_selection()
+    test_sample_cart()
+    test_sqlite_catalog()
+    test_unsupported_tax_rate()
+    print("✅ Catalog tests passed!")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for contact sheets (food N sheet)
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from io import BytesIO
+from datetime import datetime, timedelta
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot
+
+from contact_sheet import MAX_SIDE, build_sheet, sheet_capacity, sheet_columns
+from main_simple import FoodReceiptGenerator, TelegramBot
+
+
+def test_sheets_split_at_photo_limits():
+    """30 receipts are split over sheets within MAX_SIDE, each receipt drawn exactly once"""
+    drawn = []
+
+    def draw(day, seed):
+        drawn.append(seed)
+        receipt = Image.new('RGB', (300, 900), 'white')
+        # Receipts end at different heights; the blank paper below is trimmed
+        ImageDraw.Draw(receipt).rectangle((10, 10, 290, 700 + seed), fill='black')
+        return receipt
+
+    days = [datetime(2026, 3, 2) + timedelta(days=i) for i in range(30)]
+    seeds = list(range(30))
+    columns = sheet_columns(len(days), 300)
+    assert columns == 8 and sheet_columns(3, 300) == 3
+
+    sheets = []
+    idx = 0
+    while idx < len(days):
+        sheet, used = build_sheet(draw, days[idx:], seeds[idx:], columns, (300, 900), ImageFont.load_default())
+        sheets.append((sheet, used))
+        idx += used
+
+    assert drawn == seeds
+    assert [used for _, used in sheets] == [24, 6]
+    for sheet, _ in sheets:
+        assert max(sheet.size) <= MAX_SIDE
+        assert sheet.width + sheet.height <= 10000
+    # Three rows, each as tall as the longest (trimmed) receipt in it
+    assert sheets[0][0].height < 3 * 900
+
+
+def test_sheet_job():
+    """'food 3 sheet' sends one photo and archives every receipt on it"""
+    previous_data_dir = os.environ.get('DATA_DIR')
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    photos = []
+
+    async def fake_bot_api(self, endpoint, data=None, *args, **kwargs):
+        if endpoint == 'sendPhoto':
+            photos.append((data['photo'].input_file_content, data['caption']))
+        return {'message_id': 1, 'date': 0, 'chat': {'id': data['chat_id'], 'type': 'private'}}
+
+    original_post = Bot._post
+    Bot._post = fake_bot_api
+
+    async def scenario():
+        bot = TelegramBot("123456:TEST", 1)
+        dates = [datetime(2026, 3, 2), datetime(2026, 3, 3), datetime(2026, 3, 4)]
+        record = bot.job_store.create_job(user_id=1, chat_id=10, key='food 3 sheet', dates=dates, seeds=[1, 2, 3])
+        steps = 0
+        async for _ in bot.send_receipts(record):
+            steps += 1
+        return steps, bot.archive.history(1, dates[0].date(), dates[-1].date()), bot.job_store.get_job(record['id'])
+
+    try:
+        steps, history, job = asyncio.run(scenario())
+    finally:
+        Bot._post = original_post
+        if previous_data_dir is None:
+            os.environ.pop('DATA_DIR', None)
+        else:
+            os.environ['DATA_DIR'] = previous_data_dir
+
+    assert steps == 1 and len(photos) == 1
+    sheet = Image.open(BytesIO(photos[0][0]))
+    assert sheet.width > 3 * 300 and sheet.height < FoodReceiptGenerator.BASE_HEIGHT + 100
+    assert photos[0][1].startswith("Receipts 1-3/3")
+    assert [receipt['seed'] for receipt in history] == [1, 2, 3]
+    assert job['status'] == 'done' and job['delivered'] == 3
+
+
+def test_failed_sheet_skips_only_itself():
+    """A sheet that fails to render skips its own receipts, the later sheets are still sent"""
+    previous_data_dir = os.environ.get('DATA_DIR')
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    captions, errors = [], []
+
+    async def fake_bot_api(self, endpoint, data=None, *args, **kwargs):
+        if endpoint == 'sendPhoto':
+            captions.append(data['caption'])
+        elif endpoint == 'sendMessage' and data['text'].startswith("Error"):
+            errors.append(data['text'])
+        return {'message_id': 1, 'date': 0, 'chat': {'id': data['chat_id'], 'type': 'private'}}
+
+    original_post = Bot._post
+    Bot._post = fake_bot_api
+
+    async def scenario():
+        bot = TelegramBot("123456:TEST", 1)
+        capacity = sheet_capacity(sheet_columns(40, bot.receipt_generator.BASE_WIDTH), bot.receipt_generator.BASE_HEIGHT)
+        calls = []
+
+        def create_contact_sheet(days, seeds, columns=None, thermal=None):
+            calls.append(len(days))
+            if len(calls) == 1:
+                raise MemoryError("sheet too large")
+            return b'png', min(len(days), capacity)
+
+        bot.receipt_generator.create_contact_sheet = create_contact_sheet
+        dates = [datetime(2026, 3, 2) + timedelta(days=i) for i in range(40)]
+        record = bot.job_store.create_job(user_id=1, chat_id=10, key='food 40 sheet', dates=dates, seeds=list(range(40)))
+        async for _ in bot.send_receipts(record):
+            pass
+        return capacity, calls, bot.job_store.get_job(record['id'])
+
+    try:
+        capacity, calls, job = asyncio.run(scenario())
+    finally:
+        Bot._post = original_post
+        if previous_data_dir is None:
+            os.environ.pop('DATA_DIR', None)
+        else:
+            os.environ['DATA_DIR'] = previous_data_dir
+
+    assert capacity == 16
+    assert calls == [40, 24, 8]
+    assert len(errors) == 1
+    assert captions == ["Receipts 17-32/40 - 18.03.2026 to 02.04.2026", "Receipts 33-40/40 - 03.04.2026 to 10.04.2026"]
+    assert job['status'] == 'done' and job['delivered'] == 40
+
+
+if __name__ == "__main__":
+    test_sheets_split_at_photo_limits()
+    test_sheet_job()
+    test_failed_sheet_skips_only_itself()
+    print("✅ Contact sheet tests passed!")
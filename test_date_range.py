@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script for date range requests (food 2026-01-01..2026-06-30)
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import tracemalloc
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot
+
+from date_range import ThroughputBudget, count_days, easter_sunday, is_range, iter_days, parse_range, seed_for
+from main_simple import FoodReceiptGenerator, TelegramBot
+
+
+def test_parse_range():
+    """Ranges with an optional day filter; 'food N' is not a range"""
+    assert parse_range('2026-01-01..2026-06-30') == (date(2026, 1, 1), date(2026, 6, 30), 'weekdays')
+    assert parse_range('2026-03 workdays') == (date(2026, 3, 1), date(2026, 3, 31), 'workdays')
+    assert is_range('2026-01-01..2026-06-30 all') and not is_range('5 sheet')
+    for text in ('2026-06-30..2026-01-01', '2026-01-01..2026-01-31 sundays', '2026-01..9999-12'):
+        try:
+            parse_range(text)
+            raise AssertionError(f"{text} accepted")
+        except ValueError:
+            pass
+
+
+def test_day_filters():
+    """Weekends are skipped by default, public holidays with 'workdays'"""
+    assert easter_sunday(2026) == date(2026, 4, 5)
+    start, end = date(2026, 3, 30), date(2026, 4, 12)
+    weekdays = [day.date() for day in iter_days(start, end)]
+    workdays = [day.date() for day in iter_days(start, end, 'workdays', frozenset({date(2026, 4, 1)}))]
+    assert len(weekdays) == 10 and all(day.weekday() < 5 for day in weekdays)
+    # Good Friday, Easter Monday and the extra holiday
+    assert set(weekdays) - set(workdays) == {date(2026, 4, 3), date(2026, 4, 6), date(2026, 4, 1)}
+    assert count_days(start, end, 'all') == 14
+    assert count_days(date(2026, 1, 1), date(9999, 12, 31), limit=100) == 101
+    assert count_days(date(9999, 12, 30), date(9999, 12, 31), 'all') == 2
+
+
+def test_working_days_skip_weekends():
+    """'food N' only covers Monday to Friday"""
+    days = FoodReceiptGenerator().get_working_days(10)
+    assert len(days) == 10 and all(day.weekday() < 5 for day in days)
+    assert days == sorted(days)
+
+
+def test_range_generation_is_lazy():
+    """Walking a multi-year range holds one day at a time"""
+    tracemalloc.start()
+    total = 0
+    for day in iter_days(date(2000, 1, 1), date(2039, 12, 31)):
+        total += seed_for(1, day) & 1
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 64 * 1024
+    assert seed_for(1, datetime(2026, 3, 2)) == seed_for(1, datetime(2026, 3, 2)) != seed_for(2, datetime(2026, 3, 2))
+
+
+def test_throughput_budget():
+    """The cap follows the measured delivery rate"""
+    budget = ThroughputBudget(600, initial_rate=1.0, smoothing=0.5)
+    assert budget.max_receipts() == 600
+    budget.observe(10, 2.0)
+    assert budget.rate == 3.0 and budget.max_receipts() == 1800
+    assert budget.estimate_seconds(30) == 10.0
+
+
+def test_range_job():
+    """A range is sent in media groups and resumes after the last delivered chunk"""
+    previous = {name: os.environ.get(name) for name in ('DATA_DIR', 'RANGE_CHUNK_SIZE')}
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    os.environ['RANGE_CHUNK_SIZE'] = '4'
+    sent = []
+
+    async def fake_bot_api(self, endpoint, data=None, *args, **kwargs):
+        sent.append((endpoint, data))
+        message = {'message_id': len(sent), 'date': 0, 'chat': {'id': data['chat_id'], 'type': 'private'}}
+        photo = [{'file_id': f"photo-{len(sent)}", 'file_unique_id': f"u-{len(sent)}", 'width': 300, 'height': 900}]
+        if endpoint == 'sendMediaGroup':
+            return [dict(message, photo=photo) for _ in data['media']]
+        if endpoint == 'sendPhoto':
+            return dict(message, photo=photo)
+        return message
+
+    original_post = Bot._post
+    Bot._post = fake_bot_api
+
+    async def scenario():
+        bot = TelegramBot("123456:TEST", 1)
+        bot.render_receipt = lambda day, seed: asyncio.sleep(0, b'png')
+        record = bot.job_store.create_job(
+            user_id=1, chat_id=10, key='food 2026-03-02..2026-03-13 weekdays',
+            dates=[datetime(2026, 3, 2), datetime(2026, 3, 13)], seeds=[7],
+        )
+        steps = bot.send_receipts(record)
+        await steps.__anext__()
+        await steps.aclose()
+        # Restarted after the first chunk
+        resumed = bot.job_store.get_job(record['id'])
+        assert resumed['delivered'] == 4 and bot.job_total(resumed) == 10
+        async for _ in bot.send_receipts(resumed):
+            pass
+        return bot.archive.history(1, date(2026, 3, 2), date(2026, 3, 13)), bot.job_store.get_job(record['id'])
+
+    try:
+        history, job = asyncio.run(scenario())
+    finally:
+        Bot._post = original_post
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    assert [endpoint for endpoint, _ in sent] == ['sendMediaGroup', 'sendMediaGroup', 'sendMediaGroup', 'sendMessage']
+    assert [len(data['media']) for _, data in sent[:3]] == [4, 4, 2]
+    assert sent[2][1]['media'][1].caption == "Receipt 10/10 - Friday, 13.03.2026"
+    assert [receipt['day'] for receipt in history] == [
+        date(2026, 3, 2) + timedelta(days=i) for i in range(12) if i % 7 < 5
+    ]
+    assert [receipt['seed'] for receipt in history] == [
+        seed_for(7, datetime(receipt['day'].year, receipt['day'].month, receipt['day'].day)) for receipt in history
+    ]
+    assert job['status'] == 'done' and job['delivered'] == 10
+
+
+if __name__ == "__main__":
+    test_parse_range()
+    test_day_filters()
+    test_working_days_skip_weekends()
+    test_range_generation_is_lazy()
+    test_throughput_budget()
+    test_range_job()
+    print("✅ Date range tests passed!")
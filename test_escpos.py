@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for ESC/POS printer output
+Uses a local socket as a stand-in for a network thermal printer
+"""
+
+import sys
+import os
+import time
+import socket
+import random
+import tempfile
+import threading
+from datetime import datetime
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from escpos import ALIGN_CENTER, BOLD_ON, CUT, INIT, encode_receipt, logo_raster, send_to_printer
+from main_simple import FoodReceiptGenerator
+
+
+def _printer_stand_in():
+    """Accept one connection and collect everything sent to it, like a raw port 9100 printer"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    received = bytearray()
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                received.extend(chunk)
+        server.close()
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    return server.getsockname()[1], thread, received
+
+
+def test_command_stream():
+    """Init, code page, styles, receipt text, logo bitmap and cut in one stream"""
+    generator = FoodReceiptGenerator()
+    data = generator.generate_receipt_data(datetime(2026, 3, 2), random.Random(5))
+    stream = encode_receipt(data)
+
+    assert stream.startswith(INIT)
+    assert stream.endswith(CUT)
+    assert ALIGN_CENTER in stream and BOLD_ON in stream
+    assert logo_raster() in stream
+    assert f"Beleg-Nr.   {data['beleg_nr']}".encode('cp858') in stream
+    assert "Für die mit * gekennzeichneten Produkte".encode('cp858') in stream
+    for item in data['items']:
+        assert item['name'][:22].encode('cp858', errors='replace') in stream
+
+    text_only = encode_receipt(data, logo=False)
+    assert logo_raster() not in text_only
+    assert len(text_only) < 3000
+
+
+def test_much_cheaper_than_png():
+    """Encoding skips rasterization entirely"""
+    generator = FoodReceiptGenerator()
+    day = datetime(2026, 3, 2)
+    generator.create_receipt_escpos(day, 0)
+    start = time.perf_counter()
+    for seed in range(50):
+        generator.create_receipt_escpos(day, seed)
+    escpos_time = (time.perf_counter() - start) / 50
+
+    start = time.perf_counter()
+    generator.create_receipt_image(day, 1)
+    png_time = time.perf_counter() - start
+    assert escpos_time * 50 < png_time
+
+
+def test_send_to_tcp_and_file():
+    """The same bytes arrive over a socket and in a file"""
+    stream = FoodReceiptGenerator().create_receipt_escpos(datetime(2026, 3, 2), 9)
+
+    port, thread, received = _printer_stand_in()
+    send_to_printer(stream, f"tcp://127.0.0.1:{port}")
+    thread.join(timeout=5)
+    assert bytes(received) == stream
+
+    path = os.path.join(tempfile.mkdtemp(), 'receipt.bin')
+    send_to_printer(stream, path)
+    with open(path, 'rb') as f:
+        assert f.read() == stream
+
+
+if __name__ == "__main__":
+    test_command_stream()
+    test_much_cheaper_than_png()
+    test_send_to_tcp_and_file()
+    print("✅ ESC/POS tests passed!")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script for the health endpoint and event-loop lag monitoring
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from health import HealthServer, LoopLagMonitor
+from main_simple import TelegramBot
+
+
+def _get(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_blocked_loop_is_not_live():
+    """A loop blocked by synchronous work is reported as 503 while it is blocked"""
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.05)
+        monitor.start()
+        async def snapshot():
+            return {'jobs': 3}
+
+        server = HealthServer(monitor, snapshot, port=0, max_lag=0.2)
+        server.start()
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.sleep(0.2)
+            assert (await loop.run_in_executor(None, _get, server.port, '/ready'))[0] == 503
+            server.ready = True
+            code, body = await loop.run_in_executor(None, _get, server.port, '/health')
+            assert code == 200 and body['jobs'] == 3 and body['live']
+
+            # Query from another thread while the loop is stuck in a blocking call
+            during = {}
+            probe = threading.Timer(0.4, lambda: during.update(live=_get(server.port, '/live')))
+            probe.start()
+            time.sleep(0.8)
+            probe.join()
+
+            await asyncio.sleep(0.2)
+            after = await loop.run_in_executor(None, _get, server.port, '/live')
+            return during['live'], after, monitor.stats()
+        finally:
+            server.stop()
+            monitor.stop()
+
+    (code, body), after, stats = asyncio.run(scenario())
+    assert code == 503 and not body['live']
+    assert body['event_loop']['lag_ms'] > 200
+    assert after[0] == 200
+    assert stats['max_recent_lag_ms'] > 500
+
+
+def test_bot_snapshot():
+    """The bot reports queue depth, worker pool and time since the last update"""
+    previous_data_dir = os.environ.get('DATA_DIR')
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    try:
+        bot = TelegramBot("123456:TEST", 1)
+        snapshot = asyncio.run(bot.health_snapshot())
+        assert snapshot['seconds_since_last_update'] is None
+        asyncio.run(bot.track_update(None, None))
+        snapshot = asyncio.run(bot.health_snapshot())
+    finally:
+        if previous_data_dir is None:
+            os.environ.pop('DATA_DIR', None)
+        else:
+            os.environ['DATA_DIR'] = previous_data_dir
+
+    assert snapshot['updates_received'] == 1
+    assert snapshot['seconds_since_last_update'] < 5
+    assert snapshot['render_queue'] == {'jobs': 0, 'renders_waiting': 0, 'renders_running': 0}
+    assert snapshot['workers']['workers'] >= 1 and snapshot['workers']['renderer'] == 'pil'
+    json.dumps(snapshot)
+
+
+if __name__ == "__main__":
+    test_blocked_loop_is_not_live()
+    test_bot_snapshot()
+    print("✅ Health tests passed!")
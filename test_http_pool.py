@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled Bot API request backend
+Talks to a local keep-alive HTTP server and checks the pool metrics
+"""
+
+import sys
+import os
+import json
+import asyncio
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram.request import HTTPXRequest
+
+from http_pool import PooledHTTPXRequest
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'ok': True, 'result': True}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_connections_are_reused():
+    """Sequential and parallel requests reuse pooled keep-alive connections"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/botTEST/sendMessage"
+
+    async def scenario():
+        request = PooledHTTPXRequest(name='api', connection_pool_size=4)
+        await request.initialize()
+        try:
+            for _ in range(3):
+                await request.do_request(url, 'POST')
+            await asyncio.gather(*(request.do_request(url, 'POST') for _ in range(8)))
+            for _ in range(3):
+                await request.do_request(url, 'POST')
+        finally:
+            await request.shutdown()
+        return request.metrics.snapshot()
+
+    try:
+        metrics = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+
+    assert metrics['requests'] == 14
+    assert metrics['in_flight'] == 0
+    assert metrics['peak_in_flight'] == 8
+    assert metrics['saturated'] == 4
+    assert 1 <= metrics['new_connections'] <= 4
+    assert metrics['reused_connections'] == 14 - metrics['new_connections']
+
+
+def test_uploads_get_the_media_write_timeout():
+    """Requests with files default to media_write_timeout, others keep the regular one"""
+    seen = []
+
+    async def record(self, url, method, request_data=None, write_timeout=None, **kwargs):
+        seen.append(write_timeout)
+        return 200, b'{"ok": true, "result": true}'
+
+    original = HTTPXRequest.do_request
+    HTTPXRequest.do_request = record
+    # Only the parts of RequestData the backend looks at
+    upload = SimpleNamespace(multipart_data={'photo': ('receipt.png', b'png', 'image/png')}, json_parameters={})
+    message = SimpleNamespace(multipart_data=None, json_parameters={'text': 'hi'})
+
+    async def scenario():
+        request = PooledHTTPXRequest(name='api', connection_pool_size=1, media_write_timeout=45)
+        await request.do_request('http://127.0.0.1/botTEST/sendPhoto', 'POST', request_data=upload)
+        await request.do_request('http://127.0.0.1/botTEST/sendMessage', 'POST', request_data=message)
+        await request.do_request('http://127.0.0.1/botTEST/sendPhoto', 'POST', request_data=upload, write_timeout=5)
+        await request.shutdown()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        HTTPXRequest.do_request = original
+    assert seen[0] == 45 and seen[1] is HTTPXRequest.DEFAULT_NONE and seen[2] == 5
+
+
+if __name__ == "__main__":
+    test_connections_are_reused()
+    test_uploads_get_the_media_write_timeout()
+    print("✅ HTTP pool tests passed!")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-resolution receipt output
+"""
+
+import sys
+import os
+from io import BytesIO
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from image_pyramid import ImagePyramid, reduce_image
+from main_simple import FoodReceiptGenerator
+
+
+def test_levels_are_built_on_demand():
+    """Levels are reduced from the level above and encoded only when asked for"""
+    full = Image.fromarray(np.tile(np.arange(240, dtype=np.uint8), (480, 1)))
+    effects = []
+    pyramid = ImagePyramid(full, {'preview': 4, 'thumbnail': 3}, dpi=1200,
+                           effects={'preview': lambda image: effects.append(image.size) or image.point(lambda v: 255 - v)})
+    assert pyramid.levels == ('full', 'preview', 'thumbnail')
+
+    thumbnail = Image.open(BytesIO(pyramid.png('thumbnail')))
+    assert thumbnail.size == (20, 40) and round(thumbnail.info['dpi'][0]) == 100
+    # The effect ran once, on the preview, and the thumbnail was reduced from its result
+    assert effects == [(60, 120)]
+    preview = pyramid.image('preview')
+    assert np.array_equal(np.asarray(thumbnail), np.asarray(preview.resize((20, 40), Image.Resampling.LANCZOS)))
+    assert list(pyramid.encoded()) == ['thumbnail']
+    assert pyramid.nbytes() == 240 * 480 + 60 * 120 + 20 * 40 + len(pyramid.png('thumbnail'))
+
+    assert pyramid.png('preview') is pyramid.png('preview') and effects == [(60, 120)]
+    assert round(Image.open(BytesIO(pyramid.png('full'))).info['dpi'][0]) == 1200
+    try:
+        pyramid.image('poster')
+        raise AssertionError("unknown level accepted")
+    except KeyError:
+        pass
+
+
+def test_receipt_sizes_from_one_drawing():
+    """Every size of a receipt comes from one layout and drawing pass"""
+    generator = FoodReceiptGenerator()
+    draws = []
+    draw = generator._draw_receipt_pyramid
+
+    def counting_draw(*args):
+        draws.append(args)
+        return draw(*args)
+
+    generator._draw_receipt_pyramid = counting_draw
+    day = datetime(2026, 3, 2)
+    sizes = {
+        level: Image.open(BytesIO(generator.create_receipt_image(day, 7, level=level))).size
+        for level in ('preview', 'thumbnail', 'full')
+    }
+    assert len(draws) == 1
+    width, height = generator.BASE_WIDTH, generator.BASE_HEIGHT
+    scale = generator.DPI_SCALE
+    assert sizes == {'preview': (width, height), 'thumbnail': (width // 3, -(-height // 3)), 'full': (width * scale, height * scale)}
+    assert generator.draw_receipt_image(day, 7).size == (width, height) and len(draws) == 1
+
+    # Older receipts drop out of the cache once it holds more than its byte budget;
+    # unseeded ones are never cached
+    kept = 3
+    generator.pyramid_cache_bytes = kept * generator.receipt_pyramid(day, 7).nbytes()
+    for seed in range(100, 100 + kept):
+        generator.create_receipt_image(day, seed)
+    assert sum(pyramid.nbytes() for pyramid in generator._pyramids.values()) <= generator.pyramid_cache_bytes
+    generator.create_receipt_image(day, 7)
+    generator.create_receipt_image(day)
+    generator.create_receipt_image(day)
+    assert len(draws) == 2 + kept + 2
+
+
+def test_reduction_sizes():
+    """Reductions round up like reduce() and pre-shrink only by whole factors"""
+    image = Image.new('L', (1201, 4602), 255)
+    assert reduce_image(image, 4).size == (301, 1151)
+    assert reduce_image(image, 3).size == (401, 1534)
+    assert reduce_image(image, 1).size == image.size
+
+
+def test_thermal_thumbnail_matches_preview():
+    """With thermal effects the thumbnail shows the same printout as the preview"""
+    generator = FoodReceiptGenerator()
+    pyramid = generator.receipt_pyramid(datetime(2026, 3, 2), 11, thermal=True)
+    preview = pyramid.image('preview')
+    assert np.array_equal(np.asarray(pyramid.image('thumbnail')), np.asarray(reduce_image(preview, 3)))
+    clean = generator.receipt_pyramid(datetime(2026, 3, 2), 11, thermal=False)
+    assert clean is not pyramid and not np.array_equal(np.asarray(clean.image('preview')), np.asarray(preview))
+
+
+if __name__ == "__main__":
+    test_levels_are_built_on_demand()
+    test_receipt_sizes_from_one_drawing()
+    test_reduction_sizes()
+    test_thermal_thumbnail_matches_preview()
+    print("✅ Image pyramid tests passed!")
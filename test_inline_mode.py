@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for inline query mode
+"""
+
+import sys
+import os
+import json
+import asyncio
+import tempfile
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot, Update
+
+from main_simple import TelegramBot
+
+
+def _plain(value):
+    """Request parameters as they would be serialized for the Bot API"""
+    return json.loads(json.dumps(value, default=lambda obj: obj.to_dict()))
+
+
+def _inline_update(bot, user_id, text, offset=''):
+    return Update.de_json({
+        'update_id': 1,
+        'inline_query': {
+            'id': 'q1', 'query': text, 'offset': offset,
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'User'},
+        },
+    }, bot)
+
+
+def test_inline_answers_from_uploaded_receipts():
+    """Stocked receipts are answered by file_id, paginated, without rendering in the query"""
+    previous_data_dir = os.environ.get('DATA_DIR')
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    os.environ['INLINE_CACHE_CHAT_ID'] = '-100123'
+    answers, uploads = [], []
+
+    async def fake_bot_api(self, endpoint, data=None, *args, **kwargs):
+        if endpoint == 'answerInlineQuery':
+            answers.append(data)
+            return True
+        uploads.append(data['chat_id'])
+        file_id = f"file-{len(uploads)}"
+        return {
+            'message_id': len(uploads), 'date': 0, 'chat': {'id': data['chat_id'], 'type': 'channel'},
+            'photo': [{'file_id': file_id, 'file_unique_id': file_id, 'width': 300, 'height': 900}],
+        }
+
+    original_post = Bot._post
+    Bot._post = fake_bot_api
+
+    async def scenario():
+        bot = TelegramBot("123456:TEST", 1)
+        bot.max_days_back = 12
+        stocked = await bot.fill_inline_stock()
+        restocked = await bot.fill_inline_stock()
+
+        async def no_render(day, seed):
+            raise AssertionError("inline queries must not render")
+
+        bot.render_receipt = no_render
+        tg = bot.application.bot
+        await bot.inline_query(_inline_update(tg, 1, 'food 12'), None)
+        await bot.inline_query(_inline_update(tg, 1, 'food 12', offset=answers[0]['next_offset']), None)
+        await bot.inline_query(_inline_update(tg, 2, 'food 3'), None)
+        bot.max_days_back = 20
+        await bot.inline_query(_inline_update(tg, 1, 'food 15'), None)
+        return stocked, restocked
+
+    try:
+        stocked, restocked = asyncio.run(scenario())
+    finally:
+        Bot._post = original_post
+        os.environ.pop('INLINE_CACHE_CHAT_ID', None)
+        if previous_data_dir is None:
+            os.environ.pop('DATA_DIR', None)
+        else:
+            os.environ['DATA_DIR'] = previous_data_dir
+
+    assert stocked == 12 and restocked == 0
+    assert set(uploads) == {-100123}
+
+    first, second, unauthorized, partial = answers
+    first_results = _plain(first['results'])
+    assert len(first_results) == 10 and first['next_offset'] == '10'
+    assert first_results[0]['photo_file_id'] == 'file-1'
+    assert first.get('button') is None
+    second_results = _plain(second['results'])
+    assert [r['photo_file_id'] for r in second_results] == ['file-11', 'file-12']
+    assert second['next_offset'] == ''
+
+    assert _plain(unauthorized['results']) == []
+    # Days without an uploaded receipt are offered as a deep link into the private chat
+    assert _plain(partial['button'])['start_parameter'] == 'food15'
+
+
+if __name__ == "__main__":
+    test_inline_answers_from_uploaded_receipts()
+    print("✅ Inline mode tests passed!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for persisted, resumable receipt jobs
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from datetime import datetime
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot
+
+from job_store import JobStore
+from main_simple import FoodReceiptGenerator, TelegramBot
+
+
+def test_job_state_survives_reopen():
+    """Delivery progress and render checkpoints are read back after a restart"""
+    path = os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3')
+    dates = [datetime(2026, 3, day) for day in (2, 3, 4)]
+
+    store = JobStore(path)
+    record = store.create_job(user_id=1, chat_id=10, key='food 3', dates=dates, seeds=[11, 22, 33])
+    store.mark_delivered(record['id'], 0)
+    store.save_render(record['id'], 1, b'png-1')
+    store.close()
+
+    store = JobStore(path)
+    [resumed] = store.unfinished_jobs()
+    assert resumed['delivered'] == 1
+    assert resumed['dates'] == dates
+    assert resumed['seeds'] == [11, 22, 33]
+    assert store.load_render(resumed['id'], 1) == b'png-1'
+
+    store.finish_job(resumed['id'])
+    assert store.unfinished_jobs() == []
+    assert store.load_render(resumed['id'], 1) is None
+    store.close()
+
+
+def test_seeded_receipts_are_reproducible():
+    """The same seed renders the same receipt, so resumed jobs match the original"""
+    generator = FoodReceiptGenerator()
+    day = datetime(2026, 3, 2)
+    assert generator.create_receipt_image(day, seed=1234) == generator.create_receipt_image(day, seed=1234)
+
+
+def test_resume_skips_delivered_receipts():
+    """A resumed job sends only the receipts that were not delivered yet"""
+    previous_data_dir = os.environ.get('DATA_DIR')
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    calls = []
+
+    async def fake_bot_api(self, endpoint, data=None, *args, **kwargs):
+        calls.append((endpoint, data.get('caption') or data.get('text')))
+        return {
+            'message_id': len(calls), 'date': 0,
+            'chat': {'id': data['chat_id'], 'type': 'private'},
+        }
+
+    async def no_sleep(seconds):
+        pass
+
+    original_post, original_sleep = Bot._post, asyncio.sleep
+    Bot._post = fake_bot_api
+
+    async def scenario():
+        bot = TelegramBot("123456:TEST", 1)
+        dates = [datetime(2026, 3, day) for day in (2, 3, 4)]
+        record = bot.job_store.create_job(user_id=1, chat_id=10, key='food 3', dates=dates, seeds=[1, 2, 3])
+        bot.job_store.mark_delivered(record['id'], 0)
+        bot.job_store.save_render(record['id'], 1, bot.receipt_generator.create_receipt_image(dates[1], 2))
+
+        asyncio.sleep = no_sleep
+        async for _ in bot.send_receipts(bot.job_store.get_job(record['id'])):
+            pass
+        asyncio.sleep = original_sleep
+        return bot.job_store.get_job(record['id'])
+
+    try:
+        finished = asyncio.run(scenario())
+    finally:
+        Bot._post, asyncio.sleep = original_post, original_sleep
+        if previous_data_dir is None:
+            os.environ.pop('DATA_DIR', None)
+        else:
+            os.environ['DATA_DIR'] = previous_data_dir
+
+    assert [endpoint for endpoint, _ in calls] == ['sendPhoto', 'sendPhoto', 'sendMessage']
+    assert calls[0][1].startswith('Receipt 2/3')
+    assert calls[1][1].startswith('Receipt 3/3')
+    assert finished['status'] == 'done'
+    assert finished['delivered'] == 3
+
+
+if __name__ == "__main__":
+    test_job_state_survives_reopen()
+    test_seeded_receipts_are_reproducible()
+    test_resume_skips_delivered_receipts()
+    print("✅ Job store tests passed!")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for the fake Bot API and the load test driver
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot
+from telegram.ext import ExtBot
+from telegram.error import RetryAfter
+
+from fake_telegram import FakeTelegram
+from http_pool import RetryAfterLimiter
+from load_test import percentile, run_load_test
+
+
+def test_percentile():
+    """Nearest-rank percentiles"""
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_retry_after_is_waited_out():
+    """A 429 from the fake API reaches the bot as RetryAfter, the limiter retries it"""
+    async def scenario():
+        api = FakeTelegram(retry_after_rate=1.0, retry_after=1)
+        sent = []
+        api.on_send = lambda method, params, now: sent.append((method, params['text']))
+        base_url = await api.start()
+        try:
+            async with Bot("123456:TEST", base_url=base_url) as bot:
+                try:
+                    await bot.send_message(chat_id=1, text="lost")
+                    raise AssertionError("RetryAfter expected")
+                except RetryAfter:
+                    pass
+
+            limiter = RetryAfterLimiter(max_retries=3)
+            async with ExtBot("123456:TEST", base_url=base_url, rate_limiter=limiter) as bot:
+                # Every second call gets through
+                api.retry_after_rate = 0.5
+                rolls = iter([0.0, 0.9] * 4)
+                api.rng.random = lambda: next(rolls)
+                message = await bot.send_message(chat_id=1, text="delivered")
+        finally:
+            api.stop()
+        return api, limiter, sent, message
+
+    api, limiter, sent, message = asyncio.run(scenario())
+    assert message.text == "delivered" and message.chat.id == 1
+    assert sent == [('sendMessage', "delivered")]
+    assert limiter.retries == 1
+    assert api.injected['retry_after'] == 2
+
+
+def test_load_test_run():
+    """Two users get their receipts from a real bot process"""
+    args = argparse.Namespace(
+        users=2, days=1, rounds=1, latency=0.0, jitter=0.0, error_rate=0.0,
+        retry_after_rate=0.0, retry_after=1, timeout=60.0, seed=1,
+    )
+    report = asyncio.run(run_load_test(args))
+    assert report['completed'] == 2 and report['timed_out'] == 0
+    assert report['receipts'] == 2 and report['error_replies'] == 0
+    assert report['end_to_end_s']['p50'] >= report['time_to_first_receipt_s']['p50'] > 0
+    assert report['bot_peak_rss_mb'] > 0
+
+
+if __name__ == "__main__":
+    test_percentile()
+    test_retry_after_is_waited_out()
+    test_load_test_run()
+    print("✅ Load test tests passed!")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for the queued logging pipeline
+"""
+
+import sys
+import os
+import json
+import logging
+import tempfile
+import time
+import threading
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from log_pipeline import NonBlockingQueueHandler, RepeatFilter, configure_logging, stop_logging
+
+
+def _read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_json_lines_written_off_thread():
+    """Records reach the file as JSON lines, written by the listener thread"""
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    writers = set()
+    with tempfile.TemporaryDirectory() as log_dir:
+        try:
+            listener = configure_logging('test.log', level='DEBUG', log_dir=log_dir)
+            file_handler = listener.handlers[1]
+            original_emit = file_handler.emit
+            file_handler.emit = lambda record: (writers.add(threading.get_ident()), original_emit(record))
+
+            assert all(isinstance(handler, NonBlockingQueueHandler) for handler in root.handlers)
+            log = logging.getLogger('receipts')
+            log.info("Sent receipt %d/%d", 1, 3, extra={'user_id': 42})
+            try:
+                raise RuntimeError("boom")
+            except RuntimeError:
+                log.exception("Render failed")
+            stop_logging()
+            lines = _read_lines(os.path.join(log_dir, 'test.log'))
+        finally:
+            stop_logging()
+            root.handlers[:] = saved[0]
+            root.setLevel(saved[1])
+
+    assert threading.get_ident() not in writers
+    assert lines[0]['message'] == "Sent receipt 1/3"
+    assert lines[0]['level'] == 'INFO' and lines[0]['logger'] == 'receipts'
+    assert lines[0]['user_id'] == 42
+    assert lines[1]['message'] == "Render failed"
+    assert 'RuntimeError: boom' in lines[1]['exc']
+
+
+def test_forked_children_write_their_own_file():
+    """Forked processes log to a worker slot's file; replacements reuse the slot"""
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+
+    def fork_and_log(message, wait=True):
+        pid = os.fork()
+        if pid == 0:
+            logging.getLogger('child').info(message)
+            if not wait:
+                time.sleep(0.5)
+            stop_logging()
+            os._exit(0)
+        if wait:
+            os.waitpid(pid, 0)
+        return pid
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        try:
+            configure_logging('test.log', level='INFO', log_dir=log_dir)
+            logging.getLogger('parent').info("before fork")
+            # Recycled workers, one after the other, then two at once
+            for i in range(3):
+                fork_and_log(f"worker {i}")
+            running = fork_and_log("long-lived", wait=False)
+            time.sleep(0.2)
+            fork_and_log("alongside")
+            os.waitpid(running, 0)
+            logging.getLogger('parent').info("after fork")
+            stop_logging()
+            parent = [line['message'] for line in _read_lines(os.path.join(log_dir, 'test.log'))]
+            first = [line['message'] for line in _read_lines(os.path.join(log_dir, 'test.1.log'))]
+            second = [line['message'] for line in _read_lines(os.path.join(log_dir, 'test.2.log'))]
+            logs = sorted(name for name in os.listdir(log_dir) if name.endswith('.log'))
+        finally:
+            stop_logging()
+            root.handlers[:] = saved[0]
+            root.setLevel(saved[1])
+
+    assert parent == ["before fork", "after fork"]
+    assert first == ["worker 0", "worker 1", "worker 2", "long-lived"]
+    assert second == ["alongside"]
+    assert logs == ['test.1.log', 'test.2.log', 'test.log']
+
+
+def test_repeats_are_rate_limited():
+    """Identical messages pass once per window, the next one reports how many were skipped"""
+    repeat = RepeatFilter(window=60)
+
+    def record(msg):
+        return logging.makeLogRecord({'name': 'fonts', 'levelno': logging.INFO, 'msg': msg})
+
+    assert repeat.filter(record("Using fallback font"))
+    assert not any(repeat.filter(record("Using fallback font")) for _ in range(99))
+    assert repeat.filter(record("Another message"))
+
+    for seen in repeat._seen.values():
+        seen[0] -= 60
+    again = record("Using fallback font")
+    assert repeat.filter(again)
+    assert again.repeated == 99
+
+
+def test_full_queue_drops_instead_of_blocking():
+    """A stalled writer costs dropped records, never a blocked caller"""
+    import queue
+    handler = NonBlockingQueueHandler(queue.Queue(2))
+    for i in range(5):
+        handler.handle(logging.makeLogRecord({'msg': f"message {i}"}))
+    assert handler.dropped == 3
+
+    handler.queue.get_nowait()
+    handler.queue.get_nowait()
+    handler.handle(logging.makeLogRecord({'msg': "message 5"}))
+    notice = [handler.queue.get_nowait().msg for _ in range(2)][1]
+    assert notice == "Log queue full, dropped 3 records"
+    assert handler.dropped == 0
+
+
+if __name__ == "__main__":
+    test_json_lines_written_off_thread()
+    test_forked_children_write_their_own_file()
+    test_repeats_are_rate_limited()
+    test_full_queue_drops_instead_of_blocking()
+    print("✅ Log pipeline tests passed!")
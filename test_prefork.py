@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test script for the prefork render worker pool
+"""
+
+import sys
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import prefork
+from render_service import RenderPool
+
+
+def _inherited():
+    """Whether this worker found the renderer already loaded, without loading it itself"""
+    return prefork._renderer is not None and prefork._renderer.name == 'pil', os.getpid()
+
+
+def test_workers_inherit_preloaded_renderer():
+    """Workers forked from the forkserver start with the renderer loaded"""
+    ctx = prefork.context('pil')
+    if ctx.get_start_method() != 'forkserver':
+        return
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+        inherited, pid = executor.submit(_inherited).result()
+    assert inherited
+    assert pid != os.getpid()
+
+
+def test_workers_are_recycled():
+    """A worker is replaced after max_tasks_per_child batches and renders keep working"""
+    async def scenario():
+        pool = RenderPool(processes=1, batch_size=1, batch_window=0, max_tasks_per_child=2)
+        try:
+            pids = [await asyncio.get_running_loop().run_in_executor(pool.executor, _inherited) for _ in range(4)]
+            png = await pool.render(datetime(2026, 3, 2), 42)
+        finally:
+            pool.shutdown()
+        return pids, png
+
+    pids, png = asyncio.run(scenario())
+    assert len({pid for _, pid in pids}) == 2
+    assert png.startswith(b'\x89PNG')
+
+
+if __name__ == "__main__":
+    test_workers_inherit_preloaded_renderer()
+    test_workers_are_recycled()
+    print("✅ Prefork tests passed!")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test script for the QR encoder of the TSE block
+Decodes the generated symbols with a small independent reader, as no QR
+decoding library is a dependency
+"""
+
+import re
+import sys
+import os
+import time
+import random
+from datetime import datetime
+
+import numpy as np
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from qr_code import (
+    VERSIONS_M, _template, alignment_positions, format_bits, qr_matrix, rasterize, reed_solomon, svg_path,
+    version_bits,
+)
+from escpos import encode_receipt, qr_commands
+from main_simple import FoodReceiptGenerator
+
+
+def _gf_tables():
+    exp, log, value = [0] * 512, [0] * 256, 1
+    for power in range(255):
+        exp[power] = exp[power + 255] = value
+        log[value] = power
+        value = value << 1 ^ (0x11D if value & 0x80 else 0)
+    return exp, log
+
+
+def _syndromes_zero(codewords, degree):
+    """Whether a block (data then EC codewords) is a Reed-Solomon codeword"""
+    exp, log = _gf_tables()
+    for i in range(degree):
+        value = 0
+        for codeword in codewords:
+            value = (exp[log[value] + i] if value else 0) ^ codeword
+        if value:
+            return False
+    return True
+
+
+def _decode(matrix):
+    """Payload of a level M symbol, read module by module"""
+    size = len(matrix)
+    version = (size - 17) // 4
+    # Format bits 0..14 next to the top left finder
+    positions = [(i, 8) for i in range(6)] + [(7, 8), (8, 8), (8, 7)] + [(8, 14 - i) for i in range(9, 15)]
+    format_value = sum(int(matrix[row, column]) << i for i, (row, column) in enumerate(positions))
+    mask = [format_bits(m) for m in range(8)].index(format_value)
+    conditions = [
+        lambda i, j: (i + j) % 2 == 0, lambda i, j: i % 2 == 0, lambda i, j: j % 3 == 0,
+        lambda i, j: (i + j) % 3 == 0, lambda i, j: (i // 2 + j // 3) % 2 == 0,
+        lambda i, j: (i * j) % 2 + (i * j) % 3 == 0, lambda i, j: ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+        lambda i, j: ((i + j) % 2 + (i * j) % 3) % 2 == 0,
+    ]
+    function = _template(version)['function']
+
+    bits, upward, column = [], True, size - 1
+    while column > 0:
+        if column == 6:
+            column -= 1
+        for row in (range(size - 1, -1, -1) if upward else range(size)):
+            for j in (column, column - 1):
+                if not function[row, j]:
+                    bits.append(int(matrix[row, j]) ^ conditions[mask](row, j))
+        upward = not upward
+        column -= 2
+    codewords = [int(''.join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits) - 7, 8)]
+
+    degree, groups = VERSIONS_M[version]
+    lengths = [data for blocks, data in groups for _ in range(blocks)]
+    blocks = [[] for _ in lengths]
+    position = 0
+    for i in range(max(lengths)):
+        for block, length in zip(blocks, lengths):
+            if i < length:
+                block.append(codewords[position])
+                position += 1
+    for i in range(degree):
+        for block in blocks:
+            block.append(codewords[position])
+            position += 1
+    assert all(_syndromes_zero(block, degree) for block in blocks)
+
+    stream = ''.join(f"{codeword:08b}" for block, length in zip(blocks, lengths) for codeword in block[:length])
+    assert stream[:4] == '0100'
+    length = int(stream[4:20], 2)
+    return bytes(int(stream[20 + i * 8:28 + i * 8], 2) for i in range(length))
+
+
+def test_known_values():
+    """Format and version bits, Reed-Solomon codewords and alignment positions from the standard"""
+    assert format_bits(0) == 0b101010000010010
+    assert version_bits(7) == 0x07C94 and version_bits(14) == 0x0E60D
+    # "HELLO WORLD" as 1-M
+    data = np.array([[32, 91, 11, 120, 209, 114, 220, 77, 67, 64, 236, 17, 236, 17, 236, 17]], dtype=np.uint8)
+    assert reed_solomon(data, 10).tolist() == [[196, 35, 39, 119, 235, 215, 231, 226, 93, 23]]
+    assert alignment_positions(13) == (6, 34, 62) and alignment_positions(15) == (6, 26, 48, 70)
+    for version, (degree, groups) in VERSIONS_M.items():
+        # Every data module holds a bit of a codeword, except the remainder bits
+        codeword_bits = sum(blocks * (data + degree) for blocks, data in groups) * 8
+        assert 0 <= len(_template(version)['rows']) - codeword_bits < 8
+
+
+def test_receipt_payloads_round_trip():
+    """The TSE payloads of receipts decode back from their symbols"""
+    generator = FoodReceiptGenerator()
+    for seed in range(20):
+        payload = generator.generate_receipt_data(datetime(2026, 3, 2), random.Random(seed))['tse']['qr_payload']
+        assert _decode(qr_matrix(payload)) == payload.encode('ascii')
+    for length in (200, 331, 332, 504):
+        payload = bytes(random.Random(length).randrange(256) for _ in range(length))
+        for mask in range(8):
+            assert _decode(qr_matrix(payload, mask)) == payload
+
+
+def test_raster_and_svg_match_the_matrix():
+    """Both scaled outputs put dark modules exactly where the matrix has them"""
+    matrix = qr_matrix('V0;0112-47;Kassenbeleg-V1')
+    pixels = rasterize(matrix, 3)
+    assert pixels.shape == ((len(matrix) + 8) * 3,) * 2
+    assert ((pixels[12::3, 12::3][:len(matrix), :len(matrix)] == 0) == matrix).all()
+
+    drawn = np.zeros_like(matrix)
+    row = column = 0
+    for command, x, y, run in re.findall(r'([Mm])(\d+) (\d+)(?:\.5)?h(\d+)', svg_path(matrix)):
+        if command == 'M':
+            row, column = int(y), int(x)
+        else:
+            column += int(x)
+        drawn[row, column:column + int(run)] = True
+        column += int(run)
+    assert (drawn == matrix).all()
+
+
+def test_escpos_prints_the_payload():
+    """ESC/POS hands the payload to the printer's QR command"""
+    data = FoodReceiptGenerator().generate_receipt_data(datetime(2026, 3, 2), random.Random(3))
+    payload = data['tse']['qr_payload'].encode('ascii')
+    assert qr_commands(payload, 4) in encode_receipt(data, logo=False)
+    store = qr_commands(payload, 4).split(b'\x1d(k')[4]
+    assert store[:2] == (len(payload) + 3).to_bytes(2, 'little') and store[4:] == b'0' + payload
+
+
+def test_encoding_takes_milliseconds():
+    """A receipt's QR code costs a few milliseconds"""
+    generator = FoodReceiptGenerator()
+    payloads = [
+        generator.generate_receipt_data(datetime(2026, 3, 2), random.Random(seed))['tse']['qr_payload']
+        for seed in range(30)
+    ]
+    qr_matrix(payloads[0])
+    start = time.perf_counter()
+    for payload in payloads:
+        qr_matrix(payload)
+    assert (time.perf_counter() - start) / len(payloads) < 0.01
+
+
+if __name__ == "__main__":
+    test_known_values()
+    test_receipt_payloads_round_trip()
+    test_raster_and_svg_match_the_matrix()
+    test_escpos_prints_the_payload()
+    test_encoding_takes_milliseconds()
+    print("✅ QR code tests passed!")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test script for the receipt archive and file_id re-sends
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot, Update
+
+from receipt_archive import ReceiptArchive, parse_period
+from main_simple import TelegramBot
+
+
+def _data(total, bon_nr):
+    return {'total': total, 'items': [{}, {}], 'bon_nr': bon_nr, 'beleg_nr': '0001'}
+
+
+def test_parse_period():
+    """Months, single days and ranges"""
+    assert parse_period('2026-02') == (date(2026, 2, 1), date(2026, 2, 28))
+    assert parse_period('2026-03-02') == (date(2026, 3, 2), date(2026, 3, 2))
+    assert parse_period('2026-03-30..2026-04') == (date(2026, 3, 30), date(2026, 4, 30))
+    for invalid in ('march', '2026-03-10..2026-03-01'):
+        try:
+            parse_period(invalid)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{invalid!r} should be rejected")
+
+
+def test_history_and_file_ids():
+    """History is per user and period, file_ids are found by date and seed"""
+    path = os.path.join(tempfile.mkdtemp(), 'receipts.sqlite3')
+    archive = ReceiptArchive(path)
+    archive.record(1, 10, datetime(2026, 3, 2, 14, 30), 11, _data(7.45, '5001'), file_id='A')
+    archive.record(1, 10, datetime(2026, 3, 2, 9, 0), 12, _data(8.10, '5002'), file_id='B')
+    archive.record(1, 10, datetime(2026, 4, 1), 13, _data(9.99, '5003'))
+    archive.record(2, 20, datetime(2026, 3, 3), 14, _data(7.00, '5004'), file_id='D')
+    archive.close()
+
+    archive = ReceiptArchive(path)
+    march = archive.history(1, *parse_period('2026-03'))
+    assert [(r['day'], r['total'], r['bon_nr']) for r in march] == [
+        (date(2026, 3, 2), 7.45, '5001'), (date(2026, 3, 2), 8.10, '5002'),
+    ]
+    latest = archive.history(1, *parse_period('2026-03..2026-04'), latest_per_day=True)
+    assert [r['seed'] for r in latest] == [12, 13]
+
+    assert archive.find_file_id(datetime(2026, 3, 2), 11) == 'A'
+    assert archive.find_file_id(datetime(2026, 4, 1), 13) is None
+    assert archive.find_file_id(datetime(2026, 3, 3), 11) is None
+    archive.close()
+
+
+def test_repeat_delivery_reuses_file_id():
+    """A receipt that was uploaded once is sent again by file_id, without rendering"""
+    previous_data_dir = os.environ.get('DATA_DIR')
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    calls = []
+
+    async def fake_bot_api(self, endpoint, data=None, *args, **kwargs):
+        calls.append((endpoint, data.get('photo')))
+        message = {'message_id': len(calls), 'date': 0, 'chat': {'id': data['chat_id'], 'type': 'private'}}
+        if endpoint == 'sendPhoto':
+            file_id = data['photo'] if isinstance(data['photo'], str) else f"file-{len(calls)}"
+            message['photo'] = [{'file_id': file_id, 'file_unique_id': file_id, 'width': 300, 'height': 900}]
+        return message
+
+    async def no_sleep(seconds):
+        pass
+
+    original_post, original_sleep = Bot._post, asyncio.sleep
+    Bot._post = fake_bot_api
+
+    async def scenario():
+        bot = TelegramBot("123456:TEST", 1)
+        renders = []
+        original_render = bot.render_receipt
+
+        async def counting_render(day, seed):
+            renders.append(seed)
+            return await original_render(day, seed)
+
+        bot.render_receipt = counting_render
+        dates = [datetime(2026, 3, 2), datetime(2026, 3, 3)]
+        asyncio.sleep = no_sleep
+        for _ in range(2):
+            record = bot.job_store.create_job(user_id=1, chat_id=10, key='food 2', dates=dates, seeds=[5, 6])
+            async for _ in bot.send_receipts(record):
+                pass
+        asyncio.sleep = original_sleep
+        return renders, bot.archive.history(1, *parse_period('2026-03'))
+
+    try:
+        renders, history = asyncio.run(scenario())
+    finally:
+        Bot._post, asyncio.sleep = original_post, original_sleep
+        if previous_data_dir is None:
+            os.environ.pop('DATA_DIR', None)
+        else:
+            os.environ['DATA_DIR'] = previous_data_dir
+
+    assert renders == [5, 6]
+    photos = [photo for endpoint, photo in calls if endpoint == 'sendPhoto']
+    assert photos[2:] == ['file-1', 'file-2']
+    assert len(history) == 4
+    assert all(receipt['total'] >= 7.0 for receipt in history)
+
+
+def test_resend_sends_single_receipts_as_photo():
+    """A chunk of one archived receipt is sent as a photo, larger chunks as media groups"""
+    previous_data_dir = os.environ.get('DATA_DIR')
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    calls = []
+
+    async def fake_bot_api(self, endpoint, data=None, *args, **kwargs):
+        media = data.get('media') or [data.get('photo')]
+        calls.append((endpoint, len(media)))
+        message = {'message_id': len(calls), 'date': 0, 'chat': {'id': data['chat_id'], 'type': 'private'}}
+        return [message] * len(media) if endpoint == 'sendMediaGroup' else message
+
+    original_post = Bot._post
+    Bot._post = fake_bot_api
+
+    async def scenario():
+        bot = TelegramBot("123456:TEST", 1)
+        for i in range(12):
+            day = datetime(2026, 3, 2) + timedelta(days=i)
+            bot.archive.record(1, 10, day, i, _data(7.0 + i, str(6000 + i)), file_id=f"file-{i}")
+        update = Update.de_json({
+            'update_id': 1,
+            'message': {
+                'message_id': 1, 'date': 0, 'text': '/resend',
+                'chat': {'id': 10, 'type': 'private'}, 'from': {'id': 1, 'is_bot': False, 'first_name': 'User'},
+            },
+        }, bot.application.bot)
+        for period in ('2026-03-02', '2026-03-02..2026-03-12', '2026-03-02..2026-03-13'):
+            await bot.resend_command(update, SimpleNamespace(args=[period]))
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        Bot._post = original_post
+        if previous_data_dir is None:
+            os.environ.pop('DATA_DIR', None)
+        else:
+            os.environ['DATA_DIR'] = previous_data_dir
+
+    assert calls == [
+        ('sendPhoto', 1),
+        ('sendMediaGroup', 10), ('sendPhoto', 1),
+        ('sendMediaGroup', 10), ('sendMediaGroup', 2),
+    ]
+
+
+if __name__ == "__main__":
+    test_parse_period()
+    test_history_and_file_ids()
+    test_repeat_delivery_reuses_file_id()
+    test_resend_sends_single_receipts_as_photo()
+    print("✅ Receipt archive tests passed!")
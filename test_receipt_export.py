@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test script for the data-only receipt export
+"""
+
+import sys
+import os
+import io
+import csv
+import json
+import random
+import time
+import asyncio
+import tempfile
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from telegram import Bot, Update
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main_simple import FoodReceiptGenerator, TelegramBot
+from receipt_export import CSV_FIELDS, batches, estimate_export_bytes, export_receipts, receipt_record, spread
+
+
+def _check_receipt(record, catalog_items):
+    prices = [item['price'] for item in record['items']]
+    assert all(catalog_items[item['name']] == item for item in record['items'])
+    assert len({item['name'] for item in record['items']}) == len(prices)
+    assert abs(record['total'] - sum(prices)) < 0.005
+    # Complete as soon as it reaches 7 EUR
+    assert sum(prices) >= 7.0 and sum(prices[:-1]) < 7.0
+    assert abs(record['tax']['7']['brutto'] + record['tax']['19']['brutto'] - record['total']) < 0.015
+    for rate in ('7', '19'):
+        tax = record['tax'][rate]
+        assert abs(tax['net'] + tax['tax'] - tax['brutto']) < 0.015
+    assert '08:00' <= record['receipt_time'] <= '17:59' and record['transaction_time'] < record['receipt_time']
+
+
+def test_jsonl_matches_receipt_data():
+    """Batch records have the schema of generate_receipt_data() records and consistent contents"""
+    generator = FoodReceiptGenerator()
+    catalog_items = {item['name']: item for item in map(generator.catalog.item, range(len(generator.catalog)))}
+    out = io.StringIO()
+    written = export_receipts(generator, [(datetime(2026, 3, 2), 700), (datetime(2026, 3, 3), 300)], out, seed=1, batch_size=256)
+    lines = out.getvalue().splitlines()
+    assert written == len(lines) == 1000
+
+    reference = receipt_record(datetime(2026, 3, 2), generator.generate_receipt_data(datetime(2026, 3, 2), random.Random(1)))
+    records = [json.loads(line) for line in lines]
+    for record in records:
+        assert list(record) == list(reference)
+        assert all(type(record[key]) is type(reference[key]) for key in reference)
+        _check_receipt(record, catalog_items)
+    assert [record['day'] for record in records].count('2026-03-03') == 300
+
+    again = io.StringIO()
+    export_receipts(generator, [(datetime(2026, 3, 2), 700), (datetime(2026, 3, 3), 300)], again, seed=1, batch_size=256)
+    assert again.getvalue() == out.getvalue()
+
+
+def test_csv_and_cart_target():
+    """CSV rows carry the same fields; a cart target goes through the generator's sampler"""
+    generator = FoodReceiptGenerator(cart_target={'min_total': 7.0, 'max_total': 7.5})
+    out = io.StringIO()
+    export_receipts(generator, [(datetime(2026, 3, 2), 50)], out, 'csv', seed=2)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert tuple(rows[0]) == CSV_FIELDS and len(rows) == 50
+    for row in rows:
+        items = row['items'].split('|')
+        assert int(row['item_count']) == len(items)
+        assert '7.00' <= row['total'] <= '7.50'
+        assert abs(sum(float(item.rsplit(':', 1)[1]) for item in items) - float(row['total'])) < 0.005
+
+
+def test_spread_and_batches():
+    """Receipts are spread evenly over the days and batches never exceed their size"""
+    days = [datetime(2026, 3, day) for day in (2, 3, 4)]
+    assert list(spread(days, 3)) == [(day, 1) for day in days]
+    assert [receipts for _, receipts in spread(days, 3, 10)] == [3, 3, 4]
+    assert list(spread(days, 3, 2)) == [(days[1], 1), (days[2], 1)]
+    runs = list(batches([(days[0], 5), (days[1], 7)], batch_size=4))
+    assert [sum(receipts for _, receipts in run) for run in runs] == [4, 4, 4]
+    assert runs[1] == [(days[0], 1), (days[1], 3)]
+
+
+def test_bot_export_document():
+    """/export builds the document for a period without rendering"""
+    previous_data_dir = os.environ.get('DATA_DIR')
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    try:
+        bot = TelegramBot("123456:TEST", 1)
+        with bot.export_document(date(2026, 3, 1), date(2026, 3, 31), 'weekdays', 22, None, 'jsonl') as document:
+            data = document.read()
+        with bot.export_document(date(2026, 3, 1), date(2026, 3, 31), 'weekdays', 22, 1000, 'csv') as document:
+            counted = document.read()
+        estimate = estimate_export_bytes(bot.receipt_generator, datetime(2026, 3, 2), 1000, 'csv')
+    finally:
+        if previous_data_dir is None:
+            os.environ.pop('DATA_DIR', None)
+        else:
+            os.environ['DATA_DIR'] = previous_data_dir
+    days = [json.loads(line)['day'] for line in data.decode('utf-8').splitlines()]
+    assert len(days) == 22 and days[0] == '2026-03-02' and days[-1] == '2026-03-31'
+    assert len(counted.decode('utf-8').splitlines()) == 1001
+    assert len(counted) < estimate < 1.5 * len(counted)
+
+
+def test_export_rejects_huge_periods_quickly():
+    """A period of millennia is refused before its days are counted"""
+    previous_data_dir = os.environ.get('DATA_DIR')
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    replies = []
+
+    async def fake_bot_api(self, endpoint, data=None, *args, **kwargs):
+        replies.append((endpoint, data.get('text')))
+        return {'message_id': 1, 'date': 0, 'chat': {'id': data['chat_id'], 'type': 'private'}, 'text': 'ok'}
+
+    original_post = Bot._post
+    Bot._post = fake_bot_api
+
+    async def scenario():
+        bot = TelegramBot("123456:TEST", 1)
+        update = Update.de_json({
+            'update_id': 1,
+            'message': {
+                'message_id': 1, 'date': 0, 'text': '/export',
+                'chat': {'id': 10, 'type': 'private'}, 'from': {'id': 1, 'is_bot': False, 'first_name': 'User'},
+            },
+        }, bot.application.bot)
+        started = time.perf_counter()
+        await bot.export_command(update, SimpleNamespace(args=['0001-01..9999-11', '10']))
+        return time.perf_counter() - started
+
+    try:
+        elapsed = asyncio.run(scenario())
+    finally:
+        Bot._post = original_post
+        if previous_data_dir is None:
+            os.environ.pop('DATA_DIR', None)
+        else:
+            os.environ['DATA_DIR'] = previous_data_dir
+    assert elapsed < 0.5
+    assert replies == [('sendMessage', "Please export at most 50000 days at a time.")]
+
+
+if __name__ == "__main__":
+    test_jsonl_matches_receipt_data()
+    test_csv_and_cart_target()
+    test_spread_and_batches()
+    test_bot_export_document()
+    test_export_rejects_huge_periods_quickly()
+    print("✅ Receipt export tests passed!")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test script for the receipt pack file store
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from receipt_pack import ENTRY_HEADER, INDEX_NAME, CorruptEntry, ReceiptPack
+
+
+def _entries(count):
+    return {
+        (date(2026, 1, 1) + timedelta(days=i % 365), i): f"receipt {i} ".encode() * (1 + i % 50)
+        for i in range(count)
+    }
+
+
+def test_put_get_grow_and_reopen():
+    """Entries survive index growth, segment rollover and reopening"""
+    directory = tempfile.mkdtemp()
+    entries = _entries(3000)
+    pack = ReceiptPack(directory, segment_size=64 * 1024)
+    for (day, seed), data in entries.items():
+        pack.put(day, seed, data)
+    assert pack.capacity >= 3000 / 0.7 and pack.stats()['segments'] > 1
+    pack.close()
+
+    pack = ReceiptPack(directory)
+    assert len(pack) == 3000
+    assert all(bytes(pack.get(day, seed)) == data for (day, seed), data in entries.items())
+    assert pack.get(datetime(2026, 1, 2, 15, 30), 1) == entries[(date(2026, 1, 2), 1)]
+    assert pack.get(date(2026, 1, 2), 2) is None and (date(2026, 1, 3), 2) in pack
+    pack.close()
+
+
+def test_compaction_and_rebuild():
+    """Replaced and deleted entries are reclaimed; the index can be rebuilt from the segments"""
+    directory = tempfile.mkdtemp()
+    entries = _entries(500)
+    pack = ReceiptPack(directory)
+    for (day, seed), data in entries.items():
+        pack.put(day, seed, data)
+    for (day, seed) in list(entries)[:200]:
+        pack.delete(day, seed)
+        del entries[(day, seed)]
+    replaced = next(iter(entries))
+    pack.put(*replaced, b'new render')
+    entries[replaced] = b'new render'
+    assert pack.dead_ratio() > 0.3
+
+    freed = pack.compact()
+    assert freed > 0 and pack.dead_bytes == 0 and len(pack) == 300
+    assert sorted(pack.keys()) == sorted(entries)
+    assert all(bytes(pack.get(day, seed)) == data for (day, seed), data in entries.items())
+    pack.close()
+
+    # Lost index, and a torn append at the end of the segment
+    os.remove(os.path.join(directory, INDEX_NAME))
+    segment = os.path.join(directory, sorted(name for name in os.listdir(directory) if name.endswith('.rpk'))[-1])
+    with open(segment, 'ab') as f:
+        f.write(ENTRY_HEADER.pack(b'RPE1', 1, 1, 1000, 0) + b'partial')
+    pack = ReceiptPack(directory)
+    assert len(pack) == 300
+    assert all(bytes(pack.get(day, seed)) == data for (day, seed), data in entries.items())
+    pack.put(date(2027, 1, 1), 1, b'after the torn entry')
+    pack.close()
+    os.remove(os.path.join(directory, INDEX_NAME))
+    pack = ReceiptPack(directory)
+    assert pack.get(date(2027, 1, 1), 1) == b'after the torn entry'
+    pack.close()
+
+
+def test_torn_tail_cut_on_open():
+    """A torn append is cut off when the pack opens, so later entries survive a rebuild"""
+    directory = tempfile.mkdtemp()
+    pack = ReceiptPack(directory)
+    pack.put(date(2026, 3, 2), 1, b'before the crash')
+    pack.close()
+    # The index is intact, only the segment ends in a partial entry
+    with open(os.path.join(directory, 'segment-000001.rpk'), 'ab') as f:
+        f.write(ENTRY_HEADER.pack(b'RPE1', 1, 1, 1000, 0) + b'partial')
+    pack = ReceiptPack(directory)
+    pack.put(date(2026, 3, 3), 2, b'after the crash')
+    assert pack.rebuild_index() == 2
+    assert pack.get(date(2026, 3, 2), 1) == b'before the crash' and pack.get(date(2026, 3, 3), 2) == b'after the crash'
+    pack.close()
+
+
+def test_version_change_drops_renders():
+    """Receipts rendered under another layout version are not served"""
+    directory = tempfile.mkdtemp()
+    pack = ReceiptPack(directory, version='layout1')
+    pack.put(date(2026, 3, 2), 1, b'old layout')
+    pack.close()
+
+    # Tools that do not know the version keep the pack as it is
+    pack = ReceiptPack(directory)
+    assert pack.version == 'layout1' and len(pack) == 1
+    pack.close()
+    pack = ReceiptPack(directory, version='layout1')
+    assert pack.get(date(2026, 3, 2), 1) == b'old layout'
+    pack.close()
+
+    pack = ReceiptPack(directory, version='layout2')
+    assert len(pack) == 0 and pack.get(date(2026, 3, 2), 1) is None and pack.segment_bytes() == 0
+    pack.put(date(2026, 3, 2), 1, b'new layout')
+    pack.close()
+    os.remove(os.path.join(directory, INDEX_NAME))
+    pack = ReceiptPack(directory, version='layout2')
+    assert pack.get(date(2026, 3, 2), 1) == b'new layout'
+    pack.close()
+
+
+def test_checksum_mismatch():
+    """A flipped byte on disk is reported instead of served"""
+    directory = tempfile.mkdtemp()
+    pack = ReceiptPack(directory)
+    pack.put(date(2026, 3, 2), 42, b'\x89PNG receipt bytes')
+    pack.close()
+    segment = os.path.join(directory, 'segment-000001.rpk')
+    with open(segment, 'r+b') as f:
+        f.seek(ENTRY_HEADER.size + 5)
+        f.write(b'X')
+    pack = ReceiptPack(directory)
+    try:
+        pack.get(date(2026, 3, 2), 42)
+        raise AssertionError("corruption not detected")
+    except CorruptEntry:
+        pass
+    assert pack.verify() == 1
+    pack.close()
+
+
+def test_bot_renders_once():
+    """With RENDER_PACK_DIR the bot renders a receipt once and then reads it from the pack"""
+    from main_simple import TelegramBot
+
+    previous = {name: os.environ.get(name) for name in ('DATA_DIR', 'RENDER_PACK_DIR')}
+    os.environ['DATA_DIR'] = tempfile.mkdtemp()
+    os.environ['RENDER_PACK_DIR'] = os.path.join(os.environ['DATA_DIR'], 'renders')
+    renders = []
+
+    class CountingRenderer:
+        name = 'counting'
+
+        def render(self, generator, day, seed):
+            renders.append(seed)
+            return b'png %d' % seed
+
+    class OtherRenderer(CountingRenderer):
+        name = 'other'
+
+        def render(self, generator, day, seed):
+            renders.append(seed)
+            return b'other %d' % seed
+
+    async def scenario():
+        bot = TelegramBot("123456:TEST", 1)
+        bot.renderer = CountingRenderer()
+        bot.open_render_pack()
+        first = await bot.render_receipt(datetime(2026, 3, 2), 7)
+        second = await bot.render_receipt(datetime(2026, 3, 2), 7)
+        # The next start picks another backend: its receipts are rendered afresh
+        bot.renderer = OtherRenderer()
+        bot.open_render_pack()
+        third = await bot.render_receipt(datetime(2026, 3, 2), 7)
+        bot.render_pack.close()
+        return first, second, third
+
+    try:
+        first, second, third = asyncio.run(scenario())
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    assert first == second == b'png 7' and third == b'other 7'
+    assert renders == [7, 7]
+
+
+if __name__ == "__main__":
+    test_put_get_grow_and_reopen()
+    test_compaction_and_rebuild()
+    test_torn_tail_cut_on_open()
+    test_version_change_drops_renders()
+    test_checksum_mismatch()
+    test_bot_renders_once()
+    print("✅ Receipt pack tests passed!")
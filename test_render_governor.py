@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for memory-budget admission control of renders
+"""
+
+import sys
+import os
+import asyncio
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from render_governor import RenderGovernor
+
+
+async def _hold(governor, cost, name, log, release):
+    async with governor.admit(cost):
+        log.append(f"start {name}")
+        await release.wait()
+        log.append(f"end {name}")
+
+
+def test_admits_within_budget():
+    """Jobs run concurrently only while they fit, the rest wait in order"""
+    async def scenario():
+        governor = RenderGovernor(budget_bytes=100)
+        log, release = [], {name: asyncio.Event() for name in 'abcd'}
+        tasks = [
+            asyncio.create_task(_hold(governor, cost, name, log, release[name]))
+            for name, cost in (('a', 40), ('b', 40), ('c', 40), ('d', 10))
+        ]
+        await asyncio.sleep(0)
+        running = list(log)
+        stats = governor.stats()
+
+        release['a'].set()
+        await asyncio.sleep(0.01)
+        after_release = list(log)
+
+        for event in release.values():
+            event.set()
+        await asyncio.gather(*tasks)
+        return running, stats, after_release, governor.stats()
+
+    running, stats, after_release, final = asyncio.run(scenario())
+    assert running == ['start a', 'start b']
+    # d would fit, but waits behind c so large jobs are not starved
+    assert stats['used_bytes'] == 80 and stats['running'] == 2 and stats['queued'] == 2
+    assert after_release[2:] == ['end a', 'start c', 'start d']
+    assert final['used_bytes'] == 0 and final['running'] == 0 and final['admitted'] == 4
+
+
+def test_oversized_job_runs_alone():
+    """A job bigger than the budget is admitted once nothing else runs"""
+    async def scenario():
+        governor = RenderGovernor(budget_bytes=100)
+        log, release = [], asyncio.Event()
+        small = asyncio.create_task(_hold(governor, 10, 'small', log, release))
+        await asyncio.sleep(0)
+        big = asyncio.create_task(_hold(governor, 500, 'big', log, release))
+        await asyncio.sleep(0)
+        waiting = list(log)
+        release.set()
+        await asyncio.gather(small, big)
+        return waiting, log
+
+    waiting, log = asyncio.run(scenario())
+    assert waiting == ['start small']
+    assert log == ['start small', 'end small', 'start big', 'end big']
+
+
+def test_cancelled_waiter_leaves_queue():
+    """Cancelling a queued job frees its place for the jobs behind it"""
+    async def scenario():
+        governor = RenderGovernor(budget_bytes=100)
+        log, release = [], asyncio.Event()
+        first = asyncio.create_task(_hold(governor, 90, 'first', log, release))
+        await asyncio.sleep(0)
+        blocked = asyncio.create_task(_hold(governor, 50, 'blocked', log, release))
+        small = asyncio.create_task(_hold(governor, 10, 'small', log, release))
+        await asyncio.sleep(0)
+        blocked.cancel()
+        await asyncio.sleep(0.01)
+        started = list(log)
+        release.set()
+        await asyncio.gather(first, small)
+        return started, governor.stats()
+
+    started, stats = asyncio.run(scenario())
+    assert started == ['start first', 'start small']
+    assert stats['queued'] == 0 and stats['used_bytes'] == 0
+
+
+if __name__ == "__main__":
+    test_admits_within_budget()
+    test_oversized_job_runs_alone()
+    test_cancelled_waiter_leaves_queue()
+    print("✅ Render governor tests passed!")
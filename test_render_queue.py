@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the durable render queue and render workers
+"""
+
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import threading
+from datetime import datetime
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from render_queue import RenderFailed, RenderQueue, RenderQueueClient, work
+
+
+def _queue_path():
+    return os.path.join(tempfile.mkdtemp(), 'render_queue.sqlite3')
+
+
+def test_leases_and_retries():
+    """Expired leases are claimed again, failures are retried up to max_attempts"""
+    path = _queue_path()
+    queue = RenderQueue(path, lease_seconds=0.1, max_attempts=2, retry_delay=0)
+    other = RenderQueue(path, lease_seconds=0.1, max_attempts=2, retry_delay=0)
+    first = queue.enqueue(datetime(2026, 3, 2), 7)
+    second = queue.enqueue(datetime(2026, 3, 3), 8, thermal=False)
+
+    job = queue.claim('a')
+    assert job['id'] == first and job['day'] == datetime(2026, 3, 2) and job['thermal'] is None
+    assert other.claim('b')['id'] == second
+    assert other.claim('b') is None
+    # Worker a dies; after the lease runs out worker b gets the job
+    time.sleep(0.15)
+    job = other.claim('b')
+    assert job['id'] == first and job['attempt'] == 2
+    assert other.complete(first, 'b', b'png')
+    assert not queue.complete(first, 'a', b'late')
+    assert queue.result(first) == b'png'
+
+    # Second job: its lease expired too, this attempt fails and it is out of attempts
+    job = queue.claim('a')
+    assert job['id'] == second and job['attempt'] == 2
+    queue.fail(second, 'a', 'font missing')
+    try:
+        queue.result(second)
+    except RenderFailed as e:
+        assert 'font missing' in str(e)
+    else:
+        raise AssertionError("job should have failed")
+    assert queue.stats() == {'queued': 0, 'leased': 0, 'done': 1, 'failed': 1}
+    queue.close()
+    other.close()
+
+
+def test_expired_last_attempt_fails():
+    """A job whose lease expires on its last attempt is failed, not claimed again"""
+    path = _queue_path()
+    queue = RenderQueue(path, lease_seconds=0.05, max_attempts=2, retry_delay=0)
+    job_id = queue.enqueue(datetime(2026, 3, 2), 7)
+    for attempt in (1, 2):
+        assert queue.claim(f"w{attempt}")['attempt'] == attempt
+        # The worker is killed mid-render
+        time.sleep(0.1)
+    assert queue.claim('w3') is None
+    try:
+        queue.result(job_id)
+    except RenderFailed as e:
+        assert 'lease expired' in str(e)
+    else:
+        raise AssertionError("job should have failed")
+    assert queue.stats() == {'queued': 0, 'leased': 0, 'done': 0, 'failed': 1}
+    queue.close()
+
+
+def test_client_with_workers():
+    """Receipts rendered by two worker threads arrive at the client and are cleaned up"""
+    path = _queue_path()
+    client = RenderQueueClient(path, timeout=60, poll_interval=0.01)
+    days = [datetime(2026, 3, day) for day in (2, 3, 4, 5)]
+    workers = [
+        threading.Thread(target=work, args=(path, f"w{i}", 'pil', 0.01, 2)) for i in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+
+    async def scenario():
+        return await asyncio.gather(*(client.render(day, seed) for seed, day in enumerate(days)))
+
+    results = asyncio.run(scenario())
+    for worker in workers:
+        worker.join()
+    assert all(png.startswith(b'\x89PNG') for png in results)
+    assert len(set(results)) == len(days)
+    assert asyncio.run(client.stats()) == {'queued': 0, 'leased': 0, 'done': 0, 'failed': 0}
+    asyncio.run(client.close())
+
+
+if __name__ == "__main__":
+    test_leases_and_retries()
+    test_expired_last_attempt_fails()
+    test_client_with_workers()
+    print("✅ Render queue tests passed!")
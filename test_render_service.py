@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for the local receipt rendering service
+"""
+
+import sys
+import os
+import socket
+import asyncio
+import zipfile
+from io import BytesIO
+from datetime import datetime
+
+import httpx
+from tornado.httpserver import HTTPServer
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main_simple import FoodReceiptGenerator
+from render_service import RenderPool, RenderService, RenderServiceClient, make_app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_render_service_formats():
+    """PNG, ZIP and PDF output from a warm pool, plus request validation"""
+    async def scenario():
+        pool = RenderPool(processes=2, batch_size=4)
+        service = RenderService(pool, max_concurrent=2)
+        await pool.warm_up()
+        port = _free_port()
+        server = HTTPServer(make_app(service))
+        server.listen(port, address='127.0.0.1')
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            client = RenderServiceClient(base_url)
+            png = await client.render(datetime(2026, 3, 2), 42)
+            await client.close()
+
+            async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+                zipped = await http.post('/render', json={'dates': ['2026-03-02', '2026-03-03'], 'format': 'zip'})
+                pdf = await http.post('/render', json={'days': 2, 'format': 'pdf', 'thermal': True})
+                invalid = [
+                    await http.post('/render', json=body)
+                    for body in ({'days': 2, 'format': 'png'}, {'days': 10 ** 9, 'format': 'zip'}, {'days': '3'}, [1, 2])
+                ]
+                health = await http.get('/health')
+        finally:
+            server.stop()
+            pool.shutdown()
+        return png, zipped, pdf, invalid, health
+
+    png, zipped, pdf, invalid, health = asyncio.run(scenario())
+
+    # Same date and seed as a local render gives the same receipt
+    assert png == FoodReceiptGenerator().create_receipt_image(datetime(2026, 3, 2), seed=42)
+
+    assert zipped.status_code == 200
+    assert len(zipped.headers['X-Receipt-Seeds'].split(',')) == 2
+    with zipfile.ZipFile(BytesIO(zipped.content)) as archive:
+        names = archive.namelist()
+    assert names == ['001_receipt_2026-03-02.png', '002_receipt_2026-03-03.png']
+
+    assert pdf.status_code == 200
+    assert pdf.content.startswith(b'%PDF')
+
+    assert [response.status_code for response in invalid] == [400] * 4
+    assert 'between 1 and' in invalid[1].json()['error']
+    assert health.json()['status'] == 'ok'
+
+
+if __name__ == "__main__":
+    test_render_service_formats()
+    print("✅ Render service tests passed!")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for renderer backends and benchmark-driven selection
+"""
+
+import sys
+import os
+from io import BytesIO
+from datetime import datetime
+
+from PIL import Image
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import renderers
+from renderers import (
+    HtmlRenderer, PilRenderer, ReceiptRenderer, RendererUnavailable,
+    check_quality, register_renderer, render_receipt_html, select_renderer,
+)
+from main_simple import FoodReceiptGenerator
+
+
+def _png(width, height, ink_rows=0):
+    image = Image.new('L', (width, height), 255)
+    if ink_rows:
+        image.paste(0, (0, 0, width, ink_rows))
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_quality_check():
+    """Blank, error-sized and non-image output is rejected"""
+    generator = FoodReceiptGenerator()
+    assert check_quality(PilRenderer().render(generator, datetime(2026, 3, 2), 7)) is None
+    assert 'ink' in check_quality(_png(300, 900))
+    assert 'narrow' in check_quality(_png(100, 900, ink_rows=90))
+    assert 'shaped' in check_quality(_png(500, 800, ink_rows=80))
+    assert 'readable' in check_quality(b'not a png')
+
+
+def test_html_template_uses_receipt_data():
+    """The HTML backend shows the same receipt as PIL for a seed, with the local logo"""
+    import random
+    data = FoodReceiptGenerator().generate_receipt_data(datetime(2026, 3, 2), random.Random(7))
+    html = render_receipt_html(data)
+    assert f"EUR {data['total']:7.2f}" in html
+    assert data['bon_nr'] in html
+    assert 'data:image/svg+xml;base64,' in html
+
+
+def test_main_html_receipt_has_tse_block():
+    """main.py's generator fills the whole template, TSE block and QR code included"""
+    import main
+    data = main.FoodReceiptGenerator().generate_receipt_data(datetime(2026, 3, 2))
+    html = main.FoodReceiptGenerator().generate_receipt_html(datetime(2026, 3, 2))
+    assert f"{float(data['total']):.2f}" in data['tse']['qr_payload']
+    assert 'TSE-Transaktion:' in html and 'alt="TSE QR-Code"' in html
+
+
+def test_selection_prefers_fastest_usable_backend():
+    """Missing dependencies and failed quality checks fall back, the fastest good backend wins"""
+    generator = FoodReceiptGenerator()
+
+    class Missing(ReceiptRenderer):
+        name = 'missing'
+
+        def check(self):
+            raise RendererUnavailable("engine not installed")
+
+    class Blank(ReceiptRenderer):
+        name = 'blank'
+
+        def render(self, generator, target_date, seed=None, thermal=None):
+            return _png(300, 900)
+
+    class Fast(ReceiptRenderer):
+        name = 'fast'
+
+        def render(self, generator, target_date, seed=None, thermal=None):
+            return _png(300, 900, ink_rows=90)
+
+    saved = dict(renderers.RENDERERS)
+    try:
+        for cls in (Missing, Blank, Fast):
+            register_renderer(cls)
+        assert isinstance(select_renderer(generator, 'auto'), Fast)
+        assert isinstance(select_renderer(generator, 'pil'), PilRenderer)
+        # A preferred backend that cannot run falls back to automatic selection
+        assert isinstance(select_renderer(generator, 'missing'), Fast)
+
+        renderers.RENDERERS.clear()
+        renderers.RENDERERS.update({'missing': Missing})
+        assert isinstance(select_renderer(generator), PilRenderer)
+    finally:
+        renderers.RENDERERS.clear()
+        renderers.RENDERERS.update(saved)
+
+
+def test_html_backend_reports_missing_tools():
+    """Without wkhtmltoimage the HTML backend says why instead of failing at render time"""
+    if renderers.shutil.which('wkhtmltoimage'):
+        return
+    try:
+        HtmlRenderer().check()
+    except RendererUnavailable as e:
+        assert 'wkhtmltoimage' in str(e) or 'installed' in str(e)
+    else:
+        raise AssertionError("HtmlRenderer.check() should fail without wkhtmltoimage")
+
+
+if __name__ == "__main__":
+    test_quality_check()
+    test_html_template_uses_receipt_data()
+    test_main_html_receipt_has_tse_block()
+    test_selection_prefers_fastest_usable_backend()
+    test_html_backend_reports_missing_tools()
+    print("✅ Renderer tests passed!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-user job scheduler
+Checks round-robin fairness, per-user limits and duplicate rejection
+"""
+
+import sys
+import os
+import asyncio
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scheduler import Job, JobRejected, JobScheduler
+
+
+async def _steps(log, name, count):
+    for i in range(count):
+        log.append(f"{name}{i}")
+        await asyncio.sleep(0)
+        yield
+
+
+async def _wait_idle(scheduler):
+    for _ in range(200):
+        if not scheduler.pending():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("scheduler did not drain")
+
+
+def test_round_robin_between_users():
+    """A long job from one user does not starve another user"""
+    async def scenario():
+        log = []
+        scheduler = JobScheduler(workers=1)
+        scheduler.submit(Job(1, 'food 5', _steps(log, 'a', 5)))
+        scheduler.submit(Job(2, 'food 2', _steps(log, 'b', 2)))
+        await scheduler.start()
+        await _wait_idle(scheduler)
+        await scheduler.stop()
+        return log
+
+    log = asyncio.run(scenario())
+    assert log[:4] == ['a0', 'b0', 'a1', 'b1']
+    assert log[4:] == ['a2', 'a3', 'a4']
+
+
+def test_user_steps_stay_in_order():
+    """Several workers never run two steps of one user at the same time"""
+    async def scenario():
+        log = []
+        scheduler = JobScheduler(workers=4)
+        await scheduler.start()
+        scheduler.submit(Job(1, 'food 3', _steps(log, 'a', 3)))
+        scheduler.submit(Job(1, 'food 2', _steps(log, 'b', 2)))
+        await _wait_idle(scheduler)
+        await scheduler.stop()
+        return log
+
+    assert asyncio.run(scenario()) == ['a0', 'a1', 'a2', 'b0', 'b1']
+
+
+def test_limits_and_duplicates():
+    """Duplicate requests and requests over the per-user limit are rejected"""
+    async def scenario():
+        scheduler = JobScheduler(workers=1, max_jobs_per_user=2)
+        scheduler.submit(Job(1, 'food 5', _steps([], 'a', 1)))
+        errors = []
+        for key in ('food 5', 'food 3', 'food 4'):
+            try:
+                scheduler.submit(Job(1, key, _steps([], 'x', 1)))
+            except JobRejected as e:
+                errors.append(str(e))
+        # Other users are not affected by user 1's limit
+        scheduler.submit(Job(2, 'food 5', _steps([], 'b', 1)))
+        pending = scheduler.pending(1), scheduler.pending(2)
+        await scheduler.stop()
+        return errors, pending
+
+    errors, pending = asyncio.run(scenario())
+    assert len(errors) == 2
+    assert 'already in progress' in errors[0]
+    assert pending == (2, 1)
+
+
+if __name__ == "__main__":
+    test_round_robin_between_users()
+    test_user_steps_stay_in_order()
+    test_limits_and_duplicates()
+    print("✅ Scheduler tests passed!")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for SVG receipt output
+"""
+
+import sys
+import os
+import time
+import random
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from main_simple import FoodReceiptGenerator
+from render_service import RenderService
+from svg_receipt import rasterize, rasterizer_available, receipt_svg
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+def test_svg_matches_receipt_data():
+    """The SVG carries the seeded receipt's texts and the vector logo"""
+    generator = FoodReceiptGenerator()
+    day = datetime(2026, 3, 2)
+    svg = generator.create_receipt_svg(day, seed=7)
+    data = generator.generate_receipt_data(day, random.Random(7))
+
+    root = ET.fromstring(svg)
+    texts = [element.text for element in root.iter(f'{SVG}text')]
+    assert f" SUMME                           EUR {data['total']:6.2f}" in texts
+    assert f"Beleg-Nr.   {data['beleg_nr']}" in texts
+    assert [item['name'] for item in data['items']] == [texts[4 + i * 2] for i in range(len(data['items']))]
+    assert root.find(f'{SVG}svg/{SVG}path') is not None
+    assert generator.create_receipt_svg(day, seed=7) == svg
+
+
+def test_svg_is_small_and_fast():
+    """Templating a receipt takes well under a millisecond once its QR code is encoded, and a few kilobytes"""
+    data = FoodReceiptGenerator().generate_receipt_data(datetime(2026, 3, 2), random.Random(1))
+    start = time.perf_counter()
+    for _ in range(200):
+        svg = receipt_svg(data)
+    assert (time.perf_counter() - start) / 200 < 0.001
+    assert len(svg.encode('utf-8')) < 20_000
+
+
+def test_service_svg_skips_the_pool():
+    """SVG requests are answered without touching the render workers"""
+    import asyncio
+
+    class NoPool:
+        async def render(self, *args):
+            raise AssertionError("SVG output must not use the render pool")
+
+    service = RenderService(NoPool())
+    days, seeds, output_format, thermal = service.parse_request({'dates': ['2026-03-02'], 'seeds': [7], 'format': 'svg'})
+    body, content_type, filename = asyncio.run(service.render(days, seeds, output_format, thermal))
+    assert content_type == 'image/svg+xml' and filename == 'receipt_2026-03-02.svg'
+    assert body.decode('utf-8') == FoodReceiptGenerator().create_receipt_svg(datetime(2026, 3, 2), 7)
+
+
+def test_rasterize_on_demand():
+    """PNGs at any width come from the one SVG, cached per width"""
+    available, _ = rasterizer_available()
+    if not available:
+        return  # cairo library not installed here
+    svg = FoodReceiptGenerator().create_receipt_svg(datetime(2026, 3, 2), seed=7)
+    small, large = rasterize(svg, 300), rasterize(svg, 900)
+    assert small.startswith(b'\x89PNG') and len(large) > len(small)
+    hits = rasterize.cache_info().hits
+    rasterize(svg, 300)
+    assert rasterize.cache_info().hits == hits + 1
+
+
+if __name__ == "__main__":
+    test_svg_matches_receipt_data()
+    test_svg_is_small_and_fast()
+    test_service_svg_skips_the_pool()
+    test_rasterize_on_demand()
+    print("✅ SVG receipt tests passed!")
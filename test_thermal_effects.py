@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test script for the thermal-print post-processing stage
+"""
+
+import sys
+import os
+import time
+
+from PIL import Image, ImageChops
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from thermal_effects import _textures, apply_thermal_effects
+
+
+def _receipt() -> Image.Image:
+    image = Image.new('L', (600, 1800), 255)
+    image.paste(0, (50, 100, 550, 140))
+    return image
+
+
+def test_seeded_and_same_size():
+    """Same seed gives the same print, other seeds vary it"""
+    image = _receipt()
+    first = apply_thermal_effects(image, seed=1)
+    assert first.size == image.size and first.mode == 'L'
+    assert ImageChops.difference(first, apply_thermal_effects(image, seed=1)).getbbox() is None
+    assert ImageChops.difference(first, apply_thermal_effects(image, seed=2)).getbbox() is not None
+
+
+def test_ink_fades_and_paper_is_not_white():
+    """Text stays dark but is no longer pure black on pure white"""
+    printed = apply_thermal_effects(_receipt(), seed=3)
+    low, high = printed.getextrema()
+    assert 0 < low < 128
+    assert high < 255
+
+
+def test_textures_are_cached():
+    """Textures are built once per size, so repeated receipts stay cheap"""
+    image = _receipt()
+    apply_thermal_effects(image, seed=0)
+    hits = _textures.cache_info().hits
+    start = time.perf_counter()
+    for seed in range(10):
+        apply_thermal_effects(image, seed=seed)
+    assert _textures.cache_info().hits == hits + 10
+    assert (time.perf_counter() - start) / 10 < 0.05
+
+
+if __name__ == "__main__":
+    test_seeded_and_same_size()
+    test_ink_fades_and_paper_is_not_white()
+    test_textures_are_cached()
+    print("✅ Thermal effects tests passed!")
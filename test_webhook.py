@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for the webhook serving mode
+Runs the bot's webhook server locally and POSTs updates to it like Telegram would
+"""
+
+import sys
+import os
+import json
+import socket
+import asyncio
+import tempfile
+import urllib.request
+import urllib.error
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep job state out of the working tree
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp())
+
+from telegram import Bot, Update
+from telegram.ext import TypeHandler
+
+from main_simple import TelegramBot
+
+
+async def _fake_bot_api(self, endpoint, data=None, *args, **kwargs):
+    """Stand-in for the Bot API calls made while bootstrapping the webhook"""
+    if endpoint == 'getMe':
+        return {'id': 123456, 'is_bot': True, 'first_name': 'Receipts', 'username': 'receipt_bot'}
+    return True
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _post_update(url: str, update: dict, secret_token: str = None) -> int:
+    """POST an update the way Telegram does and return the HTTP status"""
+    request = urllib.request.Request(url, data=json.dumps(update).encode(), method='POST')
+    request.add_header('Content-Type', 'application/json')
+    if secret_token:
+        request.add_header('X-Telegram-Bot-Api-Secret-Token', secret_token)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_webhook_settings_from_env():
+    """Webhook settings are read from the environment"""
+    os.environ.update({
+        'WEBHOOK_URL': 'https://bot.example.com/',
+        'WEBHOOK_PATH': '/hook/',
+        'WEBHOOK_PORT': '9000',
+        'WEBHOOK_SECRET_TOKEN': 'top-secret',
+    })
+    try:
+        bot = TelegramBot("123456:TEST", 42)
+        settings = bot.get_webhook_settings()
+    finally:
+        for key in ('WEBHOOK_URL', 'WEBHOOK_PATH', 'WEBHOOK_PORT', 'WEBHOOK_SECRET_TOKEN'):
+            os.environ.pop(key, None)
+
+    assert settings['url_path'] == 'hook'
+    assert settings['webhook_url'] == 'https://bot.example.com/hook'
+    assert settings['port'] == 9000
+    assert settings['secret_token'] == 'top-secret'
+
+
+def test_webhook_receives_posted_updates():
+    """Updates POSTed with the right secret token reach the application"""
+    original_post = Bot._post
+    Bot._post = _fake_bot_api
+
+    async def scenario():
+        port = _free_port()
+        os.environ.update({'WEBHOOK_URL': 'https://bot.example.com', 'WEBHOOK_PORT': str(port)})
+        try:
+            bot = TelegramBot("123456:TEST", 42)
+            settings = bot.get_webhook_settings()
+        finally:
+            os.environ.pop('WEBHOOK_URL', None)
+            os.environ.pop('WEBHOOK_PORT', None)
+        settings['listen'] = '127.0.0.1'
+
+        received = []
+
+        async def record(update, context):
+            received.append(update.update_id)
+
+        bot.application.add_handler(TypeHandler(Update, record), group=-1)
+        application = bot.application
+        await application.initialize()
+        await application.updater.start_webhook(**settings)
+        await application.start()
+        try:
+            url = f"http://127.0.0.1:{port}/{settings['url_path']}"
+            update = {'update_id': 1001}
+            loop = asyncio.get_running_loop()
+            rejected = await loop.run_in_executor(None, _post_update, url, update, 'wrong-token')
+            accepted = await loop.run_in_executor(None, _post_update, url, update, settings['secret_token'])
+            for _ in range(50):
+                if received:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await application.updater.stop()
+            await application.stop()
+            await application.shutdown()
+        return rejected, accepted, received
+
+    try:
+        rejected, accepted, received = asyncio.run(scenario())
+    finally:
+        Bot._post = original_post
+
+    assert rejected == 403
+    assert accepted == 200
+    assert received == [1001]
+
+
+if __name__ == "__main__":
+    test_webhook_settings_from_env()
+    test_webhook_receives_posted_updates()
+    print("✅ Webhook tests passed!")
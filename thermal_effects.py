@@ -0,0 +1,66 @@
+import functools
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Extra texture margin, so each receipt can use a different window of the same texture
+TEXTURE_MARGIN = 64
+
+
+def _smooth_noise(rng: np.random.Generator, shape: Tuple[int, int], cell: Tuple[int, int]) -> np.ndarray:
+    """Low-frequency noise in [0, 1]: a coarse random grid upscaled bicubically"""
+    height, width = shape
+    coarse = rng.random((max(2, height // cell[0]), max(2, width // cell[1]))).astype(np.float32)
+    image = Image.fromarray(coarse, mode='F').resize((width, height), Image.Resampling.BICUBIC)
+    noise = np.asarray(image)
+    low, high = noise.min(), noise.max()
+    return (noise - low) / (high - low or 1)
+
+
+@functools.lru_cache(maxsize=8)
+def _textures(height: int, width: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Density, head-streak and paper-grain textures for one image size, generated once"""
+    rng = np.random.default_rng(20240501)
+    shape = (height + TEXTURE_MARGIN, width + TEXTURE_MARGIN)
+    # Blotchy density differences from heat and paper coating
+    density = _smooth_noise(rng, shape, (48, 24))
+    # Print head elements wear unevenly, which shows as faint vertical streaks
+    streaks = np.broadcast_to(_smooth_noise(rng, (2, shape[1]), (1, 3))[:1], shape).copy()
+    grain = rng.random(shape, dtype=np.float32)
+    for texture in (density, streaks, grain):
+        texture.setflags(write=False)
+    return density, streaks, grain
+
+
+def apply_thermal_effects(image: Image.Image, seed: Optional[int] = None, strength: float = 1.0) -> Image.Image:
+    """Make a clean receipt look like a thermal printout.
+
+    Adds fading towards the end of the roll, uneven print density, head streaks,
+    paper grain and a slight skew. The noise textures are cached per size and
+    each receipt takes a seeded random window and parameters from them, so the
+    per-receipt cost is a few vectorized array operations.
+    """
+    rng = np.random.default_rng(seed)
+    # Skew first, on the clean image, so the uncovered corners get paper texture too.
+    # Nearest-neighbour keeps this well under a millisecond and looks like thermal dots anyway
+    angle = rng.uniform(-0.6, 0.6) * strength
+    gray = image.convert('L').rotate(angle, resample=Image.Resampling.NEAREST, fillcolor=255)
+    width, height = gray.size
+    density, streaks, grain = _textures(height, width)
+    dy, dx = rng.integers(0, TEXTURE_MARGIN, size=2)
+    window = (slice(dy, dy + height), slice(dx, dx + width))
+
+    ink = (255.0 - np.asarray(gray, dtype=np.float32)) * (1.0 / 255.0)
+
+    # Overall darkness and fading profile vary per receipt
+    fade_start = rng.uniform(0.85, 1.0)
+    fade_end = fade_start - rng.uniform(0.05, 0.25) * strength
+    row_fade = np.linspace(fade_start, fade_end, height, dtype=np.float32)[:, None]
+    ink *= row_fade
+    ink *= 1.0 - 0.35 * strength * density[window]
+    ink *= 1.0 - 0.15 * strength * streaks[window]
+
+    # Slightly off-white paper with fine grain
+    paper = 252.0 - 10.0 * strength * grain[window]
+    return Image.fromarray((paper * (1.0 - ink)).astype(np.uint8), mode='L')
@@ -0,0 +1,44 @@
+"""
+TSE block of a receipt
+German tills sign every receipt in a technical security system (TSE) and print
+its counters, times and a QR code with the DSFinV-K data; this builds them for
+generated receipt data.
+"""
+
+import base64
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+
+def generate_tse_data(
+    data: Dict[str, Any], transaction_time: datetime, receipt_time: datetime, rng: Any
+) -> Dict[str, Any]:
+    """TSE (technical security system) block: counters, start/stop times and the DSFinV-K QR payload"""
+    # Register and TSE identity are fixed per till, like the real device
+    client_id = f"0112-{data['kasse_nr']}"
+    public_key = b'\x04' + hashlib.sha512(f"REWE-TSE-{client_id}".encode('ascii')).digest()
+    transaction = rng.randint(100000, 999999)
+    signature_counter = rng.randint(1000000, 9999999)
+    start = transaction_time - timedelta(seconds=rng.randint(20, 240))
+    signature = base64.b64encode(rng.getrandbits(512).to_bytes(64, 'big')).decode('ascii')
+    start_text = start.strftime('%Y-%m-%dT%H:%M:%S.000')
+    end_text = receipt_time.strftime('%Y-%m-%dT%H:%M:%S.000')
+
+    tax_summary = data['tax_summary']
+    # Gross amounts per VAT rate: 19%, 7%, 10.7%, 5.5%, 0%
+    amounts = f"{tax_summary[19]['brutto']:.2f}_{tax_summary[7]['brutto']:.2f}_0.00_0.00_0.00"
+    qr_payload = ';'.join([
+        'V0', client_id, 'Kassenbeleg-V1', f"Beleg^{amounts}^{float(data['total']):.2f}:Unbar",
+        str(transaction), str(signature_counter), start_text, end_text,
+        'ecdsa-plain-SHA256', 'unixTime', signature, base64.b64encode(public_key).decode('ascii'),
+    ])
+    return {
+        'transaction': str(transaction),
+        'signature_counter': str(signature_counter),
+        'start': start_text,
+        'end': end_text,
+        'serial': hashlib.sha256(public_key).hexdigest(),
+        'signature': signature,
+        'qr_payload': qr_payload,
+    }